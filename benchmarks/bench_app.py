@@ -0,0 +1,349 @@
+"""Time the main window on synthetic image folders, without a display.
+
+For every folder size a fresh folder is generated and the window is
+driven through the operations a user notices:
+
+    startup                  ImageMan() until the first event loop pass
+    get_images               listing the folder, as when it is opened again
+    thumbnails_first_screen  ImageMan() until the first screenful of
+                             thumbnails is decoded
+    thumbnails_scroll        scrolling to the end and decoding that screenful,
+                             in a WINDOW_SIZE window
+    open_image               thumbnail grid to single image view
+    next / prev              one step, with a short pause between steps so
+                             the decode-ahead buffer can work (percentiles)
+    zoom                     one zoom in or out step (percentiles)
+    rename_all               Rename All Images, disk work included
+    tag_move_ui              moving TAG_MOVE_COUNT images to a tag, until
+                             the grid is updated
+    tag_move_total           the same until the files are moved on disk
+
+All values are milliseconds. The images are a mix of camera sized JPEGs
+and smaller PNGs (see MIX). Each folder holds hard links to a few encoded
+templates, so even the 100k folder takes no extra disk space. The
+operating system then caches those few files, use --copy to write real
+copies when disk reads should count. The thumbnail cache starts empty in
+every run.
+
+Results can be saved as JSON and compared with an earlier run:
+
+    python benchmarks/bench_app.py --sizes 1000,10000 --output new.json
+    python benchmarks/bench_app.py --sizes 1000,10000 --baseline old.json
+
+With --baseline the exit code is 1 when a metric got slower by more than
+--tolerance and by more than --min-ms. --repeat runs every size several
+times and keeps the median of each metric.
+
+Usage: python benchmarks/bench_app.py [--sizes N,N,...] [--repeat N] [--output FILE]
+                                      [--baseline FILE] [--tolerance F] [--min-ms MS] [--copy]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+# Leave the user's recent directories and tags alone
+os.environ.setdefault('IMAGEMAN_SETTINGS', 'memory')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyQt5.QtCore import Qt, QT_VERSION_STR, QElapsedTimer, QPointF  # noqa: E402
+from PyQt5.QtGui import QImage, QPainter, QColor, QLinearGradient, QBrush  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+# (format, width, height, share of the folder)
+MIX = [
+    ('jpg', 6000, 4000, 2),
+    ('jpg', 4000, 3000, 4),
+    ('jpg', 1920, 1080, 2),
+    ('png', 1920, 1080, 1),
+    ('png', 800, 600, 1),
+]
+TEMPLATES_PER_KIND = 3
+DEFAULT_SIZES = '1000,10000,100000'
+STEPS = 30
+STEP_PAUSE_MS = 100
+ZOOM_STEPS = 5
+TAG_MOVE_COUNT = 100
+WINDOW_SIZE = (1280, 800)
+TIMEOUT_MS = 600000
+
+
+def make_template(path, fmt, width, height, seed):
+    """Write a gradient with shapes and a noise texture, so it compresses like a photo."""
+    rng = random.Random(seed)
+    image = QImage(width, height, QImage.Format_RGB32)
+    noise_data = bytes(rng.getrandbits(8) for _ in range(64 * 64 * 4))
+    noise = QImage(noise_data, 64, 64, QImage.Format_ARGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(QPointF(0, 0), QPointF(width, height))
+    gradient.setColorAt(0, QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    gradient.setColorAt(1, QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    painter.fillRect(image.rect(), gradient)
+    painter.setPen(Qt.NoPen)
+    for _ in range(40):
+        painter.setBrush(QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256), 160))
+        painter.drawEllipse(rng.randrange(width), rng.randrange(height),
+                            rng.randrange(width // 3) + 1, rng.randrange(height // 3) + 1)
+    painter.setOpacity(0.15)
+    painter.fillRect(image.rect(), QBrush(noise))
+    painter.end()
+    if not image.save(path, fmt.upper(), 90):
+        raise RuntimeError(f'Could not write {path}')
+
+
+def make_templates(template_dir):
+    templates = []
+    for kind, (fmt, width, height, share) in enumerate(MIX):
+        for variant in range(TEMPLATES_PER_KIND):
+            path = os.path.join(template_dir, f'template_{kind}_{variant}.{fmt}')
+            make_template(path, fmt, width, height, seed=kind * 100 + variant)
+            templates.extend([path] * share)
+    return templates
+
+
+def make_folder(image_dir, count, templates, copy=False):
+    """Fill image_dir with count images named like camera files, in shuffled order."""
+    os.makedirs(image_dir)
+    rng = random.Random(count)
+    numbers = list(range(1, count + 1))
+    rng.shuffle(numbers)
+    for number in numbers:
+        template = rng.choice(templates)
+        path = os.path.join(image_dir, f'DSC_{number:06d}{os.path.splitext(template)[1]}')
+        if copy:
+            shutil.copyfile(template, path)
+        else:
+            try:
+                os.link(template, path)
+            except OSError:
+                shutil.copyfile(template, path)
+
+
+def wait_until(predicate, timeout_ms=TIMEOUT_MS):
+    timer = QElapsedTimer()
+    timer.start()
+    while not predicate():
+        if timer.elapsed() > timeout_ms:
+            raise TimeoutError('The window did not finish in time')
+        QApplication.processEvents()
+        time.sleep(0.001)
+
+
+def pause(ms):
+    timer = QElapsedTimer()
+    timer.start()
+    while timer.elapsed() < ms:
+        QApplication.processEvents()
+        time.sleep(0.001)
+
+
+def elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def at(fraction):
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+    return {'p50': at(0.5), 'p95': at(0.95), 'max': samples[-1]}
+
+
+def thumbnails_settled(viewer):
+    """True once the grid has painted and every thumbnail it asked for is decoded."""
+    QApplication.processEvents()
+    loader = viewer.thumbnail_loader
+    return len(viewer.thumbnail_view.visible_rows()) > 0 and loader._in_flight == 0 and not loader._pending
+
+
+def scrolled_to_end(viewer):
+    """Scroll the grid down, True once the last image is on screen.
+
+    Rows are fetched and laid out in batches, so it takes a few rounds.
+    """
+    view = viewer.thumbnail_view
+    view.scrollToBottom()
+    QApplication.processEvents()
+    rows = view.visible_rows()
+    return len(rows) > 0 and rows.stop == len(viewer.images)
+
+
+def bench_folder(image_dir):
+    from imageman.image_man_window import ImageMan
+    results = {}
+
+    start = time.perf_counter()
+    viewer = ImageMan(image_dir)
+    QApplication.processEvents()
+    results['startup'] = elapsed_ms(start)
+
+    wait_until(lambda: thumbnails_settled(viewer))
+    results['thumbnails_first_screen'] = elapsed_ms(start)
+    # The window starts at the first image's size, use the same size in every run from here on
+    viewer.resize(*WINDOW_SIZE)
+    wait_until(lambda: thumbnails_settled(viewer))
+
+    viewer.dir_index.close()
+    start = time.perf_counter()
+    viewer.images = viewer._get_images()
+    results['get_images'] = elapsed_ms(start)
+
+    start = time.perf_counter()
+    wait_until(lambda: scrolled_to_end(viewer))
+    wait_until(lambda: thumbnails_settled(viewer))
+    results['thumbnails_scroll'] = elapsed_ms(start)
+
+    start = time.perf_counter()
+    viewer.open_thumbnail_in_single_view(viewer.images[0])
+    QApplication.processEvents()
+    results['open_image'] = elapsed_ms(start)
+
+    for name, step in (('next', viewer.next_image), ('prev', viewer.prev_image)):
+        samples = []
+        for _ in range(STEPS):
+            pause(STEP_PAUSE_MS)
+            start = time.perf_counter()
+            step()
+            samples.append(elapsed_ms(start))
+        results[name] = percentiles(samples)
+
+    samples = []
+    for step in [viewer.zoom_in] * ZOOM_STEPS + [viewer.zoom_out] * ZOOM_STEPS:
+        start = time.perf_counter()
+        step()
+        samples.append(elapsed_ms(start))
+    results['zoom'] = percentiles(samples)
+
+    start = time.perf_counter()
+    viewer._rename_all_images(confirm=False)
+    results['rename_all'] = elapsed_ms(start)
+
+    viewer.thumbnail_view_action.setChecked(True)
+    viewer._toggle_thumbnail_view(True)
+    QApplication.processEvents()
+    start = time.perf_counter()
+    viewer.move_thumbnail_images_to_tag(viewer.images[:TAG_MOVE_COUNT], 0)
+    results['tag_move_ui'] = elapsed_ms(start)
+    viewer.file_ops.wait()
+    results['tag_move_total'] = elapsed_ms(start)
+
+    viewer.close()
+    viewer.deleteLater()
+    QApplication.processEvents()
+    return results
+
+
+def flatten(results):
+    """Turn {'next': {'p50': 1.0}} into {'next.p50': 1.0}."""
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            for key, inner in value.items():
+                flat[f'{name}.{key}'] = inner
+        else:
+            flat[name] = value
+    return flat
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def median_run(repeats):
+    """Combine the flattened results of repeated runs, metric by metric."""
+    return {metric: sorted(run[metric] for run in repeats)[len(repeats) // 2] for metric in repeats[0]}
+
+
+def compare(runs, baseline, tolerance, min_ms):
+    """Print the change against baseline and return the metrics that got slower.
+
+    Differences below min_ms are ignored, they are timer noise for the
+    fast operations.
+    """
+    regressions = []
+    print(f"\n{'size':>7} {'metric':<26} {'baseline':>10} {'now':>10} {'change':>8}")
+    for size, results in runs.items():
+        old = baseline.get('runs', {}).get(size)
+        if old is None:
+            continue
+        for metric, value in results.items():
+            before = old.get(metric)
+            if not before:
+                continue
+            change = value / before - 1
+            flag = ''
+            if change > tolerance and value - before > min_ms:
+                flag = '  slower'
+                regressions.append((size, metric))
+            print(f"{size:>7} {metric:<26} {before:>10.1f} {value:>10.1f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma separated image counts')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare with the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against the baseline, 0.2 is 20%%')
+    parser.add_argument('--min-ms', type=float, default=5.0,
+                        help='ignore slowdowns smaller than this many milliseconds')
+    parser.add_argument('--repeat', type=int, default=1, help='run every size this often and keep the median')
+    parser.add_argument('--copy', action='store_true', help='write real copies instead of hard links')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    app = QApplication(sys.argv)  # noqa: F841
+    runs = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Keep the user's caches and any rename journal out of the runs
+        os.environ['IMAGEMAN_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+        template_dir = os.path.join(work_dir, 'templates')
+        os.mkdir(template_dir)
+        templates = make_templates(template_dir)
+        for size in sizes:
+            repeats = []
+            for _ in range(args.repeat):
+                image_dir = os.path.join(work_dir, f'images_{size}')
+                make_folder(image_dir, size, templates, args.copy)
+                shutil.rmtree(os.environ['IMAGEMAN_CACHE_DIR'], ignore_errors=True)
+                repeats.append(flatten(bench_folder(image_dir)))
+                shutil.rmtree(image_dir, ignore_errors=True)
+            runs[str(size)] = median_run(repeats)
+
+    print(f"{'metric':<26}" + ''.join(f'{size:>10}' for size in runs))
+    for metric in next(iter(runs.values())):
+        print(f'{metric:<26}' + ''.join(f'{results[metric]:>10.1f}' for results in runs.values()))
+
+    report = {'meta': metadata(), 'runs': runs}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(runs, json.load(f), args.tolerance, args.min_ms)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
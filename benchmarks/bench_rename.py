@@ -0,0 +1,121 @@
+"""Count the file system calls per file made by "Rename All Images".
+
+Compares the planner in imageman.rename_plan with the previous approach,
+which renamed files one at a time with an exists() probe each and a .tmp
+detour whenever the target was taken. Files are created empty in a
+temporary directory. The planner's journal is a local file and its
+writes are not counted.
+
+Usage: python benchmarks/bench_rename.py [--files N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from imageman.rename_plan import RenameJournal, plan_renames, apply_plan  # noqa: E402
+
+
+class CallCounter:
+    """Counts calls to the os functions that reach the image directory."""
+    NAMES = ('rename', 'remove', 'stat', 'listdir', 'scandir')
+
+    def __init__(self):
+        self.counts = {}
+
+    def __enter__(self):
+        self._saved = {name: getattr(os, name) for name in self.NAMES}
+        self._saved_exists = os.path.exists
+        for name, func in self._saved.items():
+            setattr(os, name, self._wrap(name, func))
+        os.path.exists = self._wrap('exists', self._saved_exists)
+        return self
+
+    def __exit__(self, *exc):
+        for name, func in self._saved.items():
+            setattr(os, name, func)
+        os.path.exists = self._saved_exists
+
+    def _wrap(self, name, func):
+        def counted(*args, **kwargs):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return func(*args, **kwargs)
+        return counted
+
+    def total(self):
+        return sum(self.counts.values())
+
+
+def legacy_rename(directory, mapping):
+    temp_files = {}
+    for old_name, new_name in mapping.items():
+        old_path = os.path.join(directory, old_name)
+        new_path = os.path.join(directory, new_name)
+        if os.path.exists(new_path):
+            temp_path = new_path + '.tmp'
+            os.rename(old_path, temp_path)
+            temp_files[new_path] = temp_path
+        else:
+            os.rename(old_path, new_path)
+    for final_path, temp_path in temp_files.items():
+        os.rename(temp_path, final_path)
+
+
+def planned_rename(directory, mapping, journal_path):
+    steps = plan_renames(mapping, existing=mapping.keys())
+    apply_plan(directory, steps, RenameJournal(journal_path))
+
+
+def scenarios(count):
+    numbered = [f'trip_{i:04d}.jpg' for i in range(1, count + 1)]
+
+    def renumber(order):
+        return {old: f'trip_{i:04d}.jpg' for i, old in enumerate(order, 1)}
+    # A new photo sorted in front pushes every other one down by one
+    inserted = ['new.jpg'] + numbered[:-1]
+    yield 'insert at front', inserted, renumber(inserted)
+    reordered = list(numbered)
+    random.Random(1).shuffle(reordered)
+    yield 'drag-drop shuffle', numbered, renumber(reordered)
+    swapped = list(numbered)
+    swapped[0], swapped[-1] = swapped[-1], swapped[0]
+    yield 'swap two', numbered, renumber(swapped)
+
+
+def run(method, names, mapping):
+    with tempfile.TemporaryDirectory() as directory:
+        image_dir = os.path.join(directory, 'images')
+        os.mkdir(image_dir)
+        for name in names:
+            open(os.path.join(image_dir, name), 'wb').close()
+        mapping = {old: new for old, new in mapping.items() if old.lower() != new.lower()}
+        start = time.perf_counter()
+        with CallCounter() as counter:
+            if method == 'legacy':
+                legacy_rename(image_dir, mapping)
+            else:
+                planned_rename(image_dir, mapping, os.path.join(directory, 'journal', 'rename.journal'))
+        elapsed = time.perf_counter() - start
+    return counter, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=2000)
+    args = parser.parse_args()
+    print(f"{'scenario':<20} {'method':<8} {'renames/file':>13} {'exists/file':>12} {'fs calls/file':>14} {'seconds':>8}")
+    for title, names, mapping in scenarios(args.files):
+        for method in ('legacy', 'planner'):
+            counter, elapsed = run(method, names, mapping)
+            per_file = len(names)
+            print(f"{title:<20} {method:<8} {counter.counts.get('rename', 0) / per_file:>13.3f} "
+                  f"{counter.counts.get('exists', 0) / per_file:>12.3f} {counter.total() / per_file:>14.3f} "
+                  f"{elapsed:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Check the cold start of ImageMan against a time budget.
+
+Starts imageman/main.py on a folder several times with
+IMAGEMAN_STARTUP_REPORT set, which makes it record how long each phase
+took up to the first painted frame:
+
+    imports      Python modules, from the first line of main.py
+    qt_app       creating the QApplication
+    settings     loading the settings
+    window       building the main window and listing the folder
+    first_paint  until the first frame is painted
+
+The median of every phase is compared with BUDGET_MS. A separate
+`python -X importtime` run lists the slowest imports and fails the check
+when one of LAZY_MODULES, which are only needed for slideshow videos, is
+loaded at startup.
+
+The exit code is 1 when the budget is exceeded. Runs use the offscreen
+platform and in-memory settings.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--images DIR] [--output FILE]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MAIN = os.path.join(ROOT, 'imageman', 'main.py')
+BUDGET_MS = {
+    'imports': 400,
+    'qt_app': 150,
+    'settings': 50,
+    'window': 500,
+    'first_paint': 300,
+    'total': 1200,
+}
+LAZY_MODULES = ('moviepy', 'PIL', 'numpy', 'imageio')
+SLOWEST_IMPORTS = 10
+RUN_TIMEOUT_S = 60
+
+
+def environment(work_dir):
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env['IMAGEMAN_SETTINGS'] = 'memory'
+    env['IMAGEMAN_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+    return env
+
+
+def make_images(image_dir, count=50):
+    sys.path.insert(0, ROOT)
+    from PyQt5.QtGui import QImage, QColor
+    os.makedirs(image_dir)
+    for i in range(count):
+        image = QImage(1600, 1200, QImage.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 7 % 360, 160, 200))
+        image.save(os.path.join(image_dir, f'img_{i:04d}.jpg'), 'JPG', 90)
+
+
+def run_once(image_dir, work_dir):
+    """Start the app, wait for its startup report and close it again."""
+    report_path = os.path.join(work_dir, 'startup.json')
+    if os.path.exists(report_path):
+        os.remove(report_path)
+    env = environment(work_dir)
+    env['IMAGEMAN_STARTUP_REPORT'] = report_path
+    process = subprocess.Popen([sys.executable, MAIN, image_dir], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + RUN_TIMEOUT_S
+        while not os.path.exists(report_path):
+            if process.poll() is not None:
+                raise RuntimeError(f'ImageMan exited with code {process.returncode} before painting')
+            if time.monotonic() > deadline:
+                raise TimeoutError('ImageMan did not paint in time')
+            time.sleep(0.05)
+        with open(report_path, encoding='utf-8') as f:
+            report = json.load(f)
+    finally:
+        process.kill()
+        process.wait()
+    phases = dict(report['phases_ms'])
+    phases['total'] = report['total_ms']
+    return phases
+
+
+def import_times(work_dir):
+    """Return [(cumulative ms, module)] for every module main.py imports, slowest first."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import imageman.main'],
+                            cwd=ROOT, env=environment(work_dir), capture_output=True, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative) / 1000, name.strip()))
+    return sorted(times, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--images', help='folder to open, a generated one by default')
+    parser.add_argument('--output', help='write the medians and the slowest imports to this JSON file')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        image_dir = args.images
+        if image_dir is None:
+            image_dir = os.path.join(work_dir, 'images')
+            make_images(image_dir)
+        runs = [run_once(image_dir, work_dir) for _ in range(args.runs)]
+        imports = import_times(work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    medians = {phase: sorted(run[phase] for run in runs)[len(runs) // 2] for phase in runs[0]}
+    over = []
+    print(f"{'phase':<14}{'median':>10}{'budget':>10}")
+    for phase, ms in medians.items():
+        budget = BUDGET_MS.get(phase)
+        flag = ''
+        if budget is not None and ms > budget:
+            flag = '  over budget'
+            over.append(phase)
+        print(f"{phase:<14}{ms:>10.1f}{budget if budget is not None else '':>10}{flag}")
+
+    print('\nSlowest imports (cumulative ms):')
+    for ms, name in imports[:SLOWEST_IMPORTS]:
+        print(f'{ms:>10.1f}  {name}')
+    eager = sorted({name.split('.')[0] for _, name in imports} & set(LAZY_MODULES))
+    if eager:
+        print(f"\nLoaded at startup but only needed for videos: {', '.join(eager)}")
+        over.append('imports of ' + ', '.join(eager))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'phases_ms': medians, 'budget_ms': BUDGET_MS,
+                       'slowest_imports': [{'module': name, 'ms': ms} for ms, name in imports[:SLOWEST_IMPORTS]],
+                       'over_budget': over}, f, indent=2)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,3 +6,38 @@ SUPPORTED_IMAGE_FORMATS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.ti
 FILENAME_LABEL_HEIGHT = 32
 WINDOW_MARGIN = 20
 AVAILABLE_HEIGHT_OFFSET = 52
+THUMBNAIL_SIZE = 128
+THUMBNAIL_PLACEHOLDER_COLOR = '#2c2f34'
+THUMBNAIL_TASKS_PER_WORKER = 2
+THUMBNAIL_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+THUMBNAIL_CACHE_FLUSH_EVERY = 256
+PREFETCH_RADIUS = 2
+PREFETCH_WORKERS = 2
+SCALED_PIXMAP_CACHE_SIZE = 8
+THUMBNAIL_FETCH_BATCH = 256
+THUMBNAIL_ICON_CACHE_SIZE = 1000
+DIRECTORY_RESCAN_DELAY_MS = 500
+SLIDESHOW_FRAME_SIZE = (1920, 1080)
+SLIDESHOW_WORKERS = None  # None uses one worker process per CPU
+SLIDESHOW_FRAMES_PER_WORKER = 2
+SLIDESHOW_VIDEO_FPS = 24
+SLIDESHOW_FRAME_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+FAILURES_SHOWN = 10
+PERF_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+PERF_OVERLAY_INTERVAL_MS = 500
+SETTINGS_SAVE_DELAY_MS = 1000
+DUPLICATE_HASH_SIZE = 32
+DUPLICATE_HASH_BATCH = 256
+DUPLICATE_MAX_DISTANCE = 8  # Of the 64 bits of a perceptual hash
+DUPLICATE_SEARCH_BLOCK = 1 << 20  # Chunk lookups per vectorized search
+DUPLICATE_GROUP_COLORS = ('#3a3f47', '#4a3f2f')
+METADATA_HASH_SAMPLE_BYTES = 64 * 1024
+METADATA_EXAMINE_BATCH = 256
+SORT_ORDERS = (
+    ('name', 'Name'),
+    ('capture_time', 'Capture Date'),
+    ('size', 'File Size'),
+    ('mtime', 'Modified Time'),
+    ('dimensions', 'Dimensions'),
+)
+PROGRESSIVE_IDLE_MS = 150  # Shows closer together than this get a quick preview first
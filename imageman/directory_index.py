@@ -0,0 +1,355 @@
+import os
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, QFileSystemWatcher, QSize, pyqtSignal
+from PyQt5.QtGui import QImageReader, QImageIOHandler
+
+from imageman.constants import SUPPORTED_IMAGE_FORMATS, DIRECTORY_RESCAN_DELAY_MS, METADATA_EXAMINE_BATCH
+from imageman.metadata_index import examine_file
+from imageman import perf
+
+
+@perf.measure('list_dir')
+def scan_directory(image_dir):
+    """List the supported images in image_dir with one os.scandir pass.
+
+    Returns a dict of file name to os.stat_result. On Windows the stat
+    information comes with the directory listing for free.
+    """
+    entries = {}
+    with os.scandir(image_dir) as it:
+        for entry in it:
+            if entry.name.lower().endswith(SUPPORTED_IMAGE_FORMATS):
+                try:
+                    if entry.is_file():
+                        entries[entry.name] = entry.stat()
+                except OSError:
+                    continue
+    return entries
+
+
+@perf.measure('read_header')
+def read_image_size(path):
+    """Return the displayed size of the image at path, reading only its header.
+
+    Returns None when the size cannot be determined without decoding.
+    """
+    reader = QImageReader(path)
+    size = reader.size()
+    if not size.isValid():
+        return None
+    # EXIF rotations by 90 degrees swap width and height once applied
+    if reader.transformation() & QImageIOHandler.TransformationRotate90:
+        size = QSize(size.height(), size.width())
+    return size
+
+
+class _ScanSignals(QObject):
+    scanned = pyqtSignal(int, str, object)
+
+
+class _ScanTask(QRunnable):
+    def __init__(self, signals, generation, image_dir):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.image_dir = image_dir
+
+    def run(self):
+        try:
+            entries = scan_directory(self.image_dir)
+        except OSError:
+            entries = None
+        self.signals.scanned.emit(self.generation, self.image_dir, entries)
+
+
+class _ExamineSignals(QObject):
+    examined = pyqtSignal(int, str, object)
+
+
+class _ExamineTask(QRunnable):
+    def __init__(self, signals, generation, image_dir, names):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.image_dir = image_dir
+        self.names = names
+
+    def run(self):
+        facts = {}
+        for name in self.names:
+            result = examine_file(os.path.join(self.image_dir, name))
+            if result is not None:
+                facts[name] = result
+        self.signals.examined.emit(self.generation, self.image_dir, facts)
+
+
+class DirectoryIndex(QObject):
+    """The list of images in the open directory, kept in memory.
+
+    The directory is listed once when it is opened. After that the index is
+    kept current by our own file operations (add, remove, rename) and by a
+    QFileSystemWatcher, whose notifications trigger a debounced rescan in
+    the background. Rescans that find a difference emit changed with the
+    added, removed and modified names.
+
+    With a MetadataIndex, image sizes and capture times of files that did
+    not change since the folder was last open come from the database. New
+    and changed files are examined again on a worker pool, examined is
+    emitted once all of them are done. Our own removes, renames and moves
+    are written through to the database.
+
+    names() lists the images in one of SORT_ORDERS. Images whose size or
+    capture time is not known yet come last in those orders, files without
+    a capture time are placed by their modification time.
+    """
+    changed = pyqtSignal(list, list, list)
+    examined = pyqtSignal()
+
+    def __init__(self, parent=None, metadata=None):
+        super().__init__(parent)
+        self.metadata = metadata
+        self.image_dir = None
+        self._entries = {}
+        self._sizes = {}
+        self._capture_times = {}
+        self._names = []
+        self._sorted = True
+        self._generation = 0
+        self._paused = False
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._schedule_rescan)
+        self._rescan_timer = QTimer(self)
+        self._rescan_timer.setSingleShot(True)
+        self._rescan_timer.setInterval(DIRECTORY_RESCAN_DELAY_MS)
+        self._rescan_timer.timeout.connect(self._start_rescan)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._signals = _ScanSignals()
+        self._signals.scanned.connect(self._on_scanned)
+        self.examine_pool = QThreadPool(self)
+        self._examine_signals = _ExamineSignals()
+        self._examine_signals.examined.connect(self._on_examined)
+        self._examine_generation = 0
+        self._examining = 0
+
+    def open(self, image_dir):
+        image_dir = os.path.abspath(image_dir)
+        if image_dir == self.image_dir:
+            return
+        if self._watcher.directories():
+            self._watcher.removePaths(self._watcher.directories())
+        # Files of the previous directory that were not examined yet are examined next time
+        self._stop_examining()
+        self.image_dir = image_dir
+        self._set_entries(scan_directory(image_dir))
+        self._sync_metadata()
+        self._watcher.addPath(image_dir)
+
+    def close(self):
+        """Stop watching and wait for a rescan that is still running."""
+        self._rescan_timer.stop()
+        if self._watcher.directories():
+            self._watcher.removePaths(self._watcher.directories())
+        self.image_dir = None
+        self._generation += 1
+        self._stop_examining()
+        self.pool.waitForDone()
+        self.examine_pool.waitForDone()
+
+    def refresh(self):
+        """List the directory again right away, e.g. after a failed batch operation."""
+        if self.image_dir is not None:
+            self._apply(scan_directory(self.image_dir))
+
+    def set_paused(self, paused):
+        """Ignore rescans while our own file operations are still running.
+
+        A rescan in that window would see the disk half way through and
+        undo changes that are already in the index. Unpausing schedules a
+        rescan, which also picks up operations that failed.
+        """
+        self._paused = paused
+        self._generation += 1
+        if not paused:
+            self._rescan_timer.start()
+
+    def names(self, order='name'):
+        if not self._sorted:
+            self._names.sort()
+            self._sorted = True
+        if order == 'size':
+            return sorted(self._names, key=lambda name: self._entries[name].st_size)
+        if order == 'mtime':
+            return sorted(self._names, key=lambda name: self._entries[name].st_mtime_ns)
+        if order == 'dimensions':
+            return sorted(self._names, key=self._pixel_count)
+        if order == 'capture_time':
+            return sorted(self._names, key=self._capture_key)
+        return list(self._names)
+
+    def is_examining(self):
+        return self._examining > 0
+
+    def _pixel_count(self, name):
+        cached = self._sizes.get(name)
+        if cached is None or cached[0] != self._entries[name].st_mtime_ns:
+            return float('inf')
+        return cached[1].width() * cached[1].height()
+
+    def _capture_key(self, name):
+        st = self._entries[name]
+        cached = self._capture_times.get(name)
+        if cached is None or cached[0] != st.st_mtime_ns:
+            return (1, '')
+        # EXIF times have no zone, local time is the closest match
+        return (0, cached[1] or time.strftime('%Y:%m:%d %H:%M:%S', time.localtime(st.st_mtime)))
+
+    def stat(self, name):
+        return self._entries.get(name)
+
+    def image_size(self, name):
+        """Return the QSize of an image from its header, cached until the file changes."""
+        st = self._entries.get(name)
+        if st is None:
+            return None
+        cached = self._sizes.get(name)
+        if cached is not None and cached[0] == st.st_mtime_ns:
+            return cached[1]
+        size = read_image_size(os.path.join(self.image_dir, name))
+        if size is not None:
+            self._sizes[name] = (st.st_mtime_ns, size)
+        return size
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, name, st=None):
+        if st is None:
+            try:
+                st = os.stat(os.path.join(self.image_dir, name))
+            except OSError:
+                return
+        if name not in self._entries:
+            self._names.append(name)
+            self._sorted = False
+        self._entries[name] = st
+        self._touch()
+
+    def remove(self, name):
+        self.remove_many([name])
+
+    def remove_many(self, names):
+        if self.metadata is not None:
+            self.metadata.remove_many(self.image_dir, names)
+        self._forget(names)
+
+    def rename(self, old_name, new_name):
+        self.rename_many({old_name: new_name})
+
+    def rename_many(self, mapping, tag=None):
+        if self.metadata is not None:
+            self.metadata.rename_many(self.image_dir, mapping, tag)
+        # A rename keeps size and mtime, so the stat results carry over.
+        moved = {new: self._entries.pop(old) for old, new in mapping.items() if old in self._entries}
+        self._entries.update(moved)
+        for store in (self._sizes, self._capture_times):
+            moved = {new: store.pop(old) for old, new in mapping.items() if old in store}
+            store.update(moved)
+        self._names = list(self._entries)
+        self._sorted = False
+        self._touch()
+
+    def move_many(self, mapping, tag=None):
+        """Take files moved to {name: new path} elsewhere out of the index."""
+        if self.metadata is not None:
+            self.metadata.move_many(self.image_dir, mapping, tag)
+        self._forget(mapping)
+
+    def _forget(self, names):
+        names = set(names)
+        for name in names:
+            self._entries.pop(name, None)
+            self._sizes.pop(name, None)
+            self._capture_times.pop(name, None)
+        self._names = [name for name in self._names if name not in names]
+        self._touch()
+
+    def _touch(self):
+        # Our own change makes any rescan that is still running out of date,
+        # _on_scanned then schedules a fresh one.
+        self._generation += 1
+
+    def _set_entries(self, entries):
+        self._entries = entries
+        # Sizes of files that changed are checked against their mtime when asked for
+        self._sizes = {name: cached for name, cached in self._sizes.items() if name in entries}
+        self._capture_times = {name: cached for name, cached in self._capture_times.items() if name in entries}
+        self._names = list(entries)
+        self._sorted = False
+        self._generation += 1
+
+    def _schedule_rescan(self, path):
+        self._rescan_timer.start()
+
+    def _start_rescan(self):
+        if self.image_dir is not None and not self._paused:
+            self.pool.start(_ScanTask(self._signals, self._generation, self.image_dir))
+
+    def _on_scanned(self, generation, image_dir, entries):
+        if image_dir != self.image_dir:
+            return
+        if generation != self._generation:
+            self._rescan_timer.start()
+            return
+        if entries is not None:
+            self._apply(entries)
+
+    def _apply(self, entries):
+        added = [name for name in entries if name not in self._entries]
+        removed = [name for name in self._entries if name not in entries]
+        modified = [name for name, st in entries.items()
+                    if name in self._entries and (st.st_mtime_ns != self._entries[name].st_mtime_ns
+                                                  or st.st_size != self._entries[name].st_size)]
+        if added or removed or modified:
+            self._set_entries(entries)
+            self._sync_metadata()
+            self.changed.emit(sorted(added), sorted(removed), sorted(modified))
+
+    def _sync_metadata(self):
+        if self.metadata is None:
+            return
+        records, stale = self.metadata.sync(self.image_dir, self._entries)
+        for name, record in records.items():
+            if record.width is not None and name not in self._sizes:
+                self._sizes[name] = (record.mtime_ns, QSize(record.width, record.height))
+            self._capture_times[name] = (record.mtime_ns, record.capture_time)
+        for i in range(0, len(stale), METADATA_EXAMINE_BATCH):
+            self._examining += 1
+            self.examine_pool.start(_ExamineTask(self._examine_signals, self._examine_generation, self.image_dir,
+                                                 stale[i:i + METADATA_EXAMINE_BATCH]))
+
+    def _stop_examining(self):
+        self.examine_pool.clear()
+        self._examine_generation += 1
+        self._examining = 0
+
+    def _on_examined(self, generation, image_dir, facts):
+        if self.metadata is None or self.image_dir is None:
+            return
+        self.metadata.update(image_dir, facts)
+        if generation != self._examine_generation:
+            return
+        for name, (size, mtime_ns, width, height, _, _, capture_time) in facts.items():
+            st = self._entries.get(name)
+            if st is None or st.st_mtime_ns != mtime_ns:
+                continue
+            if width is not None:
+                self._sizes[name] = (mtime_ns, QSize(width, height))
+            self._capture_times[name] = (mtime_ns, capture_time)
+        self._examining -= 1
+        if self._examining == 0:
+            self.examined.emit()
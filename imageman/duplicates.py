@@ -0,0 +1,257 @@
+import os
+import itertools
+
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from imageman.constants import (
+    DUPLICATE_HASH_SIZE, DUPLICATE_HASH_BATCH, DUPLICATE_MAX_DISTANCE, DUPLICATE_SEARCH_BLOCK
+)
+from imageman import perf
+
+_dct_matrix = None
+
+
+def read_hash_image(path, size=DUPLICATE_HASH_SIZE):
+    """Decode path straight to a size x size grayscale image, ignoring its aspect ratio."""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    reader.setScaledSize(QSize(size, size))
+    image = reader.read()
+    if image.isNull():
+        return None
+    if image.width() != size or image.height() != size:
+        # Some formats ignore the scaled size
+        image = image.scaled(size, size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    return image.convertToFormat(QImage.Format_Grayscale8)
+
+
+@perf.measure('duplicate_hash')
+def hash_images(images):
+    """Return the 64 bit perceptual hash of every image in images.
+
+    All images are hashed together: they are stacked into one array, the
+    2D DCT of each is taken with two matrix products, and every bit says
+    whether one of the 8 x 8 lowest frequencies is above the median of the
+    64. Small changes in exposure, compression or size barely move those.
+    """
+    # Only needed here, importing it makes startup slower
+    import numpy as np
+    global _dct_matrix
+    if not images:
+        return []
+    size = images[0].width()
+    pixels = np.empty((len(images), size, size), dtype=np.float32)
+    for i, image in enumerate(images):
+        bits = image.constBits()
+        bits.setsize(image.bytesPerLine() * size)
+        pixels[i] = np.frombuffer(bits, np.uint8).reshape(size, image.bytesPerLine())[:, :size]
+    if _dct_matrix is None or _dct_matrix.shape[0] != size:
+        k = np.arange(size)[:, None]
+        n = np.arange(size)[None, :]
+        _dct_matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)).astype(np.float32)
+    low = (_dct_matrix @ pixels @ _dct_matrix.T)[:, :8, :8].reshape(len(images), 64)
+    bits = low > np.median(low, axis=1)[:, None]
+    packed = np.packbits(bits, axis=1).view('>u8').ravel()
+    return [int(h) for h in packed]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def near_pairs(values, max_distance):
+    """Return every pair (i, j), i < j, of values within max_distance bits of each other.
+
+    A multi-index search: the 64 bits are cut into three chunks, and two
+    hashes at most max_distance apart differ in at most max_distance // 3
+    bits of one of them. For each chunk the values are bucketed by that
+    chunk once, and the buckets of every chunk value that close to each
+    value are looked up in one vectorized gather. Only the candidates
+    found that way have their full distance checked, instead of all
+    n * n pairs.
+    """
+    import numpy as np
+    hashes = np.asarray(values, dtype=np.uint64)
+    n = len(hashes)
+    if n < 2:
+        return []
+    found = []
+    for low_bit, width in ((0, 22), (22, 21), (43, 21)):
+        masks = np.array([sum(1 << bit for bit in bits)
+                          for k in range(max_distance // 3 + 1)
+                          for bits in itertools.combinations(range(width), k)], dtype=np.int64)
+        chunks = ((hashes >> np.uint64(low_bit)) & np.uint64((1 << width) - 1)).astype(np.int64)
+        order = np.argsort(chunks, kind='stable')
+        # Where each chunk value starts in the sorted order and how often it occurs
+        bucket_sizes = np.bincount(chunks, minlength=1 << width)
+        bucket_starts = np.cumsum(bucket_sizes) - bucket_sizes
+        rows = max(1, DUPLICATE_SEARCH_BLOCK // len(masks))
+        for start in range(0, n, rows):
+            wanted = (chunks[start:start + rows, None] ^ masks[None, :]).ravel()
+            lo = bucket_starts[wanted]
+            counts = bucket_sizes[wanted]
+            total = int(counts.sum())
+            if not total:
+                continue
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            first = np.repeat(start + np.arange(len(wanted)) // len(masks), counts)
+            second = order[np.repeat(lo, counts) + offsets]
+            keep = first < second
+            found.append(first[keep] * n + second[keep])
+    if not found:
+        return []
+    pairs = np.unique(np.concatenate(found))
+    first, second = pairs // n, pairs % n
+    differing = np.unpackbits((hashes[first] ^ hashes[second]).view(np.uint8).reshape(-1, 8), axis=1)
+    close = differing.sum(axis=1) <= max_distance
+    return list(zip(first[close].tolist(), second[close].tolist()))
+
+
+@perf.measure('duplicate_groups')
+def group_duplicates(hashes, max_distance=DUPLICATE_MAX_DISTANCE):
+    """Group names whose hashes are within max_distance of each other.
+
+    hashes maps name to hash, in the order the names are listed. Returns
+    the groups of two or more names, each in that order, ordered by their
+    first name. Near duplicates chain: a frame close to the next one ends
+    up in the same group as it.
+    """
+    names = list(hashes)
+    parent = list(range(len(names)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in near_pairs([hashes[name] for name in names], max_distance):
+        a, b = find(i), find(j)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    groups = {}
+    for i, name in enumerate(names):
+        groups.setdefault(find(i), []).append(name)
+    # The root of each group is its first name
+    return [groups[root] for root in sorted(groups) if len(groups[root]) > 1]
+
+
+class _FinderSignals(QObject):
+    hashed = pyqtSignal(int, object)
+    grouped = pyqtSignal(int, str, list)
+
+
+class _HashTask(QRunnable):
+    def __init__(self, signals, generation, image_dir, names):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.image_dir = image_dir
+        self.names = names
+
+    def run(self):
+        decoded = []
+        for name in self.names:
+            image = read_hash_image(os.path.join(self.image_dir, name))
+            if image is not None:
+                decoded.append((name, image))
+        hashes = hash_images([image for _, image in decoded])
+        self.signals.hashed.emit(self.generation, dict(zip((name for name, _ in decoded), hashes)))
+
+
+class _GroupTask(QRunnable):
+    def __init__(self, signals, generation, image_dir, hashes):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.image_dir = image_dir
+        self.hashes = hashes
+
+    def run(self):
+        self.signals.grouped.emit(self.generation, self.image_dir, group_duplicates(self.hashes))
+
+
+class DuplicateFinder(QObject):
+    """Finds the duplicate and near duplicate images of a directory in the background.
+
+    Images are hashed in batches of DUPLICATE_HASH_BATCH on a worker pool
+    and then grouped on it as well. Hashes are kept by path, modification
+    time and size, so searching the same folder again only decodes the
+    files that changed. found is emitted on the GUI thread with the
+    directory and its groups.
+    """
+    found = pyqtSignal(str, list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self._signals = _FinderSignals()
+        self._signals.hashed.connect(self._on_hashed)
+        self._signals.grouped.connect(self._on_grouped)
+        self._generation = 0
+        self._hashes = {}
+        self._image_dir = None
+        self._names = []
+        self._stats = {}
+        self._waiting = 0
+        self._running = False
+
+    def find(self, image_dir, stats):
+        """Search image_dir, stats maps each image name to its os.stat_result in listing order."""
+        self.cancel()
+        self._running = True
+        self._image_dir = image_dir
+        self._names = list(stats)
+        self._stats = stats
+        # Only the hashes of this listing are kept, a changed file gets a new key
+        keys = {self._key(name) for name in self._names}
+        self._hashes = {key: value for key, value in self._hashes.items() if key in keys}
+        missing = [name for name in self._names if self._key(name) not in self._hashes]
+        batches = [missing[i:i + DUPLICATE_HASH_BATCH] for i in range(0, len(missing), DUPLICATE_HASH_BATCH)]
+        self._waiting = len(batches)
+        for batch in batches:
+            self.pool.start(_HashTask(self._signals, self._generation, image_dir, batch))
+        if not batches:
+            self._group()
+
+    def cancel(self):
+        self._generation += 1
+        self._waiting = 0
+        self._running = False
+        self.pool.clear()
+
+    def close(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+    def is_running(self):
+        return self._running
+
+    def _key(self, name):
+        st = self._stats[name]
+        return (os.path.join(self._image_dir, name), st.st_mtime_ns, st.st_size)
+
+    def _on_hashed(self, generation, hashes):
+        if generation != self._generation:
+            return
+        for name, value in hashes.items():
+            self._hashes[self._key(name)] = value
+        self._waiting -= 1
+        if self._waiting == 0:
+            self._group()
+
+    def _group(self):
+        hashes = {}
+        for name in self._names:
+            value = self._hashes.get(self._key(name))
+            if value is not None:
+                hashes[name] = value
+        self.pool.start(_GroupTask(self._signals, self._generation, self._image_dir, hashes))
+
+    def _on_grouped(self, generation, image_dir, groups):
+        if generation != self._generation:
+            return
+        self._running = False
+        self.found.emit(image_dir, groups)
@@ -0,0 +1,139 @@
+import os
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QCoreApplication, pyqtSignal
+
+
+def _remove(path, _):
+    os.remove(path)
+
+
+def _rename(old_path, new_path):
+    # os.rename silently replaces an existing file on POSIX, never let it
+    if os.path.exists(new_path):
+        raise FileExistsError(f'{new_path} already exists')
+    os.rename(old_path, new_path)
+
+
+def _move(old_path, new_path):
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    _rename(old_path, new_path)
+
+
+_OPERATIONS = {
+    'remove': (_remove, 'Error deleting image'),
+    'rename': (_rename, 'Error renaming image'),
+    'move': (_move, 'Error moving image'),
+}
+
+
+class _OperationSignals(QObject):
+    done = pyqtSignal(str)
+
+
+class _OperationTask(QRunnable):
+    def __init__(self, signals, kind, path, new_path, landed):
+        super().__init__()
+        self.signals = signals
+        self.kind = kind
+        self.path = path
+        self.new_path = new_path
+        self.landed = landed
+
+    def run(self):
+        operation, description = _OPERATIONS[self.kind]
+        try:
+            operation(self.path, self.new_path)
+            error = ''
+        except Exception as e:
+            error = f'{description} {os.path.basename(self.path)}: {e}'
+        self.landed(self.kind)
+        self.signals.done.emit(error)
+
+
+class FileOperationQueue(QObject):
+    """Runs deletes, renames and moves on one background thread.
+
+    Callers update their own state right away and leave the disk work to
+    the queue. A single worker runs the operations strictly in the order
+    they were queued, so a rename followed by a move of the same file can
+    never overtake each other. busy_changed tells when work starts and
+    stops, and finished hands back the error messages of the operations
+    that failed since the queue was last idle. Until a rename or move has
+    run, source_path() tells where its file still is.
+    """
+    busy_changed = pyqtSignal(bool)
+    finished = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._signals = _OperationSignals()
+        self._signals.done.connect(self._on_done)
+        self._pending = 0
+        self._failures = []
+        # (old path, new path) of the renames and moves that have not run yet
+        self._moves = []
+        self._moves_lock = threading.Lock()
+
+    def remove(self, path):
+        self._submit('remove', path, None)
+
+    def rename(self, old_path, new_path):
+        self._submit('rename', old_path, new_path)
+
+    def move(self, old_path, new_path):
+        """Rename into another directory, creating it if needed."""
+        self._submit('move', old_path, new_path)
+
+    def pending(self):
+        return self._pending
+
+    def source_path(self, path):
+        """Return where the file that will end up at path is on disk right now.
+
+        That is path itself unless a queued rename or move still has to
+        bring a file there. Safe to call from any thread.
+        """
+        with self._moves_lock:
+            for old_path, new_path in reversed(self._moves):
+                if new_path == path:
+                    path = old_path
+        return path
+
+    def is_pending(self, path):
+        """Whether a queued rename or move still has to move a file to or from path."""
+        with self._moves_lock:
+            return any(path in move for move in self._moves)
+
+    def wait(self):
+        """Block until every queued operation has run and been reported."""
+        self.pool.waitForDone()
+        # The results are queued to this thread, deliver them now
+        while self._pending:
+            QCoreApplication.processEvents()
+
+    def _submit(self, kind, path, new_path):
+        self._pending += 1
+        if self._pending == 1:
+            self.busy_changed.emit(True)
+        if new_path is not None:
+            with self._moves_lock:
+                self._moves.append((path, new_path))
+        self.pool.start(_OperationTask(self._signals, kind, path, new_path, self._landed))
+
+    def _landed(self, kind):
+        # Runs on the worker right after the operation, which ran in queue order
+        if kind != 'remove':
+            with self._moves_lock:
+                self._moves.pop(0)
+
+    def _on_done(self, error):
+        self._pending -= 1
+        if error:
+            self._failures.append(error)
+        if self._pending == 0:
+            failures, self._failures = self._failures, []
+            self.busy_changed.emit(False)
+            self.finished.emit(failures)
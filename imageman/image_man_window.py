@@ -1,32 +1,69 @@
 import os
-import winreg
-import tempfile
-import shutil
+import time
+import hashlib
+from collections import OrderedDict
 from PyQt5.QtWidgets import (
     QMainWindow, QLabel, QMenuBar, QAction, QDialog,
     QVBoxLayout, QLineEdit, QPushButton, QMessageBox, QWidget, QFileDialog,
-    QListWidget, QListWidgetItem, QScrollArea, QApplication, QInputDialog
+    QScrollArea, QApplication, QInputDialog, QActionGroup
 )
-from PyQt5.QtGui import QPixmap, QIcon
+from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt, QSize, QTimer
 
-from PIL import Image, ImageDraw
-from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
-
-from imageman.widgets import ImageLabel, DragDropListWidget
+from imageman.widgets import ImageLabel, ThumbnailListView, PerfOverlay
 from imageman.dialogs import TagConfigDialog
+from imageman.thumbnails import ThumbnailLoader
+from imageman.thumbnail_cache import ThumbnailCache, default_cache_dir
+from imageman.thumbnail_model import ThumbnailModel
+from imageman.prefetch import DecodeAheadBuffer, read_image
+from imageman.pyramid import ImagePyramid, SmoothScaler
+from imageman.directory_index import DirectoryIndex
+from imageman.duplicates import DuplicateFinder
+from imageman.sequence import SequenceAllocator, list_directory
+from imageman.metadata_index import MetadataIndex
+from imageman.file_ops import FileOperationQueue
+from imageman.rename_plan import RenameJournal, plan_renames, apply_plan, resume_plan, rollback_plan
+from imageman.settings import Settings
+from imageman import perf
 from imageman.constants import *
 
 
 class ImageMan(QMainWindow):
-    def __init__(self, image_dir):
+    def __init__(self, image_dir, settings=None):
         super().__init__()
-        self.recent_dirs = self._load_recent_dirs_from_registry()
+        self.settings = settings if settings is not None else Settings(parent=self)
+        QApplication.instance().aboutToQuit.connect(self._on_about_to_quit)
+        self.recent_dirs = self._load_recent_dirs()
         self.image_dir = image_dir
         self._add_to_recent_dirs(self.image_dir)
+        self.metadata = MetadataIndex()
+        self.dir_index = DirectoryIndex(self, self.metadata)
+        self.dir_index.changed.connect(self._on_directory_changed)
+        self.dir_index.examined.connect(self._on_files_examined)
+        self.sort_order = self._load_sort_order()
+        self.file_ops = FileOperationQueue(self)
+        self.file_ops.busy_changed.connect(self.dir_index.set_paused)
+        self.file_ops.finished.connect(self._on_file_ops_finished)
+        self.duplicate_groups = None
+        self.duplicate_finder = DuplicateFinder(self)
+        self.duplicate_finder.found.connect(self._on_duplicates_found)
         self.images = self._get_images()
         self.current_index = 0
-        self.show_filenames = self._load_show_filenames_from_registry()
+        self._direction = 1
+        self.decode_buffer = DecodeAheadBuffer(PREFETCH_RADIUS, self)
+        self._source_path = None
+        self._source_image = None
+        self._pyramid = None
+        self._scaled_pixmaps = OrderedDict()
+        self._last_shown = 0.0
+        self._smooth_size = None
+        self._smooth_timer = QTimer(self)
+        self._smooth_timer.setSingleShot(True)
+        self._smooth_timer.setInterval(PROGRESSIVE_IDLE_MS)
+        self._smooth_timer.timeout.connect(self._start_smooth_scale)
+        self.smooth_scaler = SmoothScaler(self)
+        self.smooth_scaler.scaled.connect(self._on_smooth_scaled)
+        self.show_filenames = self._load_show_filenames()
         self.filename_label = QLabel(self)
         self.filename_label.setAlignment(Qt.AlignCenter)
         font = self.filename_label.font()
@@ -53,28 +90,20 @@ class ImageMan(QMainWindow):
         container.setLayout(layout)
         container.setMinimumSize(0, 0)
         self.setCentralWidget(container)
+        self.perf_overlay = PerfOverlay(container)
+        self._perf_dumped = False
 
         self.setWindowTitle('ImageMan')
-        self.tags = self._load_tags_from_registry()
-        self.tag_counters = {tag: 1 for tag in self.tags}
-        self.slideshow_duration = self._load_slideshow_duration_from_registry()
+        self.tags = self._load_tags()
+        self.sequences = SequenceAllocator(self._list_names)
+        self.slideshow_duration = self._load_slideshow_duration()
         self.slideshow_timer = QTimer(self)
         self.slideshow_timer.timeout.connect(self.next_image)
         self.zoom_factor = 1.0
         self._init_menu()
         self._apply_dark_theme()
 
-        if self.images:
-            img_path = os.path.join(self.image_dir, self.images[0])
-            pixmap = QPixmap(img_path)
-            if not pixmap.isNull():
-                img_w, img_h = pixmap.width(), pixmap.height()
-                label_h = FILENAME_LABEL_HEIGHT
-                self._initial_win_width = img_w + WINDOW_MARGIN
-                self._initial_win_height = img_h + label_h + WINDOW_MARGIN
-                self.resize(self._initial_win_width, self._initial_win_height)
-        else:
-            self.resize(800, 600)
+        self._fit_window_to_first_image()
 
         self.setMinimumSize(0, 0)
         # Always start in thumbnail view, and handle rename prompt
@@ -82,23 +111,12 @@ class ImageMan(QMainWindow):
         self._toggle_thumbnail_view(True) # This will call _update_thumbnail_view
         self.show()
 
-    def _load_recent_dirs_from_registry(self):
-        try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\\ImageMan", 0, winreg.KEY_READ) as key:
-                dirs_str, _ = winreg.QueryValueEx(key, "recent_dirs")
-                dirs = dirs_str.split(';')
-                return [d for d in dirs if d.strip()]
-        except Exception:
-            pass
-        return []
+    def _load_recent_dirs(self):
+        dirs = self.settings.get('recent_dirs', '').split(';')
+        return [d for d in dirs if d.strip()]
 
-    def _save_recent_dirs_to_registry(self):
-        try:
-            with winreg.CreateKey(winreg.HKEY_CURRENT_USER, r"Software\\ImageMan") as key:
-                dirs_str = ';'.join(self.recent_dirs)
-                winreg.SetValueEx(key, "recent_dirs", 0, winreg.REG_SZ, dirs_str)
-        except Exception:
-            pass
+    def _save_recent_dirs(self):
+        self.settings.set('recent_dirs', ';'.join(self.recent_dirs))
 
     def _add_to_recent_dirs(self, dir_path):
         dir_path = os.path.abspath(dir_path)
@@ -106,7 +124,7 @@ class ImageMan(QMainWindow):
             self.recent_dirs.remove(dir_path)
         self.recent_dirs.insert(0, dir_path)
         self.recent_dirs = self.recent_dirs[:RECENT_DIRS_LIMIT]
-        self._save_recent_dirs_to_registry()
+        self._save_recent_dirs()
         self._update_recent_dirs_menu()
 
     def _update_recent_dirs_menu(self):
@@ -120,26 +138,29 @@ class ImageMan(QMainWindow):
 
     def _open_recent_dir(self, dir_path):
         if os.path.isdir(dir_path):
+            self._clear_duplicate_groups()
             self.image_dir = dir_path
             self.images = self._get_images()
             self.current_index = 0
+            self._invalidate_decoded_images()
             self.zoom_factor = 1.0
-            self._initial_win_height = None
-            self._initial_win_width = None
-            if self.images:
-                img_path = os.path.join(self.image_dir, self.images[0])
-                pixmap = QPixmap(img_path)
-                if not pixmap.isNull():
-                    img_w, img_h = pixmap.width(), pixmap.height()
-                    label_h = FILENAME_LABEL_HEIGHT
-                    self._initial_win_width = img_w + WINDOW_MARGIN
-                    self._initial_win_height = img_h + label_h + WINDOW_MARGIN
-                    self.resize(self._initial_win_width, self._initial_win_height)
-            else:
-                self.resize(800, 600)
+            self._fit_window_to_first_image()
             self._add_to_recent_dirs(dir_path)
             self._show_image()
 
+    def _fit_window_to_first_image(self):
+        """Size the window around the first image, reading only its header."""
+        self._initial_win_height = None
+        self._initial_win_width = None
+        if not self.images:
+            self.resize(800, 600)
+            return
+        size = self.dir_index.image_size(self.images[0])
+        if size is not None and not size.isEmpty():
+            self._initial_win_width = size.width() + WINDOW_MARGIN
+            self._initial_win_height = size.height() + FILENAME_LABEL_HEIGHT + WINDOW_MARGIN
+            self.resize(self._initial_win_width, self._initial_win_height)
+
     def move_current_image_to_tag(self, idx):
         """
         Move the current image to a subdirectory named after the tag (creating it if needed),
@@ -149,42 +170,51 @@ class ImageMan(QMainWindow):
             return
         tag = self.tags[idx]
         old_name = self.images[self.current_index]
-        ext = os.path.splitext(old_name)[1]
-        tag_dir = os.path.abspath(os.path.join(self.image_dir, tag))
-        try:
-            if not os.path.isdir(tag_dir):
-                os.makedirs(tag_dir)
-        except Exception as e:
-            QMessageBox.warning(self, 'Error', f'Error creating directory: {e}')
-            return
-        existing = [f for f in os.listdir(tag_dir) if f.lower().endswith(ext.lower()) and f.startswith(tag + '_')]
-        max_seq = 0
-        for f in existing:
-            try:
-                seq_part = f[len(tag)+1:f.rfind('.')] 
-                seq = int(seq_part)
-                if seq > max_seq:
-                    max_seq = seq
-            except Exception:
-                continue
-        seq = max_seq + 1
-        new_name = f"{tag}_{seq:04d}{ext}"
+        new_path = self._tag_folder_path(tag, old_name)
         old_path = os.path.join(self.image_dir, old_name)
-        new_path = os.path.join(tag_dir, new_name)
-        while os.path.exists(new_path):
-            seq += 1
-            new_name = f"{tag}_{seq:04d}{ext}"
-            new_path = os.path.join(tag_dir, new_name)
-        try:
-            os.rename(old_path, new_path)
-        except Exception as e:
-            QMessageBox.warning(self, 'Error', f'Error moving image: {e}')
-            return
+        self.file_ops.move(old_path, new_path)
+        self._forget_decoded_image(old_path)
+        self.dir_index.move_many({old_name: new_path}, tag)
         del self.images[self.current_index]
         if self.current_index >= len(self.images):
             self.current_index = 0 if self.images else 0
         self._show_image()
 
+    def _next_tag_path(self, directory, tag, old_name):
+        """Return the path for the next free tag_NNNN name in directory.
+
+        The file operation queue refuses to overwrite an existing file, if
+        another program took the name the rename fails and the directory
+        is listed again next time.
+        """
+        ext = os.path.splitext(old_name)[1]
+        return os.path.join(directory, self.sequences.next_name(directory, tag, ext))
+
+    def _list_names(self, directory):
+        """Existing names for the sequence numbers, those of the open directory come from the index."""
+        if os.path.abspath(directory) == self.dir_index.image_dir:
+            return self.dir_index.names()
+        return list_directory(directory)
+
+    def _tag_folder_path(self, tag, old_name):
+        """Return the image's new path in the tag's subdirectory, which the move creates if needed."""
+        tag_dir = os.path.abspath(os.path.join(self.image_dir, tag))
+        return self._next_tag_path(tag_dir, tag, old_name)
+
+    def _on_file_ops_finished(self, failures):
+        if not failures:
+            return
+        # The rescan that follows brings the lists back in line with the disk
+        self.sequences.forget()
+        self._show_failures('Error', '', failures)
+
+    def _show_failures(self, title, header, failures):
+        """Report many failed files in one warning, listing the first few."""
+        shown = failures[:FAILURES_SHOWN]
+        if len(failures) > len(shown):
+            shown.append(f"... and {len(failures) - len(shown)} more")
+        QMessageBox.warning(self, title, header + "\n".join(shown))
+
     def resizeEvent(self, event):
         if self.isVisible() and hasattr(self, '_initial_win_height') and self._initial_win_height is not None and self._initial_win_width is not None:
             self._initial_win_width = self.width()
@@ -192,57 +222,38 @@ class ImageMan(QMainWindow):
             self._show_image()
         super().resizeEvent(event)
 
-    def _load_tags_from_registry(self):
-        try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\\ImageMan", 0, winreg.KEY_READ) as key:
-                tags_str, _ = winreg.QueryValueEx(key, "tags")
-                tags = tags_str.split(';')
-                if len(tags) == NUM_TAGS:
-                    return tags
-        except Exception:
-            pass
+    def _load_tags(self):
+        tags = self.settings.get('tags', '').split(';')
+        if len(tags) == NUM_TAGS:
+            return tags
         return ['tag1', 'tag2', 'tag3', 'tag4', 'tag5']
 
-    def _save_tags_to_registry(self):
-        try:
-            with winreg.CreateKey(winreg.HKEY_CURRENT_USER, r"Software\\ImageMan") as key:
-                tags_str = ';'.join(self.tags)
-                winreg.SetValueEx(key, "tags", 0, winreg.REG_SZ, tags_str)
-        except Exception:
-            pass
+    def _save_tags(self):
+        self.settings.set('tags', ';'.join(self.tags))
 
-    def _load_slideshow_duration_from_registry(self):
+    def _load_slideshow_duration(self):
         try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\\ImageMan", 0, winreg.KEY_READ) as key:
-                duration, _ = winreg.QueryValueEx(key, "slideshow_duration")
-                return float(duration)
-        except Exception:
-            pass
-        return DEFAULT_SLIDESHOW_DURATION # Default duration
+            return float(self.settings.get('slideshow_duration'))
+        except (TypeError, ValueError):
+            return DEFAULT_SLIDESHOW_DURATION
 
-    def _save_slideshow_duration_to_registry(self):
-        try:
-            with winreg.CreateKey(winreg.HKEY_CURRENT_USER, r"Software\\ImageMan") as key:
-                winreg.SetValueEx(key, "slideshow_duration", 0, winreg.REG_SZ, str(self.slideshow_duration))
-        except Exception:
-            pass
+    def _save_slideshow_duration(self):
+        self.settings.set('slideshow_duration', self.slideshow_duration)
 
-    def _load_show_filenames_from_registry(self):
-        try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\\ImageMan", 0, winreg.KEY_READ) as key:
-                show_filenames_str, _ = winreg.QueryValueEx(key, "show_filenames")
-                return show_filenames_str == "True"
-        except Exception:
-            pass
-        return True  # Default to showing filenames
+    def _load_sort_order(self):
+        order = self.settings.get('sort_order', 'name')
+        return order if order in dict(SORT_ORDERS) else 'name'
 
-    def _save_show_filenames_to_registry(self):
-        try:
-            with winreg.CreateKey(winreg.HKEY_CURRENT_USER, r"Software\\ImageMan") as key:
-                winreg.SetValueEx(key, "show_filenames", 0, winreg.REG_SZ, str(self.show_filenames))
-        except Exception:
-            pass
+    def _save_sort_order(self):
+        self.settings.set('sort_order', self.sort_order)
+
+    def _load_show_filenames(self):
+        return self.settings.get('show_filenames', 'True') == 'True'
+
+    def _save_show_filenames(self):
+        self.settings.set('show_filenames', self.show_filenames)
 
+    @perf.measure('show_image')
     def _show_image(self):
         if not self.images:
             QMessageBox.information(self, 'No Images', 'No images found in this directory.')
@@ -254,12 +265,16 @@ class ImageMan(QMainWindow):
         img_path = os.path.join(self.image_dir, img_name)
         self.filename_label.setText(img_name)
         self.filename_label.setVisible(self.show_filenames)
-        pixmap = QPixmap(img_path)
-        if pixmap.isNull():
+        image = self._load_source_image(img_path)
+        if image.isNull():
             QMessageBox.warning(self, 'Image Load Error', f'Cannot load image: {img_name}. It might be corrupted or an unsupported format.')
             self.label.clear() # Clear any previous image
             return
-        img_w, img_h = pixmap.width(), pixmap.height()
+        # Large images are decoded at a reduced size, lay out with the real one
+        full_size = self.dir_index.image_size(img_name)
+        if full_size is None or full_size.isEmpty():
+            full_size = image.size()
+        img_w, img_h = full_size.width(), full_size.height()
         scaled_w = int(img_w * self.zoom_factor)
         scaled_h = int(img_h * self.zoom_factor)
         available_w = max(1, self.centralWidget().width() - 20)
@@ -268,24 +283,171 @@ class ImageMan(QMainWindow):
             ratio = min(available_w / scaled_w, available_h / scaled_h, 1.0)
             scaled_w = int(scaled_w * ratio)
             scaled_h = int(scaled_h * ratio)
-        scaled_pixmap = pixmap.scaled(scaled_w, scaled_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.label.setPixmap(scaled_pixmap)
+        if (scaled_w > image.width() or scaled_h > image.height()) and image.width() < img_w:
+            # Shown larger than the reduced decode, fetch more detail
+            self._load_source_image(img_path, QSize(scaled_w, scaled_h))
+        self._show_scaled(scaled_w, scaled_h)
+
+    def _show_scaled(self, width, height):
+        """Show the current image at width x height.
+
+        Shows that follow each other within PROGRESSIVE_IDLE_MS, like a held
+        arrow key, get a quick unfiltered preview. Once they stop, the
+        smooth scale is made on a worker thread and replaces the preview.
+        """
+        self._smooth_timer.stop()
+        self.smooth_scaler.cancel()
+        now = time.perf_counter()
+        streaming = (now - self._last_shown) * 1000 < PROGRESSIVE_IDLE_MS
+        self._last_shown = now
+        scaled_pixmap = self._scaled_pixmaps.get((width, height))
+        perf.stats.count('scaled_pixmaps', scaled_pixmap is not None)
+        if scaled_pixmap is not None:
+            self._scaled_pixmaps.move_to_end((width, height))
+        elif streaming:
+            with perf.stats.timed('preview'):
+                scaled_pixmap = QPixmap.fromImage(self._pyramid.preview(width, height))
+            self._smooth_size = (width, height)
+            self._smooth_timer.start()
+        else:
+            with perf.stats.timed('scale'):
+                scaled_pixmap = QPixmap.fromImage(self._pyramid.scaled(width, height))
+            self._remember_scaled_pixmap(width, height, scaled_pixmap)
+        with perf.stats.timed('set_pixmap'):
+            self.label.setPixmap(scaled_pixmap)
+
+    def _remember_scaled_pixmap(self, width, height, pixmap):
+        self._scaled_pixmaps[(width, height)] = pixmap
+        if len(self._scaled_pixmaps) > SCALED_PIXMAP_CACHE_SIZE:
+            self._scaled_pixmaps.popitem(last=False)
+
+    def _start_smooth_scale(self):
+        if self._pyramid is not None:
+            width, height = self._smooth_size
+            self.smooth_scaler.request(self._pyramid, width, height)
+
+    def _on_smooth_scaled(self, image):
+        # Anything shown in between cancels the request, so this is still the current image and size
+        pixmap = QPixmap.fromImage(image)
+        self._remember_scaled_pixmap(*self._smooth_size, pixmap)
+        with perf.stats.timed('set_pixmap'):
+            self.label.setPixmap(pixmap)
+
+    def _load_source_image(self, img_path, min_size=None):
+        # Zoom and resize only rescale the image that is already decoded,
+        # from the nearest level of its pyramid. Images are decoded no
+        # larger than the screen, min_size asks for a larger decode of the
+        # current image when that is not enough.
+        if img_path != self._source_path:
+            self.decode_buffer.max_size = self._decode_limit()
+            image = self.decode_buffer.get(img_path)
+            perf.stats.count('decode_buffer', image is not None)
+            if image is None:
+                image = self._read_image(img_path, self.decode_buffer.max_size)
+                self.decode_buffer.put(img_path, image)
+            self.decode_buffer.update(self.image_dir, self.images, self.current_index, self._direction)
+        elif min_size is not None:
+            image = self._read_image(img_path, min_size.expandedTo(self._decode_limit()))
+            self.decode_buffer.put(img_path, image)
+        else:
+            return self._source_image
+        if image.isNull():
+            return image
+        self._source_path = img_path
+        self._source_image = image
+        self._pyramid = ImagePyramid(image)
+        self._scaled_pixmaps.clear()
+        return image
+
+    def _read_image(self, img_path, max_size):
+        # A renamed or moved file stays at its old path until the queue gets to it
+        source = self.file_ops.source_path(img_path)
+        image = read_image(source, max_size)
+        if image.isNull() and source != img_path:
+            # The operation ran while the file was being read
+            image = read_image(img_path, max_size)
+        return image
+
+    def _decode_limit(self):
+        """The largest size an image can be shown at: the screen the window is on."""
+        screen = self.screen() or QApplication.primaryScreen()
+        return screen.availableGeometry().size()
+
+    def _forget_decoded_image(self, img_path):
+        self.decode_buffer.discard(img_path)
+        if img_path == self._source_path:
+            self._invalidate_source_image()
+
+    def _rename_decoded_image(self, old_path, new_path):
+        self.decode_buffer.rename(old_path, new_path)
+        if old_path == self._source_path:
+            self._source_path = new_path
+
+    def _invalidate_decoded_images(self):
+        self.decode_buffer.invalidate()
+        self._invalidate_source_image()
+
+    def _invalidate_source_image(self):
+        self._source_path = None
+        self._source_image = None
+        self._pyramid = None
+        self._scaled_pixmaps.clear()
+        self._smooth_timer.stop()
+        self.smooth_scaler.cancel()
 
     def _get_images(self):
-        supported = SUPPORTED_IMAGE_FORMATS
-        images = sorted([f for f in os.listdir(self.image_dir) if f.lower().endswith(supported)])
-        
-        return images
+        if os.path.abspath(self.image_dir) != self.dir_index.image_dir:
+            self._recover_interrupted_rename()
+        # The index lists a directory once and then follows our own changes and the file system watcher
+        self.dir_index.open(self.image_dir)
+        return self.dir_index.names(self.sort_order)
+
+    def _listed_images(self):
+        """The images to show: the whole directory, or only its duplicate groups while they are shown."""
+        images = self._get_images()
+        if self.duplicate_groups is None:
+            return images
+        present = set(images)
+        return [name for group in self.duplicate_groups for name in group if name in present]
+
+    def _on_directory_changed(self, added, removed, modified):
+        for name in removed + modified:
+            self._forget_decoded_image(os.path.join(self.image_dir, name))
+        if self.thumbnail_view_active:
+            self.thumbnail_model.invalidate_names(modified)
+        self._relist_images()
+
+    def _relist_images(self):
+        """List the images again, e.g. in a new order, keeping the current one current."""
+        if self.thumbnail_view_active:
+            self._update_thumbnail_view()
+            return
+        current_name = self.images[self.current_index] if self.images else None
+        self.images = self._listed_images()
+        if current_name in self.images:
+            self.current_index = self.images.index(current_name)
+        else:
+            self.current_index = min(self.current_index, max(0, len(self.images) - 1))
+        if self.images or current_name is not None:
+            self._show_image()
+
+    def _set_sort_order(self, order):
+        self.sort_order = order
+        self._save_sort_order()
+        self._relist_images()
+
+    def _on_files_examined(self):
+        # Sizes and capture times of new files are known now
+        if self.sort_order in ('dimensions', 'capture_time'):
+            self._relist_images()
 
     def _delete_current_image(self):
         if not self.images:
             return
         img_path = os.path.join(self.image_dir, self.images[self.current_index])
-        try:
-            os.remove(img_path)
-        except Exception as e:
-            QMessageBox.warning(self, 'Error', f'Error deleting image: {e}')
-            return
+        self.file_ops.remove(img_path)
+        self._forget_decoded_image(img_path)
+        self.dir_index.remove(self.images[self.current_index])
         del self.images[self.current_index]
         if self.current_index >= len(self.images):
             self.current_index = max(0, len(self.images) - 1)
@@ -295,22 +457,14 @@ class ImageMan(QMainWindow):
         if not self.images:
             return
         old_name = self.images[self.current_index]
-        ext = os.path.splitext(old_name)[1]
-        seq = self.tag_counters[tag]
-        new_name = f"{tag}_{seq:04d}{ext}"
+        new_path = self._next_tag_path(self.image_dir, tag, old_name)
+        new_name = os.path.basename(new_path)
         old_path = os.path.join(self.image_dir, old_name)
-        new_path = os.path.join(self.image_dir, new_name)
-        while os.path.exists(new_path):
-            seq += 1
-            new_name = f"{tag}_{seq:04d}{ext}"
-            new_path = os.path.join(self.image_dir, new_name)
-        try:
-            os.rename(old_path, new_path)
-        except Exception as e:
-            QMessageBox.warning(self, 'Error', f'Error renaming image: {e}')
-            return
+        self.file_ops.rename(old_path, new_path)
+        self._rename_decoded_image(old_path, new_path)
+        self.dir_index.rename_many({old_name: new_name}, tag)
         self.images[self.current_index] = new_name
-        self.tag_counters[tag] = seq + 1
+        self._rename_in_duplicate_groups({old_name: new_name})
         self._show_image()
 
     def delete_current_image(self):
@@ -329,11 +483,13 @@ class ImageMan(QMainWindow):
 
     def next_image(self):
         if self.images:
+            self._direction = 1
             self.current_index = (self.current_index + 1) % len(self.images)
             self._show_image()
 
     def prev_image(self):
         if self.images:
+            self._direction = -1
             self.current_index = (self.current_index - 1 + len(self.images)) % len(self.images)
             self._show_image()
 
@@ -365,6 +521,28 @@ class ImageMan(QMainWindow):
         self.thumbnail_view_action.triggered.connect(self._toggle_thumbnail_view)
         view_menu.addAction(self.thumbnail_view_action)
 
+        self.duplicates_action = QAction('Find Duplicates', self)
+        self.duplicates_action.setCheckable(True)
+        self.duplicates_action.setShortcut('Ctrl+Shift+D')
+        self.duplicates_action.triggered.connect(self._toggle_duplicates)
+        view_menu.addAction(self.duplicates_action)
+
+        sort_menu = view_menu.addMenu('Sort By')
+        self.sort_actions = QActionGroup(self)
+        for order, label in SORT_ORDERS:
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(order == self.sort_order)
+            action.triggered.connect(lambda checked, order=order: self._set_sort_order(order))
+            self.sort_actions.addAction(action)
+            sort_menu.addAction(action)
+
+        self.perf_overlay_action = QAction('Performance Stats', self)
+        self.perf_overlay_action.setCheckable(True)
+        self.perf_overlay_action.setShortcut('Ctrl+Shift+P')
+        self.perf_overlay_action.triggered.connect(self._toggle_perf_overlay)
+        view_menu.addAction(self.perf_overlay_action)
+
         config_menu = menubar.addMenu('Config')
         tag_action = QAction('Configure Tags', self)
         tag_action.triggered.connect(self._show_tag_dialog)
@@ -376,46 +554,70 @@ class ImageMan(QMainWindow):
         self.show_filenames_action.triggered.connect(self._toggle_filename_display)
         config_menu.addAction(self.show_filenames_action)
 
-    def _get_rename_map(self):
+        thumbnail_cache_action = QAction('Thumbnail Cache...', self)
+        thumbnail_cache_action.triggered.connect(self._show_thumbnail_cache_dialog)
+        config_menu.addAction(thumbnail_cache_action)
+
+    def _get_rename_map(self, order=None):
         rename_map = {}
         if not self.images:
             return rename_map
 
         dir_name = os.path.basename(os.path.abspath(self.image_dir))
         
-        # Get the current order of images
-        current_images_order = self._get_images() # This will get the actual files on disk sorted
+        # Get the current order of images, either as given (e.g. after a drag and drop) or as sorted on disk
+        current_images_order = order if order is not None else self._get_images()
 
         # Compare with the desired order (dir_name_0001.ext, dir_name_0002.ext, ...)
         for i, old_name in enumerate(current_images_order):
             ext = os.path.splitext(old_name)[1]
             new_name = f"{dir_name}_{i+1:04d}{ext}"
-            old_path = os.path.join(self.image_dir, old_name)
-            new_path = os.path.join(self.image_dir, new_name)
             
-            if old_path.lower() != new_path.lower():
-                rename_map[old_path] = new_path
+            if old_name.lower() != new_name.lower():
+                rename_map[old_name] = new_name
         return rename_map
 
+    def _rename_journal(self, image_dir):
+        key = os.path.normcase(os.path.abspath(image_dir))
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.journal'
+        return RenameJournal(os.path.join(default_cache_dir('rename-journals'), name))
+
     def _perform_rename(self, rename_map):
+        # Renaming everything needs the disk to match the list first
+        self.file_ops.wait()
+        image_dir = os.path.abspath(self.image_dir)
         try:
-            temp_files = {}
-            for old_path, new_path in rename_map.items():
-                if os.path.exists(new_path):
-                    temp_path = new_path + '.tmp'
-                    os.rename(old_path, temp_path)
-                    temp_files[new_path] = temp_path
-                else:
-                    os.rename(old_path, new_path)
-
-            for final_path, temp_path in temp_files.items():
-                os.rename(temp_path, final_path)
+            steps = plan_renames(rename_map, existing=self.dir_index.names())
+            apply_plan(image_dir, steps, self._rename_journal(image_dir))
+            return True
 
         except Exception as e:
             QMessageBox.warning(self, 'Error', f'An error occurred: {e}')
+            self._recover_interrupted_rename()
+            return False
 
-    def _rename_all_images(self, confirm=True):
-        rename_map = self._get_rename_map()
+    def _recover_interrupted_rename(self):
+        """Offer to resume or roll back a Rename All that did not finish in this directory."""
+        journal = self._rename_journal(self.image_dir)
+        if not journal.exists():
+            return
+        reply = QMessageBox.question(
+            self, 'Rename All',
+            "Renaming the images in this folder did not finish.\n\n"
+            "Yes finishes renaming them, No puts back the names that were already changed.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        try:
+            if reply == QMessageBox.Yes:
+                resume_plan(journal)
+            else:
+                rollback_plan(journal)
+        except Exception as e:
+            QMessageBox.warning(self, 'Error', f'An error occurred: {e}')
+        if self.dir_index.image_dir == os.path.abspath(self.image_dir):
+            self.dir_index.refresh()
+
+    def _rename_all_images(self, confirm=True, order=None):
+        rename_map = self._get_rename_map(order)
         if not rename_map: # No renaming needed
             return True # Indicate success (no rename was needed)
 
@@ -431,9 +633,22 @@ class ImageMan(QMainWindow):
                 self._toggle_thumbnail_view(False)
                 return False # Indicate rename was declined
 
-        self._perform_rename(rename_map)
+        renamed = self._perform_rename(rename_map)
+        self._invalidate_decoded_images()
+        if renamed:
+            self.dir_index.rename_many(rename_map)
+            self._rename_in_duplicate_groups(rename_map)
+        else:
+            self.dir_index.refresh()
 
-        self.images = self._get_images()
+        if renamed and self.thumbnail_view_active and self.thumbnail_model.image_dir == self.image_dir:
+            # Relabel the existing rows instead of rebuilding the whole list
+            self.thumbnail_model.rename(rename_map)
+            self.images = self.thumbnail_model.names()
+        else:
+            self.images = self._listed_images()
+            if self.thumbnail_view_active:
+                self._update_thumbnail_view()
         self.current_index = 0
         if not self.thumbnail_view_active:
             self._show_image()
@@ -442,24 +657,14 @@ class ImageMan(QMainWindow):
     def _select_directory(self):
         dir_path = QFileDialog.getExistingDirectory(self, 'Select Image Directory', self.image_dir)
         if dir_path:
+            self._clear_duplicate_groups()
             self.image_dir = dir_path
             self._add_to_recent_dirs(dir_path)
             self.images = self._get_images()
             self.current_index = 0
+            self._invalidate_decoded_images()
             self.zoom_factor = 1.0
-            self._initial_win_height = None
-            self._initial_win_width = None
-            if self.images:
-                img_path = os.path.join(self.image_dir, self.images[0])
-                pixmap = QPixmap(img_path)
-                if not pixmap.isNull():
-                    img_w, img_h = pixmap.width(), pixmap.height()
-                    label_h = FILENAME_LABEL_HEIGHT
-                    self._initial_win_width = img_w + WINDOW_MARGIN
-                    self._initial_win_height = img_h + label_h + WINDOW_MARGIN
-                    self.resize(self._initial_win_width, self._initial_win_height)
-            else:
-                self.resize(800, 600)
+            self._fit_window_to_first_image()
             # Always go to thumbnail view after selecting a directory
             self.thumbnail_view_action.setChecked(True)
             self._toggle_thumbnail_view(True)
@@ -521,18 +726,24 @@ class ImageMan(QMainWindow):
                 QMessageBox.warning(self, 'Invalid Tags', 'Tags must be 5 unique, non-empty values.')
                 return
             self.tags = new_tags
-            self.tag_counters = {tag: 1 for tag in self.tags}
-            self._save_tags_to_registry()
+            self._save_tags()
             self.slideshow_duration = new_duration
-            self._save_slideshow_duration_to_registry()
+            self._save_slideshow_duration()
 
     def _setup_thumbnail_view(self):
-        self.thumbnail_list_widget = DragDropListWidget(self)
-        self.thumbnail_list_widget.itemDoubleClicked.connect(self._thumbnail_double_clicked)
-        self.thumbnail_list_widget.setIconSize(QSize(128, 128))
+        self.thumbnail_cache = ThumbnailCache(size=THUMBNAIL_SIZE)
+        self.thumbnail_loader = ThumbnailLoader(THUMBNAIL_SIZE, self, self.file_ops.source_path)
+        self.thumbnail_loader.idle.connect(self.thumbnail_cache.flush)
+        self.thumbnail_model = ThumbnailModel(self.thumbnail_loader, self.thumbnail_cache, self.dir_index, self,
+                                              self.file_ops)
+        self.thumbnail_model.show_filenames = self.show_filenames
+        self.thumbnail_view = ThumbnailListView(self)
+        self.thumbnail_view.setModel(self.thumbnail_model)
+        self.thumbnail_view.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.thumbnail_view.verticalScrollBar().valueChanged.connect(self._prioritize_visible_thumbnails)
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setWidget(self.thumbnail_list_widget)
+        self.scroll_area.setWidget(self.thumbnail_view)
         self.scroll_area.hide()
 
     def _toggle_thumbnail_view(self, checked):
@@ -550,132 +761,211 @@ class ImageMan(QMainWindow):
             self.label.setFocus()
 
     def _update_thumbnail_view(self):
-        self.thumbnail_list_widget.clear()
-        self.images = self._get_images()
-        for image_name in self.images:
-            item = QListWidgetItem()
-            icon_path = os.path.join(self.image_dir, image_name)
-            item.setIcon(QIcon(icon_path))
-            item.setData(Qt.UserRole, image_name)
-            if self.show_filenames:
-                item.setText(image_name)
+        images = self._listed_images()
+        if self.thumbnail_model.image_dir != self.image_dir or not self.thumbnail_model.apply_diff(images):
+            self.thumbnail_model.set_images(self.image_dir, images)
+        self.images = images
+
+    def _toggle_duplicates(self, checked):
+        if not checked:
+            self._clear_duplicate_groups()
+            if self.thumbnail_view_active:
+                self._update_thumbnail_view()
             else:
-                item.setText("")
-            self.thumbnail_list_widget.addItem(item)
-
-    def _thumbnail_double_clicked(self, item):
-        clicked_image_name = item.data(Qt.UserRole)
-        
-        if clicked_image_name in self.images:
-            self.current_index = self.images.index(clicked_image_name)
-            
-            
-            self.thumbnail_view_action.setChecked(False)
-            self._toggle_thumbnail_view(False)
+                self.images = self._listed_images()
+                self._show_image()
+            return
+        if not self.thumbnail_view_active:
+            self.thumbnail_view_action.setChecked(True)
+            self._toggle_thumbnail_view(True)
+        stats = {}
+        for name in self._get_images():
+            st = self.dir_index.stat(name)
+            if st is not None:
+                stats[name] = st
+        if not self.duplicate_finder.is_running():
+            QApplication.setOverrideCursor(Qt.BusyCursor)
+        self.duplicate_finder.find(self.image_dir, stats)
+
+    def _on_duplicates_found(self, image_dir, groups):
+        QApplication.restoreOverrideCursor()
+        if image_dir != self.image_dir or not self.duplicates_action.isChecked():
+            return
+        if not groups:
+            self.duplicates_action.setChecked(False)
+            QMessageBox.information(self, 'Find Duplicates', 'No duplicates found in this directory.')
+            return
+        self.duplicate_groups = groups
+        self.thumbnail_model.set_groups(groups)
+        # Reordering the groups would renumber the whole directory after them
+        self.thumbnail_view.setDragDropMode(self.thumbnail_view.NoDragDrop)
+        if self.thumbnail_view_active:
+            self._update_thumbnail_view()
+        else:
+            self.images = self._listed_images()
+            self.current_index = 0
             self._show_image()
 
+    def _clear_duplicate_groups(self):
+        if self.duplicate_finder.is_running():
+            self.duplicate_finder.cancel()
+            QApplication.restoreOverrideCursor()
+        self.duplicates_action.setChecked(False)
+        self.duplicate_groups = None
+        self.thumbnail_model.set_groups(None)
+        self.thumbnail_view.setDragDropMode(self.thumbnail_view.InternalMove)
+
+    def _rename_in_duplicate_groups(self, mapping):
+        if self.duplicate_groups is None:
+            return
+        self.duplicate_groups = [[mapping.get(name, name) for name in group] for group in self.duplicate_groups]
+        self.thumbnail_model.set_groups(self.duplicate_groups)
+
+    def _prioritize_visible_thumbnails(self, *args):
+        model = self.thumbnail_model
+        self.thumbnail_loader.prioritize([os.path.join(self.image_dir, model.name_at(row))
+                                          for row in self.thumbnail_view.visible_rows()])
+
+    def _select_current_thumbnail(self):
+        if self.thumbnail_view_active and self.images:
+            self.thumbnail_model.ensure_fetched(self.current_index)
+            index = self.thumbnail_model.index(self.current_index)
+            self.thumbnail_view.setCurrentIndex(index)
+            self.thumbnail_view.scrollTo(index)
+
+    def _show_thumbnail_cache_dialog(self):
+        stats = self.thumbnail_cache.stats()
+        reply = QMessageBox.question(
+            self, 'Thumbnail Cache',
+            f"The thumbnail cache uses {stats['bytes'] / (1024 * 1024):.1f} MB of "
+            f"{stats['limit'] / (1024 * 1024):.0f} MB for {stats['directories']} directories.\n\n"
+            f"Clear the thumbnail cache?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.thumbnail_cache.clear()
+
+    def _toggle_perf_overlay(self, checked):
+        # Collection starts with the overlay and keeps running once it is hidden
+        if checked:
+            perf.stats.enabled = True
+        self.perf_overlay.setVisible(checked)
+
+    def _perf_dump_path(self):
+        path = os.environ.get('IMAGEMAN_PERF_FILE')
+        if path:
+            return path
+        return os.path.join(default_cache_dir('perf'), time.strftime('perf-%Y%m%d-%H%M%S.json'))
+
+    def _dump_perf_stats(self):
+        if not perf.stats.enabled or self._perf_dumped:
+            return
+        self._perf_dumped = True
+        try:
+            perf.stats.dump(self._perf_dump_path())
+        except OSError:
+            pass
+
+    def _on_about_to_quit(self):
+        """The application can quit without closing the window, keep what closeEvent would."""
+        self.file_ops.wait()
+        self.settings.flush()
+        self._dump_perf_stats()
+
+    def closeEvent(self, event):
+        self.file_ops.wait()
+        self.duplicate_finder.close()
+        self.decode_buffer.invalidate()
+        # Let running decodes finish here, while the pools can still hand
+        # their results back, rather than in the pools' destructors. The
+        # hidden view may still lay out rows and ask for icons, the closed
+        # loader ignores those.
+        self.thumbnail_loader.close()
+        self.decode_buffer.pool.waitForDone()
+        self._smooth_timer.stop()
+        self.smooth_scaler.close()
+        self.thumbnail_cache.close()
+        self.dir_index.close()
+        self.metadata.close()
+        self.settings.flush()
+        self._dump_perf_stats()
+        super().closeEvent(event)
+
     def on_item_dropped(self):
-        new_images = [self.thumbnail_list_widget.item(i).data(Qt.UserRole) for i in range(self.thumbnail_list_widget.count())]
+        new_images = self.thumbnail_model.names()
         self.images = new_images
-        self._rename_all_images(confirm=False)
-        self._update_thumbnail_view()
+        self._rename_all_images(confirm=False, order=new_images)
 
     def delete_thumbnail_image(self, image_name):
-        if image_name in self.images:
-            idx_to_delete = self.images.index(image_name)
-            img_path = os.path.join(self.image_dir, self.images[idx_to_delete])
-            try:
-                os.remove(img_path)
-                del self.images[idx_to_delete] # Update self.images immediately
-                
-                # Calculate new current_index
-                if not self.images: # No images left
-                    self.current_index = 0
-                elif idx_to_delete >= len(self.images): # Deleted last image
-                    self.current_index = len(self.images) - 1
-                else: # Deleted an image in the middle or first
-                    self.current_index = idx_to_delete # Keep index, it now points to the next image
-                
-            except Exception as e:
-                QMessageBox.warning(self, 'Error', f'Error deleting image: {e}')
-            finally:
-                self._update_thumbnail_view() # This will re-read images and update the list widget
-                # After _update_thumbnail_view, select the item if in thumbnail view
-                if self.thumbnail_view_active and self.images:
-                    self.thumbnail_list_widget.setCurrentRow(self.current_index)
-                    self.thumbnail_list_widget.scrollToItem(self.thumbnail_list_widget.item(self.current_index))
+        self.delete_thumbnail_images([image_name])
 
     def rename_thumbnail_image(self, image_name, tag):
-        if image_name in self.images:
-            idx = self.images.index(image_name)
-            old_name = self.images[idx]
-            ext = os.path.splitext(old_name)[1]
-            seq = self.tag_counters[tag]
-            new_name = f"{tag}_{seq:04d}{ext}"
-            old_path = os.path.join(self.image_dir, old_name)
-            new_path = os.path.join(self.image_dir, new_name)
-            while os.path.exists(new_path):
-                seq += 1
-                new_name = f"{tag}_{seq:04d}{ext}"
-                new_path = os.path.join(self.image_dir, new_name)
-            try:
-                os.rename(old_path, new_path)
-                self.images[idx] = new_name
-                self.tag_counters[tag] = seq + 1
-                self._update_thumbnail_view()
-            except Exception as e:
-                QMessageBox.warning(self, 'Error', f'Error renaming image: {e}')
+        self.rename_thumbnail_images([image_name], tag)
 
     def move_thumbnail_image_to_tag(self, image_name, idx):
-        if image_name in self.images:
-            current_idx = self.images.index(image_name)
-            tag = self.tags[idx]
-            old_name = self.images[current_idx]
-            ext = os.path.splitext(old_name)[1]
-            tag_dir = os.path.abspath(os.path.join(self.image_dir, tag))
-            try:
-                if not os.path.isdir(tag_dir):
-                    os.makedirs(tag_dir)
-            except Exception as e:
-                QMessageBox.warning(self, 'Error', f'Error creating directory: {e}')
-                return
-            existing = [f for f in os.listdir(tag_dir) if f.lower().endswith(ext.lower()) and f.startswith(tag + '_')]
-            max_seq = 0
-            for f in existing:
-                try:
-                    seq_part = f[len(tag)+1:f.rfind('.')]
-                    seq = int(seq_part)
-                    if seq > max_seq:
-                        max_seq = seq
-                except Exception:
-                    continue
-            seq = max_seq + 1
-            new_name = f"{tag}_{seq:04d}{ext}"
-            old_path = os.path.join(self.image_dir, old_name)
-            new_path = os.path.join(tag_dir, new_name)
-            while os.path.exists(new_path):
-                seq += 1
-                new_name = f"{tag}_{seq:04d}{ext}"
-                new_path = os.path.join(tag_dir, new_name)
-            try:
-                os.rename(old_path, new_path)
-                del self.images[current_idx] # Update self.images immediately
+        self.move_thumbnail_images_to_tag([image_name], idx)
 
-                # Calculate new current_index
-                if not self.images: # No images left
-                    self.current_index = 0
-                elif current_idx >= len(self.images): # Moved last image
-                    self.current_index = len(self.images) - 1
-                else: # Moved an image in the middle or first
-                    self.current_index = current_idx # Keep index, it now points to the next image
+    def _selected_rows(self, image_names):
+        """Return the rows of the given names in self.images, in list order."""
+        wanted = set(image_names)
+        return [row for row, name in enumerate(self.images) if name in wanted]
 
-                self._update_thumbnail_view()
-                # After _update_thumbnail_view, select the item if in thumbnail view
-                if self.thumbnail_view_active and self.images:
-                    self.thumbnail_list_widget.setCurrentRow(self.current_index)
-                    self.thumbnail_list_widget.scrollToItem(self.thumbnail_list_widget.item(self.current_index))
-            except Exception as e:
-                QMessageBox.warning(self, 'Error', f'Error moving image: {e}')
+    def delete_thumbnail_images(self, image_names):
+        rows = self._selected_rows(image_names)
+        if not rows:
+            return
+        names = [self.images[row] for row in rows]
+        for name in names:
+            img_path = os.path.join(self.image_dir, name)
+            self.file_ops.remove(img_path)
+            self._forget_decoded_image(img_path)
+        self.dir_index.remove_many(names)
+        self._drop_thumbnail_rows(rows, names)
+
+    def rename_thumbnail_images(self, image_names, tag):
+        rows = self._selected_rows(image_names)
+        if not rows:
+            return
+        mapping = {}
+        for row in rows:
+            old_name = self.images[row]
+            new_path = self._next_tag_path(self.image_dir, tag, old_name)
+            old_path = os.path.join(self.image_dir, old_name)
+            self.file_ops.rename(old_path, new_path)
+            self._rename_decoded_image(old_path, new_path)
+            mapping[old_name] = os.path.basename(new_path)
+            self.images[row] = mapping[old_name]
+        self.dir_index.rename_many(mapping, tag)
+        self.thumbnail_model.rename(mapping)
+        self._rename_in_duplicate_groups(mapping)
+
+    def move_thumbnail_images_to_tag(self, image_names, idx):
+        rows = self._selected_rows(image_names)
+        if not rows or idx < 0 or idx >= len(self.tags):
+            return
+        tag = self.tags[idx]
+        names = [self.images[row] for row in rows]
+        moved_to = {}
+        for name in names:
+            new_path = self._tag_folder_path(tag, name)
+            old_path = os.path.join(self.image_dir, name)
+            self.file_ops.move(old_path, new_path)
+            self._forget_decoded_image(old_path)
+            moved_to[name] = new_path
+        self.dir_index.move_many(moved_to, tag)
+        self._drop_thumbnail_rows(rows, names)
+
+    def _drop_thumbnail_rows(self, rows, names):
+        """Take deleted or moved images out of the list and the grid in one go."""
+        gone = set(rows)
+        self.images = [name for row, name in enumerate(self.images) if row not in gone]
+
+        # The image after the first removed one becomes current
+        if not self.images: # No images left
+            self.current_index = 0
+        else:
+            self.current_index = min(rows[0], len(self.images) - 1)
+        self.thumbnail_model.remove_names(names)
+        self._select_current_thumbnail()
 
     def open_thumbnail_in_single_view(self, image_name):
         
@@ -715,13 +1005,12 @@ class ImageMan(QMainWindow):
 
     def _toggle_filename_display(self, checked):
         self.show_filenames = checked
-        self._save_show_filenames_to_registry()
+        self._save_show_filenames()
         self._refresh_display()
 
     def _refresh_display(self):
-        if self.thumbnail_view_active:
-            self._update_thumbnail_view()
-        else:
+        self.thumbnail_model.set_show_filenames(self.show_filenames)
+        if not self.thumbnail_view_active:
             self._show_image()
 
     def _create_slideshow_video(self):
@@ -741,72 +1030,32 @@ class ImageMan(QMainWindow):
 
         min_length_seconds = min_length_minutes * 60
 
-        # 2. Create temporary directory for processed images
-        temp_dir = os.path.join(self.image_dir, "_temp_slideshow_images")
-        os.makedirs(temp_dir, exist_ok=True)
-
-        processed_image_paths = []
-        target_width, target_height = 1920, 1080
-
+        output_video_path = os.path.join(self.image_dir, "slideshow.mp4")
         try:
-            QMessageBox.information(self, "Processing Images", "Resizing and processing images for video. This may take a moment...")
-            for i, image_name in enumerate(self.images):
-                original_path = os.path.join(self.image_dir, image_name)
-                try:
-                    img = Image.open(original_path)
-                except Exception as e:
-                    QMessageBox.warning(self, "Image Error", f"Could not open image {image_name}: {e}")
-                    continue
-
-                # Calculate aspect ratio and resize
-                original_width, original_height = img.size
-                aspect_ratio = original_width / original_height
-                target_aspect_ratio = target_width / target_height
-
-                if aspect_ratio > target_aspect_ratio:
-                    # Image is wider than target, fit to width
-                    new_width = target_width
-                    new_height = int(new_width / aspect_ratio)
-                else:
-                    # Image is taller or same aspect ratio, fit to height
-                    new_height = target_height
-                    new_width = int(new_height * aspect_ratio)
-
-                resized_img = img.resize((new_width, new_height), Image.LANCZOS)
-
-                # Create black background and paste resized image
-                new_image = Image.new("RGB", (target_width, target_height), (0, 0, 0)) # Black background
-                paste_x = (target_width - new_width) // 2
-                paste_y = (target_height - new_height) // 2
-                new_image.paste(resized_img, (paste_x, paste_y))
-
-                processed_path = os.path.join(temp_dir, f"processed_{i:04d}.png")
-                new_image.save(processed_path)
-                processed_image_paths.append(processed_path)
-
-            if not processed_image_paths:
-                QMessageBox.warning(self, "No Images Processed", "No valid images were processed for the slideshow.")
-                return
+            # Pillow and moviepy are only loaded once a video is made, they
+            # would add most of a second to every start
+            from imageman.slideshow import FrameCache, write_slideshow
 
-            # 3. Calculate video duration and loop count
-            single_pass_duration = len(processed_image_paths) * self.slideshow_duration
-            loop_count = max(1, int(min_length_seconds / single_pass_duration) + 1)
+            # 2. Render the frames in worker processes and stream them into the encoder
+            QMessageBox.information(self, "Creating Video", "Generating MP4 video. This may take some time...")
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                image_count, failures = write_slideshow(
+                    [os.path.join(self.image_dir, image_name) for image_name in self.images],
+                    output_video_path, self.slideshow_duration, min_length_seconds,
+                    cache=FrameCache(default_cache_dir('frames')))
+            finally:
+                QApplication.restoreOverrideCursor()
 
-            final_clip_images = []
-            for _ in range(loop_count):
-                final_clip_images.extend(processed_image_paths)
+            if failures:
+                self._show_failures("Image Error",
+                                    f"{len(failures)} image(s) could not be processed and were skipped:\n\n", failures)
 
-            # 4. Create video using moviepy
-            QMessageBox.information(self, "Creating Video", "Generating MP4 video. This may take some time...")
-            clip = ImageSequenceClip(final_clip_images, fps=1/self.slideshow_duration)
-            output_video_path = os.path.join(self.image_dir, "slideshow.mp4")
-            clip.write_videofile(output_video_path, codec="libx264", audio_codec="aac", fps=24) # Using 24 fps for smooth video
+            if not image_count:
+                QMessageBox.warning(self, "No Images Processed", "No valid images were processed for the slideshow.")
+                return
 
             QMessageBox.information(self, "Video Created", f"Slideshow video created successfully at: {output_video_path}")
 
         except Exception as e:
             QMessageBox.critical(self, "Video Creation Error", f"An error occurred during video creation: {e}")
-        finally:
-            # 5. Clean up temporary directory
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
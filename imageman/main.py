@@ -1,6 +1,9 @@
+import time
+_started = time.perf_counter()
+
 import sys
 import os
-import winreg
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 
 script_dir = os.path.dirname(__file__)
@@ -9,24 +12,39 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from imageman.image_man_window import ImageMan
+from imageman.settings import Settings
+from imageman import perf
 
 
 if __name__ == '__main__':
+    # Slideshow video creation uses worker processes, which need this in a frozen build
+    multiprocessing.freeze_support()
+    # IMAGEMAN_STARTUP_REPORT=1 prints the time of each phase up to the
+    # first painted frame, any other value is a JSON file to write them to
+    startup = perf.StartupTimer(_started)
+    startup.mark('imports')
     app = QApplication(sys.argv)
+    startup.mark('qt_app')
+    # Loaded once here and shared with the window
+    settings = Settings()
+    startup.mark('settings')
     image_dir = None
     if len(sys.argv) > 1:
         image_dir = sys.argv[1]
     else:
-        try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\ImageMan", 0, winreg.KEY_READ) as key:
-                dirs_str, _ = winreg.QueryValueEx(key, "recent_dirs")
-                if dirs_str:
-                    image_dir = dirs_str.split(';')[0]
-        except Exception:
-            pass
+        dirs_str = settings.get('recent_dirs', '')
+        if dirs_str:
+            image_dir = dirs_str.split(';')[0]
 
     if not image_dir or not os.path.isdir(image_dir):
         image_dir = '.'
 
-    viewer = ImageMan(image_dir)
+    viewer = ImageMan(image_dir, settings)
+    startup.mark('window')
+    report = os.environ.get('IMAGEMAN_STARTUP_REPORT')
+    if report:
+        def first_paint():
+            startup.mark('first_paint')
+            startup.write(report)
+        perf.on_first_paint(first_paint)
     sys.exit(app.exec_())
\ No newline at end of file
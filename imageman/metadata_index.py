@@ -0,0 +1,229 @@
+import os
+import sqlite3
+import hashlib
+from collections import namedtuple
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QImageReader, QImageIOHandler
+
+from imageman.constants import METADATA_HASH_SAMPLE_BYTES
+from imageman.thumbnail_cache import default_cache_dir
+
+EXIF_IFD = 0x8769
+EXIF_DATE_TIME_ORIGINAL = 0x9003
+EXIF_DATE_TIME = 0x0132
+
+MetadataRecord = namedtuple('MetadataRecord', 'size mtime_ns width height format content_hash tag capture_time')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    format TEXT,
+    content_hash TEXT,
+    tag TEXT,
+    capture_time TEXT,
+    PRIMARY KEY (directory, name)
+) WITHOUT ROWID
+"""
+
+
+def read_capture_time(path):
+    """Return the EXIF capture time as 'YYYY:MM:DD HH:MM:SS', or '' when the file has none.
+
+    Pillow only parses the header when a file is opened, the pixels are
+    never decoded.
+    """
+    # Only needed here, importing it makes startup slower
+    from PIL import Image
+    try:
+        with Image.open(path) as image:
+            exif = image.getexif()
+            value = exif.get_ifd(EXIF_IFD).get(EXIF_DATE_TIME_ORIGINAL) or exif.get(EXIF_DATE_TIME)
+    except Exception:
+        return ''
+    if not isinstance(value, str):
+        return ''
+    value = value.strip('\x00 ')
+    return value if len(value) >= 10 and value[4] == ':' else ''
+
+
+def examine_file(path):
+    """Read what the index keeps about a file without decoding it.
+
+    Returns (size, mtime_ns, width, height, format, content_hash,
+    capture_time), or None when the file is gone. Width and height are as
+    displayed, after EXIF rotation, and None when the header does not give
+    them. The content hash covers the file size and its first and last
+    METADATA_HASH_SAMPLE_BYTES, enough to recognise a file that was copied
+    or renamed without reading all of it.
+    """
+    try:
+        st = os.stat(path)
+        digest = hashlib.blake2b(str(st.st_size).encode('ascii'), digest_size=16)
+        with open(path, 'rb') as f:
+            digest.update(f.read(METADATA_HASH_SAMPLE_BYTES))
+            if st.st_size > 2 * METADATA_HASH_SAMPLE_BYTES:
+                f.seek(-METADATA_HASH_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read(METADATA_HASH_SAMPLE_BYTES))
+    except OSError:
+        return None
+    reader = QImageReader(path)
+    size = reader.size()
+    width = height = None
+    if size.isValid():
+        if reader.transformation() & QImageIOHandler.TransformationRotate90:
+            size = QSize(size.height(), size.width())
+        width, height = size.width(), size.height()
+    image_format = bytes(reader.format()).decode('ascii', 'replace') or None
+    return (st.st_size, st.st_mtime_ns, width, height, image_format, digest.hexdigest(),
+            read_capture_time(path))
+
+
+def _key(directory):
+    return os.path.normcase(os.path.abspath(directory))
+
+
+class MetadataIndex:
+    """Persistent facts about every image ImageMan has seen, in one SQLite database.
+
+    Rows are keyed by directory and file name and hold the file size and
+    mtime they were taken at, the pixel dimensions, format, a content hash,
+    the EXIF capture time ('' for none) and the tag the file was last
+    renamed or moved with. sync() compares a fresh listing with the stored
+    rows and tells which files have to be examined again. The database is
+    only used from the GUI thread. If it cannot be opened, every method
+    does nothing and load() returns {}.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(default_cache_dir('metadata'), 'metadata.sqlite3')
+        self._db = None
+        self._failed = False
+
+    def _connect(self):
+        if self._db is None and not self._failed:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                db = sqlite3.connect(self.path)
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('PRAGMA synchronous=NORMAL')
+                db.execute(_SCHEMA)
+                columns = {row[1] for row in db.execute('PRAGMA table_info(images)')}
+                if 'capture_time' not in columns:
+                    # Rows from before capture times were kept are examined again
+                    db.execute('ALTER TABLE images ADD COLUMN capture_time TEXT')
+                db.commit()
+                self._db = db
+            except (OSError, sqlite3.Error):
+                self._failed = True
+        return self._db
+
+    def _write(self, statements):
+        """Run [(sql, rows)] in one transaction, each statement once per row."""
+        db = self._connect()
+        if db is None:
+            return
+        try:
+            with db:
+                for sql, rows in statements:
+                    db.executemany(sql, rows)
+        except sqlite3.Error:
+            pass
+
+    def load(self, directory):
+        """Return {name: MetadataRecord} for everything stored about directory."""
+        db = self._connect()
+        if db is None:
+            return {}
+        try:
+            rows = db.execute('SELECT name, size, mtime_ns, width, height, format, content_hash, tag, '
+                              'capture_time FROM images WHERE directory = ?', (_key(directory),)).fetchall()
+        except sqlite3.Error:
+            return {}
+        return {row[0]: MetadataRecord(*row[1:]) for row in rows}
+
+    def sync(self, directory, entries):
+        """Bring the rows of directory in line with a listing of {name: os.stat_result}.
+
+        Rows of files that are gone are dropped. Returns the records that
+        are still current and the names of new or changed files, whose
+        facts are unknown until update() is called for them.
+        """
+        key = _key(directory)
+        records = self.load(directory)
+        current = {}
+        stale = []
+        for name, st in entries.items():
+            record = records.get(name)
+            if (record is not None and record.size == st.st_size and record.mtime_ns == st.st_mtime_ns
+                    and record.capture_time is not None):
+                current[name] = record
+            else:
+                stale.append(name)
+        gone = [(key, name) for name in records if name not in entries]
+        # A file changed in place keeps its tag
+        changed = [(key, name, entries[name].st_size, entries[name].st_mtime_ns) for name in stale]
+        self._write([
+            ('DELETE FROM images WHERE directory = ? AND name = ?', gone),
+            ('INSERT INTO images (directory, name, size, mtime_ns) VALUES (?, ?, ?, ?) '
+             'ON CONFLICT (directory, name) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, '
+             'width = NULL, height = NULL, format = NULL, content_hash = NULL, capture_time = NULL', changed),
+        ])
+        return current, stale
+
+    def update(self, directory, facts):
+        """Store the results of examine_file(), {name: facts}.
+
+        Facts taken from an older version of a file than the stored row
+        are ignored.
+        """
+        key = _key(directory)
+        rows = [(width, height, image_format, content_hash, capture_time, key, name, size, mtime_ns)
+                for name, (size, mtime_ns, width, height, image_format, content_hash, capture_time)
+                in facts.items()]
+        self._write([('UPDATE images SET width = ?, height = ?, format = ?, content_hash = ?, capture_time = ? '
+                      'WHERE directory = ? AND name = ? AND size = ? AND mtime_ns = ?', rows)])
+
+    def remove_many(self, directory, names):
+        key = _key(directory)
+        self._write([('DELETE FROM images WHERE directory = ? AND name = ?', [(key, name) for name in names])])
+
+    def rename_many(self, directory, mapping, tag=None):
+        """Carry the rows over to their new names, optionally recording the tag they were renamed with."""
+        self.move_many(directory, {old: os.path.join(directory, new) for old, new in mapping.items()}, tag)
+
+    def move_many(self, directory, mapping, tag=None):
+        """Carry rows over to {name: new path}, in this directory or another one."""
+        db = self._connect()
+        if db is None:
+            return
+        key = _key(directory)
+        moved = []
+        for name, new_path in mapping.items():
+            try:
+                row = db.execute('SELECT size, mtime_ns, width, height, format, content_hash, tag, capture_time '
+                                 'FROM images WHERE directory = ? AND name = ?', (key, name)).fetchone()
+            except sqlite3.Error:
+                return
+            if row is None:
+                continue
+            record = MetadataRecord(*row)
+            if tag is not None:
+                record = record._replace(tag=tag)
+            moved.append((_key(os.path.dirname(new_path)), os.path.basename(new_path)) + tuple(record))
+        # All old rows go first, a new name may be another file's old name
+        self._write([
+            ('DELETE FROM images WHERE directory = ? AND name = ?', [(key, name) for name in mapping]),
+            ('INSERT OR REPLACE INTO images (directory, name, size, mtime_ns, width, height, format, '
+             'content_hash, tag, capture_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', moved),
+        ])
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import time
+import threading
+import functools
+
+from PyQt5.QtCore import QObject, QEvent, QTimer
+from PyQt5.QtWidgets import QApplication
+
+from imageman.constants import PERF_BUCKETS_MS
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class PerfStats:
+    """Latency histograms and cache hit counts for the hot paths.
+
+    Code wraps a stage in `with stats.timed('decode'):` and reports cache
+    lookups with stats.count('decode_buffer', hit). While disabled, timed()
+    hands back a shared do-nothing context manager and count() returns at
+    once, so the instrumentation can stay in place. Recording is thread
+    safe, decodes are timed on the worker threads.
+
+    Each timing lands in the first bucket of PERF_BUCKETS_MS whose upper
+    bound (in milliseconds) it does not exceed, or in a last, open bucket.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._hits = {}
+
+    def timed(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record(self, name, seconds):
+        ms = seconds * 1000
+        bucket = len(PERF_BUCKETS_MS)
+        for i, bound in enumerate(PERF_BUCKETS_MS):
+            if ms <= bound:
+                bucket = i
+                break
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = {'count': 0, 'total': 0.0, 'max': 0.0,
+                                                'buckets': [0] * (len(PERF_BUCKETS_MS) + 1)}
+            timing['count'] += 1
+            timing['total'] += ms
+            timing['max'] = max(timing['max'], ms)
+            timing['buckets'][bucket] += 1
+
+    def count(self, name, hit):
+        if not self.enabled:
+            return
+        with self._lock:
+            counts = self._hits.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._timings = {}
+            self._hits = {}
+
+    def snapshot(self):
+        """Return the collected numbers as plain, JSON ready dicts."""
+        with self._lock:
+            timings = {name: dict(t, buckets=list(t['buckets'])) for name, t in self._timings.items()}
+            hits = {name: list(counts) for name, counts in self._hits.items()}
+        labels = [f'<={bound}' for bound in PERF_BUCKETS_MS] + [f'>{PERF_BUCKETS_MS[-1]}']
+        result = {'timings_ms': {}, 'caches': {}}
+        for name, t in sorted(timings.items()):
+            result['timings_ms'][name] = {
+                'count': t['count'],
+                'mean': t['total'] / t['count'],
+                'p50': _percentile(t['buckets'], 0.5, t['max']),
+                'p95': _percentile(t['buckets'], 0.95, t['max']),
+                'max': t['max'],
+                'histogram': dict(zip(labels, t['buckets'])),
+            }
+        for name, (hit, miss) in sorted(hits.items()):
+            result['caches'][name] = {'hits': hit, 'misses': miss, 'hit_rate': hit / (hit + miss)}
+        return result
+
+    def summary(self):
+        """A few lines of text for the overlay."""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<16}{'n':>6}{'mean':>8}{'p95':>8}{'max':>8}  ms"]
+        for name, t in snapshot['timings_ms'].items():
+            lines.append(f"{name:<16}{t['count']:>6}{t['mean']:>8.1f}{t['p95']:>8.0f}{t['max']:>8.1f}")
+        if snapshot['caches']:
+            lines.append('')
+            lines.append(f"{'cache':<16}{'hits':>14}")
+            for name, c in snapshot['caches'].items():
+                lines.append(f"{name:<16}{c['hit_rate']:>8.0%} of {c['hits'] + c['misses']}")
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = dict(self.snapshot(), date=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+def _percentile(buckets, fraction, max_ms):
+    # The upper bound of the bucket the percentile falls in, the open last
+    # bucket reports the largest time seen
+    wanted = fraction * sum(buckets)
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if n and seen >= wanted:
+            return min(PERF_BUCKETS_MS[i], max_ms) if i < len(PERF_BUCKETS_MS) else max_ms
+    return max_ms
+
+
+def measure(name):
+    """Decorator that times every call of the function under name."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not stats.enabled:
+                return func(*args, **kwargs)
+            with _Timer(stats, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class StartupTimer:
+    """Wall clock time of the startup phases, each one from the end of the previous one."""
+
+    def __init__(self, start=None):
+        self._last = start if start is not None else time.perf_counter()
+        self.phases = {}
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases[name] = (now - self._last) * 1000
+        self._last = now
+
+    def report(self):
+        return {'phases_ms': dict(self.phases), 'total_ms': sum(self.phases.values())}
+
+    def write(self, destination):
+        """Print the phases to stderr for '1', otherwise write them as JSON to the path."""
+        report = self.report()
+        if destination == '1':
+            for name, ms in report['phases_ms'].items():
+                print(f'{name:<12}{ms:>8.1f} ms', file=sys.stderr)
+            print(f"{'total':<12}{report['total_ms']:>8.1f} ms", file=sys.stderr)
+            return
+        # Written under another name first, a script may be waiting for the file
+        temp_path = destination + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        os.replace(temp_path, destination)
+
+
+class _FirstPaintFilter(QObject):
+    def __init__(self, callback):
+        super().__init__(QApplication.instance())
+        self.callback = callback
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.callback is not None:
+            callback, self.callback = self.callback, None
+            QApplication.instance().removeEventFilter(self)
+            # Let the frame finish painting first
+            QTimer.singleShot(0, callback)
+        return False
+
+
+def on_first_paint(callback):
+    """Call callback once the first widget of the application has painted."""
+    QApplication.instance().installEventFilter(_FirstPaintFilter(callback))
+
+
+# Shared by the whole application, IMAGEMAN_PERF=1 switches it on from the start
+stats = PerfStats(enabled=os.environ.get('IMAGEMAN_PERF') == '1')
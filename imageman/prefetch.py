@@ -0,0 +1,134 @@
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QImageIOHandler
+
+from imageman.constants import PREFETCH_RADIUS, PREFETCH_WORKERS
+from imageman import perf
+
+
+def read_image(path, max_size=None):
+    """Decode the image at path.
+
+    Images larger than max_size are decoded scaled down to fit inside it.
+    JPEG does most of that reduction while decoding, so a huge photo never
+    exists at full resolution in memory.
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    if max_size is not None:
+        with perf.stats.timed('read_header'):
+            size = reader.size()
+        if size.isValid():
+            # The scaled size applies before EXIF rotation
+            bound = QSize(max_size)
+            if reader.transformation() & QImageIOHandler.TransformationRotate90:
+                bound.transpose()
+            if size.width() > bound.width() or size.height() > bound.height():
+                reader.setScaledSize(size.scaled(bound, Qt.KeepAspectRatio))
+    with perf.stats.timed('decode'):
+        return reader.read()
+
+
+class _DecodeSignals(QObject):
+    decoded = pyqtSignal(int, str, QImage)
+
+
+class _DecodeTask(QRunnable):
+    def __init__(self, signals, generation, path, max_size):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.path = path
+        self.max_size = max_size
+
+    def run(self):
+        self.signals.decoded.emit(self.generation, self.path, read_image(self.path, self.max_size))
+
+
+class DecodeAheadBuffer(QObject):
+    """Bounded buffer of decoded images around the current index.
+
+    update() keeps the `radius` images on each side of the current one
+    decoded in the background, starting with the side the user is moving
+    towards. Anything outside that window is dropped, so at most
+    2 * radius + 1 images are held at once. Images are decoded no larger
+    than max_size when it is set.
+    """
+
+    def __init__(self, radius=PREFETCH_RADIUS, parent=None):
+        super().__init__(parent)
+        self.radius = radius
+        self.max_size = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(PREFETCH_WORKERS)
+        self._signals = _DecodeSignals()
+        self._signals.decoded.connect(self._on_decoded)
+        self._generation = 0
+        self._images = OrderedDict()
+        self._window = set()
+        self._pending = []
+        self._loading = set()
+
+    def get(self, path):
+        return self._images.get(path)
+
+    def put(self, path, image):
+        if not image.isNull():
+            self._images[path] = image
+
+    def discard(self, path):
+        self._images.pop(path, None)
+        self._window.discard(path)
+
+    def rename(self, old_path, new_path):
+        image = self._images.pop(old_path, None)
+        if image is not None:
+            self._images[new_path] = image
+        if old_path in self._window:
+            self._window.discard(old_path)
+            self._window.add(new_path)
+
+    def invalidate(self):
+        """Forget everything, e.g. after the directory or the file names changed."""
+        self._generation += 1
+        self._images.clear()
+        self._window = set()
+        self._pending = []
+        self._loading = set()
+
+    def update(self, image_dir, names, index, direction=1):
+        """Decode ahead around names[index], favouring the given direction (+1 or -1)."""
+        if not names:
+            self.invalidate()
+            return
+        count = len(names)
+        order = [index]
+        for step in (direction, -direction):
+            for offset in range(1, self.radius + 1):
+                order.append((index + step * offset) % count)
+        paths = []
+        for i in order:
+            path = os.path.join(image_dir, names[i])
+            if path not in paths:
+                paths.append(path)
+        self._window = set(paths)
+        for path in [p for p in self._images if p not in self._window]:
+            del self._images[path]
+        self._pending = [p for p in reversed(paths) if p not in self._images and p not in self._loading]
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._pending and len(self._loading) < self.pool.maxThreadCount():
+            path = self._pending.pop()
+            self._loading.add(path)
+            self.pool.start(_DecodeTask(self._signals, self._generation, path, self.max_size))
+
+    def _on_decoded(self, generation, path, image):
+        if generation != self._generation:
+            return
+        self._loading.discard(path)
+        if path in self._window and path not in self._images:
+            self.put(path, image)
+        self._dispatch()
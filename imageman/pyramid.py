@@ -0,0 +1,113 @@
+import threading
+
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from imageman import perf
+
+
+class ImagePyramid:
+    """Pre-downsampled copies of one image, each half the size of the one before.
+
+    Levels are made the first time a size needs them, every one from the
+    level above it, and kept for as long as the pyramid lives. scaled()
+    starts from the smallest level that is still at least as large as the
+    requested size, so a smooth scale never reads more than about four
+    times the pixels it writes, however large the source is. The levels
+    are QImages or QPixmaps, whatever the pyramid was made from. A pyramid
+    of QImages can be scaled from a worker thread while the GUI thread
+    keeps using it.
+    """
+
+    def __init__(self, image):
+        self.levels = [image]
+        self._lock = threading.Lock()
+
+    def level_for(self, width, height, create=True):
+        """Return the smallest level that covers width x height.
+
+        Missing levels are made unless create is False, then the smallest
+        level made so far that covers the size is returned.
+        """
+        levels = list(self.levels)
+        for level in levels:
+            if level.width() // 2 < width or level.height() // 2 < height:
+                return level
+        if not create:
+            return level
+        while level.width() // 2 >= max(width, 1) and level.height() // 2 >= max(height, 1):
+            with perf.stats.timed('pyramid_level'):
+                level = level.scaled(level.width() // 2, level.height() // 2,
+                                     Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            with self._lock:
+                if len(self.levels) == len(levels):
+                    self.levels.append(level)
+                else:
+                    # The other thread made this level in the meantime
+                    level = self.levels[len(levels)]
+            levels.append(level)
+        return level
+
+    def scaled(self, width, height):
+        level = self.level_for(width, height)
+        if level.width() == width and level.height() == height:
+            return level
+        return level.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    def preview(self, width, height):
+        """A quick, unfiltered scale from the levels made so far."""
+        return self.level_for(width, height, create=False).scaled(width, height, Qt.KeepAspectRatio,
+                                                                  Qt.FastTransformation)
+
+
+class _ScaleSignals(QObject):
+    scaled = pyqtSignal(int, QImage)
+
+
+class _ScaleTask(QRunnable):
+    def __init__(self, signals, generation, pyramid, width, height):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.pyramid = pyramid
+        self.width = width
+        self.height = height
+
+    def run(self):
+        with perf.stats.timed('scale'):
+            image = self.pyramid.scaled(self.width, self.height)
+        self.signals.scaled.emit(self.generation, image)
+
+
+class SmoothScaler(QObject):
+    """Smoothly scales one ImagePyramid of QImages at a time on a worker thread.
+
+    The pyramid levels a request needs are made on the worker as well. A
+    new request or cancel() makes the result of the previous request
+    disappear, scaled is only emitted for the latest one.
+    """
+    scaled = pyqtSignal(QImage)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._signals = _ScaleSignals()
+        self._signals.scaled.connect(self._on_scaled)
+        self._generation = 0
+
+    def request(self, pyramid, width, height):
+        self.cancel()
+        self.pool.start(_ScaleTask(self._signals, self._generation, pyramid, width, height))
+
+    def cancel(self):
+        self._generation += 1
+        self.pool.clear()
+
+    def close(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+    def _on_scaled(self, generation, image):
+        if generation == self._generation:
+            self.scaled.emit(image)
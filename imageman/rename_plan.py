@@ -0,0 +1,168 @@
+import os
+import json
+
+_TEMP_SUFFIX = '.renaming'
+
+
+class RenameConflict(Exception):
+    """A rename target is taken by a file that is not part of the plan."""
+
+
+def plan_renames(mapping, existing=()):
+    """Order the renames in mapping ({old_name: new_name}) so none overwrites another.
+
+    Files whose name already matches are left alone. Renames that form a
+    chain are ordered so each target is free by the time it is used, and
+    each cycle (a -> b -> a) costs exactly one extra move through a
+    temporary name. existing lists the other names in the directory, they
+    are used to pick free temporary names and to detect conflicts.
+
+    Returns a list of (src, dst) steps, every file is touched once except
+    for one file per cycle, which is touched twice.
+    """
+    key = os.path.normcase
+    sources = {}
+    for old, new in mapping.items():
+        if key(old) != key(new):
+            sources[key(old)] = (old, new)
+    wanted_by = {key(new): key(old) for old, new in sources.values()}
+    taken = {key(name) for name in existing} | set(sources)
+    for old, new in sources.values():
+        if key(new) in taken and key(new) not in sources:
+            raise RenameConflict(f'Cannot rename {old} to {new}, a file with that name already exists')
+
+    steps = []
+    done = set()
+
+    def follow(name_key, first_dst):
+        # Rename name_key, then whatever wanted its name, and so on backwards
+        dst = first_dst
+        while name_key is not None and name_key not in done:
+            done.add(name_key)
+            src = sources[name_key][0]
+            steps.append((src, dst))
+            dst = src
+            name_key = wanted_by.get(name_key)
+        return dst
+
+    # Chains end in a free name, start there
+    for name_key, (old, new) in sources.items():
+        if key(new) not in sources:
+            follow(name_key, new)
+
+    # Whatever is left is made of cycles
+    for name_key, (old, new) in sources.items():
+        if name_key in done:
+            continue
+        temp = old + _TEMP_SUFFIX
+        n = 1
+        while key(temp) in taken:
+            n += 1
+            temp = f'{old}{_TEMP_SUFFIX}{n}'
+        taken.add(key(temp))
+        steps.append((old, temp))
+        done.add(name_key)
+        # Walk the cycle backwards until the file that wanted old's name
+        # takes it, then the parked file goes to its own target.
+        follow(wanted_by[name_key], old)
+        steps.append((temp, new))
+    return steps
+
+
+class RenameJournal:
+    """Records a rename plan and its progress so an interrupted run can be recovered.
+
+    The plan is written once before the first rename, after that every
+    completed step appends its number. The journal lives outside the image
+    directory, so on a network share a step costs one remote rename.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def start(self, directory, steps):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps({'dir': directory, 'steps': steps}) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def mark(self, step):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(f'{step}\n')
+        self._file.flush()
+
+    def load(self):
+        """Return (directory, steps, number of steps known to be done)."""
+        with open(self.path, encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            done = 0
+            for line in f:
+                if line.strip().isdigit():
+                    done = max(done, int(line) + 1)
+        return header['dir'], [tuple(step) for step in header['steps']], done
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def apply_plan(directory, steps, journal, start=0):
+    """Run steps[start:] in directory, recording each one in the journal.
+
+    The journal is removed once all steps are done. On an error it is kept
+    and the exception propagates, see resume_plan() and rollback_plan().
+    """
+    if start == 0:
+        journal.start(directory, steps)
+    try:
+        for i in range(start, len(steps)):
+            src, dst = steps[i]
+            os.rename(os.path.join(directory, src), os.path.join(directory, dst))
+            journal.mark(i)
+    finally:
+        journal.close()
+    journal.finish()
+
+
+def _first_pending(directory, steps, done):
+    # The step after the last recorded one may have happened without being
+    # recorded. Its source is gone and its target is there in that case.
+    if done < len(steps):
+        src, dst = steps[done]
+        if not os.path.exists(os.path.join(directory, src)) and os.path.exists(os.path.join(directory, dst)):
+            return done + 1
+    return done
+
+
+def resume_plan(journal):
+    """Finish an interrupted plan. Returns the directory and the steps."""
+    directory, steps, done = journal.load()
+    apply_plan(directory, steps, journal, _first_pending(directory, steps, done))
+    return directory, steps
+
+
+def rollback_plan(journal):
+    """Undo the completed steps of an interrupted plan, newest first."""
+    directory, steps, done = journal.load()
+    for src, dst in reversed(steps[:_first_pending(directory, steps, done)]):
+        src_path, dst_path = os.path.join(directory, src), os.path.join(directory, dst)
+        # Skip steps an earlier, interrupted rollback already undid
+        if not os.path.exists(dst_path) and os.path.exists(src_path):
+            continue
+        os.rename(dst_path, src_path)
+    journal.finish()
+    return directory
@@ -0,0 +1,64 @@
+import os
+
+
+def list_directory(directory):
+    try:
+        with os.scandir(directory) as it:
+            return [entry.name for entry in it]
+    except FileNotFoundError:
+        return []
+
+
+def parse_sequence_name(name):
+    """Split 'tag_0012.jpg' into ('tag', 12, '.jpg'), or return None."""
+    stem, ext = os.path.splitext(name)
+    tag, sep, seq = stem.rpartition('_')
+    if not sep or not tag or not seq.isdigit():
+        return None
+    return tag, int(seq), ext
+
+
+class SequenceAllocator:
+    """Hands out the next free tag_NNNN name in a directory.
+
+    Each directory is listed once, the first time a name is asked for in
+    it, and the highest sequence number per (tag, extension) is kept in
+    memory from then on. Allocating a name is a dictionary lookup, however
+    many files the directory already holds. Names are handed out above the
+    current maximum, so gaps left by deleted files are not reused.
+    list_names(directory) returns the names to start from, by default
+    the directory is listed on disk.
+    """
+
+    def __init__(self, list_names=list_directory):
+        self._max = {}
+        self._list_names = list_names
+
+    def next_name(self, directory, tag, ext):
+        seqs = self._sequences(directory)
+        key = (tag, ext.lower())
+        seq = seqs.get(key, 0) + 1
+        seqs[key] = seq
+        return f"{tag}_{seq:04d}{ext}"
+
+    def forget(self, directory=None):
+        """Drop what is known about directory (or all directories) so it is listed again."""
+        if directory is None:
+            self._max.clear()
+        else:
+            self._max.pop(os.path.abspath(directory), None)
+
+    def _sequences(self, directory):
+        directory = os.path.abspath(directory)
+        seqs = self._max.get(directory)
+        if seqs is None:
+            seqs = {}
+            for name in self._list_names(directory):
+                parsed = parse_sequence_name(name)
+                if parsed is not None:
+                    tag, seq, ext = parsed
+                    key = (tag, ext.lower())
+                    if seq > seqs.get(key, 0):
+                        seqs[key] = seq
+            self._max[directory] = seqs
+        return seqs
@@ -0,0 +1,140 @@
+import os
+import json
+
+from PyQt5.QtCore import QObject, QTimer, QStandardPaths
+
+from imageman.constants import SETTINGS_SAVE_DELAY_MS
+
+try:
+    import winreg
+except ImportError:  # Not on Windows
+    winreg = None
+
+REGISTRY_KEY = r"Software\ImageMan"
+
+
+class MemoryBackend:
+    """Keeps the settings for the lifetime of the process only, used by the tests."""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    def load(self):
+        return dict(self.values)
+
+    def save(self, values):
+        self.values.update(values)
+
+
+class RegistryBackend:
+    """String values under HKEY_CURRENT_USER\\Software\\ImageMan, as ImageMan always stored them."""
+
+    def load(self):
+        values = {}
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, REGISTRY_KEY, 0, winreg.KEY_READ) as key:
+                i = 0
+                while True:
+                    try:
+                        name, value, _ = winreg.EnumValue(key, i)
+                    except OSError:
+                        break
+                    values[name] = str(value)
+                    i += 1
+        except OSError:
+            pass
+        return values
+
+    def save(self, values):
+        with winreg.CreateKey(winreg.HKEY_CURRENT_USER, REGISTRY_KEY) as key:
+            for name, value in values.items():
+                winreg.SetValueEx(key, name, 0, winreg.REG_SZ, value)
+
+
+class JsonBackend:
+    """A JSON file, the default where there is no registry."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                values = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {str(name): str(value) for name, value in values.items()} if isinstance(values, dict) else {}
+
+    def save(self, values):
+        merged = self.load()
+        merged.update(values)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+def default_backend():
+    """Pick the backend from IMAGEMAN_SETTINGS (registry, json or memory).
+
+    Without it the registry is used on Windows and a JSON file in the
+    user's config directory elsewhere. IMAGEMAN_SETTINGS_FILE overrides
+    the path of the JSON file.
+    """
+    kind = os.environ.get('IMAGEMAN_SETTINGS', '').lower()
+    if kind == 'memory':
+        return MemoryBackend()
+    if kind == 'registry' or (not kind and winreg is not None):
+        return RegistryBackend()
+    path = os.environ.get('IMAGEMAN_SETTINGS_FILE')
+    if not path:
+        config_dir = QStandardPaths.writableLocation(QStandardPaths.GenericConfigLocation)
+        path = os.path.join(config_dir, 'ImageMan', 'settings.json')
+    return JsonBackend(path)
+
+
+class Settings(QObject):
+    """All settings, read once and kept in memory.
+
+    Values are strings, stored under the names ImageMan has always used.
+    set() only changes the in-memory copy and schedules a save, changes
+    made within delay_ms of each other are written together. flush()
+    writes whatever is pending right away, the window calls it on close.
+    """
+
+    def __init__(self, backend=None, delay_ms=SETTINGS_SAVE_DELAY_MS, parent=None):
+        super().__init__(parent)
+        self.backend = backend if backend is not None else default_backend()
+        try:
+            self._values = self.backend.load()
+        except Exception:
+            self._values = {}
+        self._dirty = set()
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(delay_ms)
+        self._save_timer.timeout.connect(self.flush)
+
+    def get(self, name, default=None):
+        return self._values.get(name, default)
+
+    def set(self, name, value):
+        value = str(value)
+        if self._values.get(name) == value:
+            return
+        self._values[name] = value
+        self._dirty.add(name)
+        self._save_timer.start()
+
+    def flush(self):
+        self._save_timer.stop()
+        if not self._dirty:
+            return
+        changed = {name: self._values[name] for name in self._dirty}
+        self._dirty = set()
+        try:
+            self.backend.save(changed)
+        except Exception:
+            # Settings are a convenience, never fail an operation over them
+            pass
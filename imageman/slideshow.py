@@ -0,0 +1,231 @@
+import os
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from imageman.constants import (
+    SLIDESHOW_FRAME_SIZE, SLIDESHOW_WORKERS, SLIDESHOW_FRAMES_PER_WORKER, SLIDESHOW_VIDEO_FPS,
+    SLIDESHOW_FRAME_CACHE_MAX_BYTES
+)
+
+_FRAME_EXT = '.png'
+
+
+def fit_to_frame(img, frame_size=SLIDESHOW_FRAME_SIZE):
+    """Scale img to fit inside frame_size and center it on a black background."""
+    target_width, target_height = frame_size
+    original_width, original_height = img.size
+    aspect_ratio = original_width / original_height
+    target_aspect_ratio = target_width / target_height
+
+    if aspect_ratio > target_aspect_ratio:
+        # Image is wider than target, fit to width
+        new_width = target_width
+        new_height = int(new_width / aspect_ratio)
+    else:
+        # Image is taller or same aspect ratio, fit to height
+        new_height = target_height
+        new_width = int(new_height * aspect_ratio)
+
+    resized_img = img.resize((new_width, new_height), Image.LANCZOS)
+
+    frame = Image.new("RGB", (target_width, target_height), (0, 0, 0))
+    paste_x = (target_width - new_width) // 2
+    paste_y = (target_height - new_height) // 2
+    frame.paste(resized_img, (paste_x, paste_y))
+    return frame
+
+
+class FrameCache:
+    """On-disk store of letterboxed slideshow frames.
+
+    Frames are saved as PNG files named after the source path, its mtime
+    and size, and the frame size, so an edited image simply misses. A hit
+    bumps the file's mtime, and evict() removes the least recently used
+    frames once the total size exceeds max_bytes. Only plain attributes
+    are kept, the cache is handed to the worker processes as is.
+    """
+
+    def __init__(self, cache_dir, max_bytes=SLIDESHOW_FRAME_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _frame_path(self, path, frame_size):
+        st = os.stat(path)
+        key = '|'.join([os.path.normcase(os.path.abspath(path)), str(st.st_mtime_ns), str(st.st_size),
+                        '%dx%d' % tuple(frame_size)])
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + _FRAME_EXT)
+
+    def load(self, path, frame_size):
+        """Return the cached frame for path as RGB bytes, or None."""
+        frame_path = self._frame_path(path, frame_size)
+        try:
+            with Image.open(frame_path) as frame:
+                if frame.size != tuple(frame_size) or frame.mode != 'RGB':
+                    return None
+                data = frame.tobytes()
+            os.utime(frame_path)
+            return data
+        except Exception:
+            return None
+
+    def store(self, path, frame_size, frame):
+        frame_path = self._frame_path(path, frame_size)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Several workers may store at once, write under a private name first
+        temp_path = f'{frame_path}.{os.getpid()}.tmp'
+        try:
+            frame.save(temp_path, format='PNG', compress_level=1)
+            os.replace(temp_path, frame_path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def evict(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        files = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(_FRAME_EXT):
+                st = entry.stat()
+                files.append((st.st_mtime, entry.path, st.st_size))
+                total += st.st_size
+        for _, frame_path, file_size in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(frame_path)
+                total -= file_size
+            except OSError:
+                continue
+
+    def stats(self):
+        files, total = 0, 0
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(_FRAME_EXT):
+                    files += 1
+                    total += entry.stat().st_size
+        return {'frames': files, 'bytes': total, 'limit': self.max_bytes}
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(_FRAME_EXT):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        continue
+
+
+def _render_frame(path, frame_size, cache=None):
+    # Runs in a worker process, so errors are returned rather than raised
+    # and the pool keeps going with the other images.
+    try:
+        if cache is not None:
+            data = cache.load(path, frame_size)
+            if data is not None:
+                return data, None
+        with Image.open(path) as img:
+            frame = fit_to_frame(img, frame_size)
+        if cache is not None:
+            cache.store(path, frame_size, frame)
+        return frame.tobytes(), None
+    except Exception as e:
+        return None, f"{os.path.basename(path)}: {e}"
+
+
+def _iter_frames(executor, paths, frame_size, in_flight, cache=None):
+    """Yield (path, rgb_bytes, error) for paths in order.
+
+    At most in_flight images are being rendered or waiting to be consumed
+    at any time, so memory use does not grow with the number of images.
+    """
+    pending = deque()
+    for path in paths:
+        pending.append((path, executor.submit(_render_frame, path, frame_size, cache)))
+        if len(pending) >= in_flight:
+            path, future = pending.popleft()
+            yield (path,) + future.result()
+    while pending:
+        path, future = pending.popleft()
+        yield (path,) + future.result()
+
+
+def still_frame_rate(duration):
+    """Return (fps, repeats) so that repeats frames at fps show a still for duration seconds.
+
+    ffmpeg is given the input rate with two decimals, so the rate is chosen
+    to be exact there, e.g. 3 seconds becomes three frames at 1 fps rather
+    than one frame at 0.33 fps.
+    """
+    for repeats in range(1, 101):
+        fps = repeats / duration
+        if abs(round(fps, 2) - fps) < 1e-9:
+            return round(fps, 2), repeats
+    return SLIDESHOW_VIDEO_FPS, max(1, round(duration * SLIDESHOW_VIDEO_FPS))
+
+
+def write_slideshow(paths, output_path, duration, min_length_seconds,
+                    frame_size=SLIDESHOW_FRAME_SIZE, workers=SLIDESHOW_WORKERS, cache=None):
+    """Encode paths as a slideshow video of at least min_length_seconds.
+
+    Frames are rendered in a pool of worker processes and piped straight
+    into ffmpeg, no temporary files are written. The list
+    is looped as often as needed, each loop renders the stills again so
+    memory use is the same for a short or a long video. With a FrameCache,
+    only images that are new or changed since an earlier render are
+    resized again.
+
+    Returns the number of images in one loop and a list of error messages
+    for the images that were skipped. No video is written when no image
+    could be rendered.
+    """
+    # moviepy takes most of a second to import, and the worker processes
+    # that import this module never need it
+    from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+    fps, repeats = still_frame_rate(duration)
+    workers = workers or os.cpu_count() or 1
+    in_flight = workers * SLIDESHOW_FRAMES_PER_WORKER
+    writer = None
+    valid_paths, failures = [], []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # The first loop finds out which images can be used
+            for path, data, error in _iter_frames(executor, paths, frame_size, in_flight, cache):
+                if error is not None:
+                    failures.append(error)
+                    continue
+                if writer is None:
+                    writer = FFMPEG_VideoWriter(output_path, frame_size, fps, codec="libx264",
+                                                ffmpeg_params=["-r", str(SLIDESHOW_VIDEO_FPS)])
+                frame = memoryview(data)
+                for _ in range(repeats):
+                    writer.write_frame(frame)
+                valid_paths.append(path)
+            if writer is None:
+                return 0, failures
+
+            single_pass_duration = len(valid_paths) * duration
+            loop_count = max(1, int(min_length_seconds / single_pass_duration) + 1)
+            for _ in range(loop_count - 1):
+                for path, data, error in _iter_frames(executor, valid_paths, frame_size, in_flight, cache):
+                    if error is not None:
+                        # The file changed since the first loop, show the frame we
+                        # can't render as black rather than shortening the loop
+                        data = Image.new("RGB", frame_size, (0, 0, 0)).tobytes()
+                    frame = memoryview(data)
+                    for _ in range(repeats):
+                        writer.write_frame(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+        if cache is not None:
+            cache.evict()
+    return len(valid_paths), failures
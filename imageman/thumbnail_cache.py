@@ -0,0 +1,282 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+
+from PyQt5 import sip
+from PyQt5.QtCore import QStandardPaths
+from PyQt5.QtGui import QImage
+
+from imageman.constants import THUMBNAIL_SIZE, THUMBNAIL_CACHE_MAX_BYTES, THUMBNAIL_CACHE_FLUSH_EVERY
+
+# Packed file layout: header, pixel blobs, JSON index. New thumbnails are
+# appended after the current index and the header is rewritten last, so a
+# crash in the middle of a flush leaves the previous index intact.
+_MAGIC = b'IMTC'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIIQQ')  # magic, version, thumbnail size, index offset, index length
+_ALIGN = 16
+_FORMAT = QImage.Format_ARGB32
+_EXT = '.imtc'
+
+
+def default_cache_dir(kind='thumbnails'):
+    override = os.environ.get('IMAGEMAN_CACHE_DIR')
+    if override:
+        return os.path.join(override, kind)
+    base = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation)
+    return os.path.join(base, 'ImageMan', kind)
+
+
+class ThumbnailCache:
+    """On-disk thumbnail store with one packed, memory-mapped file per directory.
+
+    Entries are keyed by file name, mtime and size. Files are evicted across
+    directories in least-recently-opened order once the total size exceeds
+    max_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=THUMBNAIL_CACHE_MAX_BYTES, size=THUMBNAIL_SIZE):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.size = size
+        self.image_dir = None
+        self._path = None
+        self._mmap = None
+        self._view = None
+        self._index = {}
+        self._index_end = _HEADER.size
+        self._garbage = 0
+        self._pending = {}
+        self._dirty = False
+
+    def _cache_path(self, image_dir):
+        key = os.path.normcase(os.path.abspath(image_dir))
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + _EXT)
+
+    def open(self, image_dir):
+        """Map the packed file for image_dir, flushing the previous directory first."""
+        image_dir = os.path.abspath(image_dir)
+        if image_dir == self.image_dir:
+            return
+        self.close()
+        self.image_dir = image_dir
+        self._path = self._cache_path(image_dir)
+        if not os.path.exists(self._path):
+            return
+        try:
+            os.utime(self._path)  # Mark as most recently used for eviction
+            self._map()
+        except (OSError, ValueError, KeyError, struct.error):
+            self._unmap()
+            self._index = {}
+            self._remove(self._path)
+
+    def close(self):
+        self.flush()
+        self._unmap()
+        self._index = {}
+        self._pending = {}
+        self.image_dir = None
+        self._path = None
+
+    def get(self, name, mtime_ns, file_size):
+        """Return the cached thumbnail or None.
+
+        The QImage points straight into the mapped file, so it is only
+        valid until the next flush() or close(). Convert it to a QPixmap
+        (or copy() it) right away.
+        """
+        pending = self._pending.get(name)
+        if pending is not None:
+            if pending[0] == mtime_ns and pending[1] == file_size:
+                return pending[2]
+            return None
+        entry = self._index.get(name)
+        if entry is None or entry[0] != mtime_ns or entry[1] != file_size:
+            return None
+        offset, width, height, bytes_per_line = entry[2:6]
+        data = self._view[offset:offset + height * bytes_per_line]
+        return QImage(sip.voidptr(data), width, height, bytes_per_line, _FORMAT)
+
+    def put(self, name, mtime_ns, file_size, image):
+        if self.image_dir is None or image.isNull():
+            return
+        self._pending[name] = (mtime_ns, file_size, image.convertToFormat(_FORMAT))
+        if len(self._pending) >= THUMBNAIL_CACHE_FLUSH_EVERY:
+            self.flush()
+
+    def rename(self, mapping):
+        """Carry thumbnails over to new file names; a rename keeps mtime and size."""
+        moved = {new: self._index.pop(old) for old, new in mapping.items() if old in self._index}
+        for new, entry in moved.items():
+            old_entry = self._index.get(new)
+            if old_entry is not None:
+                self._garbage += old_entry[4] * old_entry[5]
+            self._index[new] = entry
+            self._dirty = True
+        moved = {new: self._pending.pop(old) for old, new in mapping.items() if old in self._pending}
+        self._pending.update(moved)
+
+    def retain(self, names):
+        """Forget thumbnails for files that are no longer in the directory."""
+        names = set(names)
+        for name in [n for n in self._index if n not in names]:
+            entry = self._index.pop(name)
+            self._garbage += entry[4] * entry[5]
+            self._dirty = True
+        for name in [n for n in self._pending if n not in names]:
+            del self._pending[name]
+
+    def flush(self):
+        if self._path is None or not (self._pending or self._dirty):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if self._mmap is None or self._garbage > self._index_end // 2:
+                self._rewrite()
+            else:
+                self._append()
+        except OSError:
+            # Keep the pending thumbnails and try again on the next flush
+            self._unmap()
+            self._index = {}
+            try:
+                self._map()
+            except (OSError, ValueError, KeyError, struct.error):
+                self._unmap()
+                self._index = {}
+            return
+        self._pending = {}
+        self._dirty = False
+        self._evict()
+
+    def stats(self):
+        files, total = 0, 0
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(_EXT):
+                    files += 1
+                    total += entry.stat().st_size
+        return {
+            'directories': files,
+            'bytes': total,
+            'limit': self.max_bytes,
+            'entries': len(self._index) + len(self._pending),
+        }
+
+    def clear(self):
+        image_dir = self.image_dir
+        self._pending = {}
+        self._dirty = False
+        self.close()
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(_EXT):
+                    self._remove(entry.path)
+        if image_dir is not None:
+            self.open(image_dir)
+
+    def _map(self):
+        with open(self._path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, size, index_offset, index_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION or size != self.size:
+            raise ValueError('Incompatible thumbnail cache file')
+        index = json.loads(bytes(self._view[index_offset:index_offset + index_length]))
+        if index['dir'] != self.image_dir:
+            raise ValueError('Thumbnail cache file belongs to another directory')
+        self._index = index['entries']
+        self._index_end = index_offset + index_length
+        live = sum(entry[4] * entry[5] for entry in self._index.values())
+        self._garbage = max(0, index_offset - _HEADER.size - live)
+
+    def _unmap(self):
+        try:
+            if self._view is not None:
+                self._view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            pass  # A caller still holds a view; the map closes once it is released
+        self._view = None
+        self._mmap = None
+
+    def _write_blobs(self, f, blobs):
+        for name, mtime_ns, file_size, width, height, bytes_per_line, data in blobs:
+            padding = -f.tell() % _ALIGN
+            if padding:
+                f.write(b'\0' * padding)
+            self._index[name] = [mtime_ns, file_size, f.tell(), width, height, bytes_per_line]
+            f.write(data)
+
+    def _pending_blobs(self):
+        for name, (mtime_ns, file_size, image) in self._pending.items():
+            old = self._index.pop(name, None)
+            if old is not None:
+                self._garbage += old[4] * old[5]
+            data = image.constBits().asstring(image.sizeInBytes())
+            yield name, mtime_ns, file_size, image.width(), image.height(), image.bytesPerLine(), data
+
+    def _write_index(self, f):
+        index = json.dumps({'dir': self.image_dir, 'entries': self._index}).encode('utf-8')
+        index_offset = f.tell()
+        f.write(index)
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _VERSION, self.size, index_offset, len(index)))
+        self._index_end = index_offset + len(index)
+
+    def _append(self):
+        blobs = list(self._pending_blobs())
+        self._unmap()
+        with open(self._path, 'r+b') as f:
+            f.seek(self._index_end)
+            self._write_blobs(f, blobs)
+            self._write_index(f)
+        self._map()
+
+    def _rewrite(self):
+        # Copy the live entries out of the old file before it is replaced.
+        blobs = []
+        for name, (mtime_ns, file_size, offset, width, height, bytes_per_line) in self._index.items():
+            if name not in self._pending:
+                data = bytes(self._view[offset:offset + height * bytes_per_line])
+                blobs.append((name, mtime_ns, file_size, width, height, bytes_per_line, data))
+        blobs.extend(self._pending_blobs())
+        self._unmap()
+        self._index = {}
+        temp_path = self._path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(b'\0' * _HEADER.size)
+            self._write_blobs(f, blobs)
+            self._write_index(f)
+        os.replace(temp_path, self._path)
+        self._garbage = 0
+        self._map()
+
+    def _evict(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(_EXT):
+                st = entry.stat()
+                files.append((st.st_mtime, entry.path, st.st_size))
+                total += st.st_size
+        for _, path, file_size in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == self._path:
+                continue
+            if self._remove(path):
+                total -= file_size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,289 @@
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QMimeData, QByteArray
+from PyQt5.QtGui import QIcon, QPixmap, QColor, QBrush
+
+from imageman.constants import (
+    THUMBNAIL_SIZE, THUMBNAIL_PLACEHOLDER_COLOR, THUMBNAIL_FETCH_BATCH, THUMBNAIL_ICON_CACHE_SIZE,
+    DUPLICATE_GROUP_COLORS
+)
+from imageman import perf
+
+THUMBNAIL_MIME_TYPE = 'application/x-imageman-thumbnails'
+
+
+class ThumbnailModel(QAbstractListModel):
+    """List model over the image names of one directory.
+
+    Rows are exposed to the view in batches through fetchMore(), and icons
+    are only looked up when the view asks for a row it is about to paint:
+    first in a small in-memory LRU, then in the on-disk thumbnail cache and
+    otherwise by queueing a background decode. Qt.UserRole holds the file
+    name. Names that are part of a duplicate group (see set_groups) are
+    labelled with the group number and shaded in alternating colours.
+    A file that fails to decode keeps its placeholder, unless file_ops
+    still has an operation queued for it.
+    """
+
+    def __init__(self, loader, cache, directory_index=None, parent=None, file_ops=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.cache = cache
+        self.directory_index = directory_index
+        self.file_ops = file_ops
+        self.image_dir = None
+        self.show_filenames = True
+        self._names = []
+        self._rows = None
+        self._fetched = 0
+        self._icons = OrderedDict()
+        self._stats = {}
+        self._failed = set()
+        self._group_of = {}
+        self._group_brushes = [QBrush(QColor(color)) for color in DUPLICATE_GROUP_COLORS]
+        placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        placeholder.fill(QColor(THUMBNAIL_PLACEHOLDER_COLOR))
+        self._placeholder = QIcon(placeholder)
+        self.loader.thumbnail_ready.connect(self._on_thumbnail_ready)
+
+    def set_images(self, image_dir, names):
+        self.beginResetModel()
+        self.loader.cancel()
+        self.image_dir = image_dir
+        self._names = list(names)
+        self._rows = None
+        self._fetched = 0
+        self._icons.clear()
+        self._stats = {}
+        self._failed = set()
+        self.cache.open(image_dir)
+        self.cache.retain(self._names)
+        self.endResetModel()
+
+    def set_groups(self, groups):
+        """Label the names of each group in groups, None clears the labels."""
+        self._group_of = {name: i for i, group in enumerate(groups or []) for name in group}
+        if self._fetched:
+            self.dataChanged.emit(self.index(0), self.index(self._fetched - 1),
+                                  [Qt.DisplayRole, Qt.BackgroundRole])
+
+    def names(self):
+        return list(self._names)
+
+    def row_of(self, name):
+        if self._rows is None:
+            self._rows = {n: row for row, n in enumerate(self._names)}
+        return self._rows.get(name, -1)
+
+    def name_at(self, row):
+        return self._names[row]
+
+    def ensure_fetched(self, row):
+        if row >= self._fetched:
+            self._fetch_to(min(row + 1, len(self._names)))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._fetched
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._fetched < len(self._names)
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            self._fetch_to(min(self._fetched + THUMBNAIL_FETCH_BATCH, len(self._names)))
+
+    def _fetch_to(self, count):
+        if count <= self._fetched:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, count - 1)
+        self._fetched = count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._fetched:
+            return None
+        name = self._names[index.row()]
+        group = self._group_of.get(name)
+        if role == Qt.DisplayRole:
+            label = name if self.show_filenames else ""
+            if group is None:
+                return label
+            return f"{group + 1}: {label}" if label else str(group + 1)
+        if role == Qt.BackgroundRole and group is not None:
+            return self._group_brushes[group % len(self._group_brushes)]
+        if role == Qt.DecorationRole:
+            return self._icon(name)
+        if role == Qt.UserRole:
+            return name
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled | Qt.ItemNeverHasChildren
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [THUMBNAIL_MIME_TYPE]
+
+    def mimeData(self, indexes):
+        # Drags never leave the view, the names are only there for completeness.
+        mime = QMimeData()
+        names = '\n'.join(self._names[index.row()] for index in indexes)
+        mime.setData(THUMBNAIL_MIME_TYPE, QByteArray(names.encode('utf-8')))
+        return mime
+
+    def _icon(self, name):
+        icon = self._icons.get(name)
+        perf.stats.count('thumbnail_icons', icon is not None)
+        if icon is not None:
+            self._icons.move_to_end(name)
+            return icon
+        if name in self._failed:
+            return self._placeholder
+        path = os.path.join(self.image_dir, name)
+        st = self._stats.get(name)
+        if st is None and self.directory_index is not None:
+            st = self.directory_index.stat(name)
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return self._placeholder
+        self._stats[name] = st
+        cached = self.cache.get(name, st.st_mtime_ns, st.st_size)
+        perf.stats.count('thumbnail_cache', cached is not None)
+        if cached is None:
+            self.loader.add([path])
+            return self._placeholder
+        return self._remember_icon(name, QIcon(QPixmap.fromImage(cached)))
+
+    def _remember_icon(self, name, icon):
+        self._icons[name] = icon
+        if len(self._icons) > THUMBNAIL_ICON_CACHE_SIZE:
+            self._icons.popitem(last=False)
+        return icon
+
+    def _on_thumbnail_ready(self, path, image):
+        name = os.path.basename(path)
+        row = self.row_of(name)
+        if row < 0:
+            return
+        if image.isNull():
+            # Asked again at the next paint, the file may not be there yet
+            if self.file_ops is None or not self.file_ops.is_pending(path):
+                self._failed.add(name)
+            return
+        st = self._stats.get(name)
+        if st is not None:
+            self.cache.put(name, st.st_mtime_ns, st.st_size, image)
+        self._remember_icon(name, QIcon(QPixmap.fromImage(image)))
+        if row < self._fetched:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def invalidate_names(self, names):
+        """Drop the icons of files that changed on disk so they are decoded again."""
+        for name in names:
+            self._forget(name)
+            row = self.row_of(name)
+            if 0 <= row < self._fetched:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def set_show_filenames(self, show_filenames):
+        self.show_filenames = show_filenames
+        if self._fetched:
+            self.dataChanged.emit(self.index(0), self.index(self._fetched - 1), [Qt.DisplayRole])
+
+    def remove_names(self, names):
+        rows = sorted((self.row_of(name) for name in names), reverse=True)
+        rows = [row for row in rows if row >= 0]
+        # Remove contiguous runs from the bottom up so earlier rows keep their numbers
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            visible = first < self._fetched
+            if visible:
+                self.beginRemoveRows(QModelIndex(), first, min(last, self._fetched - 1))
+            for name in self._names[first:last + 1]:
+                self._forget(name)
+            del self._names[first:last + 1]
+            self._fetched -= max(0, min(last + 1, self._fetched) - first)
+            self._rows = None
+            if visible:
+                self.endRemoveRows()
+
+    def insert_name(self, row, name):
+        if row > self._fetched:
+            # Rows past the fetched range are picked up by a later fetchMore
+            self._names.insert(row, name)
+            self._rows = None
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._names.insert(row, name)
+        self._fetched += 1
+        self._rows = None
+        self.endInsertRows()
+
+    def rename(self, mapping):
+        changed = []
+        for row, name in enumerate(self._names):
+            new_name = mapping.get(name)
+            if new_name is not None:
+                self._names[row] = new_name
+                changed.append(row)
+        # Move the per-name state in one go, a new name may be another file's old name
+        for store in (self._icons, self._stats):
+            moved = {new: store.pop(old) for old, new in mapping.items() if old in store}
+            store.update(moved)
+        self._failed = {mapping.get(name, name) for name in self._failed}
+        self._rows = None
+        self.cache.rename(mapping)
+        for row in changed:
+            if row < self._fetched:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.UserRole])
+
+    def move_rows(self, rows, target_row):
+        """Move rows (in their current order) so they start before target_row."""
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        moving = [self._names[row] for row in rows]
+        moving_set = set(rows)
+        before = sum(1 for row in rows if row < target_row)
+        remaining = [name for row, name in enumerate(self._names) if row not in moving_set]
+        insert_at = target_row - before
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        old_names = [self._names[index.row()] for index in old_indexes]
+        self._names = remaining[:insert_at] + moving + remaining[insert_at:]
+        self._rows = None
+        self.changePersistentIndexList(old_indexes, [self.index(self.row_of(name)) for name in old_names])
+        self.layoutChanged.emit()
+
+    def apply_diff(self, names):
+        """Bring the rows in line with names without a reset.
+
+        Returns False when the surviving rows are in a different order, in
+        which case the caller should fall back to set_images().
+        """
+        new_names = set(names)
+        self.remove_names([name for name in self._names if name not in new_names])
+        current = set(self._names)
+        if self._names != [name for name in names if name in current]:
+            return False
+        for row, name in enumerate(names):
+            if name not in current:
+                self.insert_name(row, name)
+        return True
+
+    def _forget(self, name):
+        self._icons.pop(name, None)
+        self._stats.pop(name, None)
+        self._failed.discard(name)
@@ -0,0 +1,135 @@
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from imageman.constants import THUMBNAIL_SIZE, THUMBNAIL_TASKS_PER_WORKER
+from imageman import perf
+
+
+@perf.measure('thumbnail_decode')
+def read_thumbnail(path, size=THUMBNAIL_SIZE):
+    """Decode path straight to a size x size bounding box.
+
+    QImageReader lets the JPEG decoder skip most of the work when a scaled
+    size is requested, so this is far cheaper than loading the full image
+    and shrinking it afterwards.
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    image_size = reader.size()
+    if image_size.isValid() and (image_size.width() > size or image_size.height() > size):
+        image_size.scale(size, size, Qt.KeepAspectRatio)
+        reader.setScaledSize(image_size)
+    image = reader.read()
+    if not image.isNull() and (image.width() > size or image.height() > size):
+        # Some formats ignore the scaled size, so make sure the result fits.
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+class _ThumbnailSignals(QObject):
+    loaded = pyqtSignal(int, str, QImage)
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, signals, generation, path, size, source_path):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.path = path
+        self.size = size
+        self.source_path = source_path
+
+    def run(self):
+        source = self.source_path(self.path) if self.source_path else self.path
+        image = read_thumbnail(source, self.size)
+        if image.isNull() and source != self.path:
+            # The file got to path while it was being read
+            image = read_thumbnail(self.path, self.size)
+        self.signals.loaded.emit(self.generation, self.path, image)
+
+
+class ThumbnailLoader(QObject):
+    """Decodes thumbnails on a worker pool and hands them back on the GUI thread.
+
+    Only a few tasks per worker are handed to the pool at a time, the rest
+    wait in a queue so that prioritize() can still reorder them. The image
+    passed to thumbnail_ready is null when the file could not be decoded.
+    source_path, if given, maps a requested path to the file to read, e.g.
+    FileOperationQueue.source_path for files whose rename has not run yet.
+    It is called on the worker threads.
+    """
+    thumbnail_ready = pyqtSignal(str, QImage)
+    idle = pyqtSignal()
+
+    def __init__(self, size=THUMBNAIL_SIZE, parent=None, source_path=None):
+        super().__init__(parent)
+        self.size = size
+        self.source_path = source_path
+        self.pool = QThreadPool(self)
+        self._signals = _ThumbnailSignals()
+        self._signals.loaded.connect(self._on_loaded)
+        self._generation = 0
+        self._pending = []  # Next path to decode is at the end of the list
+        self._queued = set()
+        self._loading = set()
+        self._in_flight = 0
+        self._closed = False
+
+    def request(self, paths):
+        """Replace whatever is queued with paths, decoded in the given order."""
+        self.cancel()
+        self._pending = list(reversed(paths))
+        self._queued = set(paths)
+        self._dispatch()
+
+    def add(self, paths):
+        """Queue more paths ahead of whatever is still pending."""
+        paths = [p for p in paths if p not in self._queued and p not in self._loading]
+        self._queued.update(paths)
+        self._pending.extend(reversed(paths))
+        self._dispatch()
+
+    def prioritize(self, paths):
+        """Move the still-pending paths to the front of the queue."""
+        wanted = [p for p in paths if p in self._queued]
+        if not wanted:
+            return
+        wanted_set = set(wanted)
+        self._pending = [p for p in self._pending if p not in wanted_set]
+        self._pending.extend(reversed(wanted))
+        self._dispatch()
+
+    def cancel(self):
+        # Tasks already in the pool finish, but their results are dropped.
+        self._generation += 1
+        self._pending = []
+        self._queued = set()
+        self._loading = set()
+
+    def close(self):
+        """Drop the queue, wait for running decodes and refuse new work."""
+        self.cancel()
+        self._closed = True
+        self.pool.waitForDone()
+
+    def _dispatch(self):
+        if self._closed:
+            self._pending = []
+            return
+        limit = max(1, self.pool.maxThreadCount()) * THUMBNAIL_TASKS_PER_WORKER
+        while self._pending and self._in_flight < limit:
+            path = self._pending.pop()
+            self._queued.discard(path)
+            self._loading.add(path)
+            self._in_flight += 1
+            self.pool.start(_ThumbnailTask(self._signals, self._generation, path, self.size,
+                                           self.source_path))
+
+    def _on_loaded(self, generation, path, image):
+        self._in_flight -= 1
+        if generation == self._generation:
+            self._loading.discard(path)
+            self.thumbnail_ready.emit(path, image)
+        self._dispatch()
+        if self._in_flight == 0 and not self._pending:
+            self.idle.emit()
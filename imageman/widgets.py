@@ -1,7 +1,9 @@
-from PyQt5.QtWidgets import QLabel, QListWidget
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QLabel, QListView
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFontDatabase
 
-from imageman.constants import NUM_TAGS
+from imageman.constants import NUM_TAGS, PERF_OVERLAY_INTERVAL_MS
+from imageman import perf
 
 
 class ImageLabel(QLabel):
@@ -41,17 +43,107 @@ class ImageLabel(QLabel):
             super().keyPressEvent(event)
 
 
-class DragDropListWidget(QListWidget):
+class PerfOverlay(QLabel):
+    """Shows the latency and cache numbers of perf.stats over the window contents."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 180); color: #d0ffd0; padding: 6px;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.move(8, 8)
+        self._timer = QTimer(self)
+        self._timer.setInterval(PERF_OVERLAY_INTERVAL_MS)
+        self._timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def refresh(self):
+        self.setText(perf.stats.summary())
+        self.adjustSize()
+
+    def showEvent(self, event):
+        self.refresh()
+        self.raise_()
+        self._timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+
+class ThumbnailListView(QListView):
+    """Thumbnail grid backed by a ThumbnailModel.
+
+    Keeps the key bindings, drag-reordering and double-click behaviour of
+    the old QListWidget, but only the rows the view actually paints are
+    ever materialized. Delete, rename and move keys act on the whole
+    selection at once.
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setDragDropMode(self.InternalMove)
+        self.setSelectionMode(self.ExtendedSelection)
         self.setFlow(self.LeftToRight)
         self.setWrapping(True)
         self.setResizeMode(self.Adjust)
         self.setMovement(self.Snap)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(self.Batched)
+
+    def selected_names(self):
+        return [index.data(Qt.UserRole) for index in sorted(self.selectedIndexes(), key=lambda i: i.row())]
+
+    def visible_rows(self):
+        """Return the range of rows currently inside the viewport.
+
+        Items are laid out in row order, so a binary search over their
+        rectangles finds the first and last visible row without touching
+        the rest of the list.
+        """
+        model = self.model()
+        count = model.rowCount() if model is not None else 0
+        if count == 0:
+            return range(0)
+        height = self.viewport().height()
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.visualRect(model.index(mid)).bottom() < 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        first = lo
+        lo, hi = first, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.visualRect(model.index(mid)).top() <= height:
+                lo = mid + 1
+            else:
+                hi = mid
+        return range(first, lo)
+
+    def dragEnterEvent(self, event):
+        if event.source() is self:
+            event.setDropAction(Qt.MoveAction)
+            event.accept()
+        else:
+            event.ignore()
+
+    def dragMoveEvent(self, event):
+        self.dragEnterEvent(event)
 
     def dropEvent(self, event):
-        super().dropEvent(event)
+        if event.source() is not self:
+            event.ignore()
+            return
+        target = self.indexAt(event.pos())
+        target_row = target.row() if target.isValid() else self.model().rowCount()
+        self.model().move_rows([index.row() for index in self.selectedIndexes()], target_row)
+        # The rows are already moved, don't let the drag remove them afterwards
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
         # Use self.window() to get the top-level ImageMan window
         if hasattr(self.window(), 'on_item_dropped'):
             self.window().on_item_dropped()
@@ -59,34 +151,31 @@ class DragDropListWidget(QListWidget):
     def keyPressEvent(self, event):
         # Use self.window() to get the top-level ImageMan window
         parent_window = self.window()
-        selected_items = self.selectedItems()
-        if not parent_window or not selected_items:
+        selected_names = self.selected_names()
+        if not parent_window or not selected_names:
             super().keyPressEvent(event)
             return
 
-        selected_item = selected_items[0]
-        selected_image_name = selected_item.data(Qt.UserRole)
-
         if event.key() == Qt.Key_D:
-            parent_window.delete_thumbnail_image(selected_image_name)
+            parent_window.delete_thumbnail_images(selected_names)
         elif Qt.Key_1 <= event.key() <= (Qt.Key_1 + NUM_TAGS - 1):
             idx = event.key() - Qt.Key_1
             if event.modifiers() & (Qt.ControlModifier | Qt.AltModifier):
-                parent_window.move_thumbnail_image_to_tag(selected_image_name, idx)
+                parent_window.move_thumbnail_images_to_tag(selected_names, idx)
             else:
-                parent_window.rename_thumbnail_image(selected_image_name, parent_window.tags[idx])
+                parent_window.rename_thumbnail_images(selected_names, parent_window.tags[idx])
         elif event.key() == Qt.Key_Return or event.key() == Qt.Key_Enter:
-            parent_window.open_thumbnail_in_single_view(selected_image_name)
+            parent_window.open_thumbnail_in_single_view(selected_names[0])
         else:
             super().keyPressEvent(event)
 
     def mouseDoubleClickEvent(self, event):
-        item = self.itemAt(event.pos())
-        if item:
-            selected_image_name = item.data(Qt.UserRole)
-            
+        index = self.indexAt(event.pos())
+        if index.isValid():
+            selected_image_name = index.data(Qt.UserRole)
+
             # Use self.window() to get the top-level ImageMan window
             parent_window = self.window()
-            
+
             parent_window.open_thumbnail_in_single_view(selected_image_name)
-        super().mouseDoubleClickEvent(event)
\ No newline at end of file
+        super().mouseDoubleClickEvent(event)
@@ -1,23 +1,27 @@
 import sys
 import os
 import pytest
+from PyQt5.QtGui import QImage, QColor
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def create_dummy_image(filepath):
-    """Creates a minimal 1x1 transparent PNG image at the given filepath."""
-    # PNG header + IHDR chunk (1x1, 8-bit, RGBA, no compression/filter/interlace)
-    # + IDAT chunk (deflated 1x1 transparent pixel) + IEND chunk
-    png_data = bytes([
-        0x89, 0x50, 0x4E, 0x47, 0x0D, 0x0A, 0x1A, 0x0A,
-        0x00, 0x00, 0x00, 0x0D, 0x49, 0x48, 0x44, 0x52,
-        0x00, 0x00, 0x00, 0x01, 0x00, 0x00, 0x00, 0x01,
-        0x08, 0x06, 0x00, 0x00, 0x00, 0x1F, 0x15, 0xC4,
-        0x89, 0x00, 0x00, 0x00, 0x0C, 0x49, 0x44, 0x41,
-        0x54, 0x08, 0xD7, 0x63, 0x60, 0x00, 0x00, 0x00,
-        0x02, 0x00, 0x01, 0xFD, 0x01, 0x00, 0xAB, 0x04,
-        0x00, 0x00, 0x00, 0x00, 0x49, 0x45, 0x4E, 0x44,
-        0xAE, 0x42, 0x60, 0x82
-    ])
-    with open(filepath, 'wb') as f:
-        f.write(png_data)
\ No newline at end of file
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep caches written during the tests out of the user's cache directory."""
+    monkeypatch.setenv('IMAGEMAN_CACHE_DIR', str(tmp_path_factory.mktemp('cache')))
+
+
+@pytest.fixture(autouse=True)
+def memory_settings(monkeypatch):
+    """Start every test from default settings and never touch the registry or the user's config."""
+    monkeypatch.setenv('IMAGEMAN_SETTINGS', 'memory')
+
+
+def create_dummy_image(filepath, width=4, height=4):
+    """Saves a solid gray image at the given filepath, in the format its extension names."""
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor('gray'))
+    if not image.save(str(filepath)):
+        # Extensions Qt cannot write, like .txt, still get PNG contents
+        image.save(str(filepath), 'PNG')
@@ -0,0 +1,65 @@
+import os
+from conftest import create_dummy_image
+
+from imageman.directory_index import DirectoryIndex, scan_directory
+
+
+def test_scan_lists_supported_images_only(tmp_path):
+    for name in ('a.jpg', 'b.PNG', 'notes.txt'):
+        create_dummy_image(tmp_path / name)
+    (tmp_path / 'sub.jpg').mkdir()
+    entries = scan_directory(str(tmp_path))
+    assert sorted(entries) == ['a.jpg', 'b.PNG']
+    assert entries['a.jpg'].st_size == os.path.getsize(tmp_path / 'a.jpg')
+
+
+def test_index_follows_own_operations(tmp_path, qtbot):
+    for name in ('a.jpg', 'b.jpg'):
+        create_dummy_image(tmp_path / name)
+    index = DirectoryIndex()
+    index.open(str(tmp_path))
+    assert index.names() == ['a.jpg', 'b.jpg']
+    index.close()
+    os.rename(tmp_path / 'a.jpg', tmp_path / 'c.jpg')
+    index.rename('a.jpg', 'c.jpg')
+    assert index.names() == ['b.jpg', 'c.jpg']
+    os.remove(tmp_path / 'b.jpg')
+    index.remove('b.jpg')
+    assert index.names() == ['c.jpg']
+    assert index.stat('c.jpg') is not None
+    # Our own changes must not be reported back as external ones
+    with qtbot.assertNotEmitted(index.changed, wait=1000):
+        pass
+    index.close()
+
+
+def test_index_picks_up_external_changes(tmp_path, qtbot):
+    create_dummy_image(tmp_path / 'a.jpg')
+    index = DirectoryIndex()
+    index.open(str(tmp_path))
+    with qtbot.waitSignal(index.changed, timeout=5000) as blocker:
+        create_dummy_image(tmp_path / 'b.jpg')
+    added, removed, modified = blocker.args
+    assert added == ['b.jpg'] and removed == [] and modified == []
+    assert index.names() == ['a.jpg', 'b.jpg']
+    index.close()
+
+
+def test_image_size_is_read_from_header_once(tmp_path, monkeypatch):
+    from PyQt5.QtGui import QImage, QColor
+    import imageman.directory_index as directory_index
+    image = QImage(40, 30, QImage.Format_RGB32)
+    image.fill(QColor('red'))
+    image.save(str(tmp_path / 'a.png'))
+    index = DirectoryIndex()
+    index.open(str(tmp_path))
+    calls = []
+    read_image_size = directory_index.read_image_size
+    monkeypatch.setattr(directory_index, 'read_image_size', lambda path: calls.append(path) or read_image_size(path))
+    assert (index.image_size('a.png').width(), index.image_size('a.png').height()) == (40, 30)
+    assert len(calls) == 1
+    index.rename('a.png', 'b.png')
+    assert index.image_size('b.png').width() == 40
+    assert len(calls) == 1
+    assert index.image_size('missing.png') is None
+    index.close()
@@ -0,0 +1,85 @@
+import random
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPainter, QColor
+
+from imageman.constants import DUPLICATE_MAX_DISTANCE
+from imageman.duplicates import near_pairs, hamming, hash_images, read_hash_image, group_duplicates
+from imageman.main import ImageMan
+
+
+def create_pattern_image(filepath, seed, width=320, height=240, brightness=0, fmt=None):
+    """Draw a few random rectangles, the same seed always gives the same picture."""
+    rng = random.Random(seed)
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor(40, 40, 40))
+    painter = QPainter(image)
+    for _ in range(6):
+        value = min(255, rng.randrange(60, 230) + brightness)
+        painter.fillRect(int(rng.random() * width * 0.7), int(rng.random() * height * 0.7),
+                         int(width * (0.2 + rng.random() * 0.3)), int(height * (0.2 + rng.random() * 0.3)),
+                         QColor(value, value, value))
+    painter.end()
+    image.save(str(filepath), fmt)
+
+
+def test_hash_survives_small_changes(tmp_path):
+    create_pattern_image(tmp_path / 'a.png', 1)
+    create_pattern_image(tmp_path / 'a_small.jpg', 1, width=160, height=120, brightness=10)
+    create_pattern_image(tmp_path / 'b.png', 2)
+    base, variant, other = hash_images([read_hash_image(str(tmp_path / name))
+                                        for name in ('a.png', 'a_small.jpg', 'b.png')])
+    assert hamming(base, variant) <= DUPLICATE_MAX_DISTANCE
+    assert hamming(base, other) > DUPLICATE_MAX_DISTANCE
+
+
+def test_near_pairs_match_a_linear_scan():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    for value in values[:60]:
+        flipped = value
+        for bit in rng.sample(range(64), rng.randrange(1, 12)):
+            flipped ^= 1 << bit
+        values.append(flipped)
+    expected = [(i, j) for i in range(len(values)) for j in range(i + 1, len(values))
+                if hamming(values[i], values[j]) <= 8]
+    assert len(expected) > 30
+    assert sorted(near_pairs(values, 8)) == expected
+
+
+def test_groups_chain_near_duplicates():
+    hashes = {'a': 0b0, 'b': 0b111, 'c': 0b111111, 'd': (1 << 64) - 1, 'e': 0b0}
+    assert group_duplicates(hashes, max_distance=3) == [['a', 'b', 'c', 'e']]
+
+
+def test_duplicate_groups_in_thumbnail_view(tmp_path, qtbot):
+    create_pattern_image(tmp_path / 'img_1.png', 1)
+    create_pattern_image(tmp_path / 'img_2.png', 2)
+    create_pattern_image(tmp_path / 'img_3.jpg', 1, brightness=8)
+    create_pattern_image(tmp_path / 'img_4.png', 3)
+    create_pattern_image(tmp_path / 'img_5.png', 2)
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    viewer.duplicates_action.setChecked(True)
+    viewer._toggle_duplicates(True)
+    qtbot.waitUntil(lambda: viewer.duplicate_groups is not None, timeout=5000)
+    assert viewer.duplicate_groups == [['img_1.png', 'img_3.jpg'], ['img_2.png', 'img_5.png']]
+    model = viewer.thumbnail_model
+    assert model.names() == ['img_1.png', 'img_3.jpg', 'img_2.png', 'img_5.png']
+    model.ensure_fetched(3)
+    assert model.index(2).data(Qt.DisplayRole) == '2: img_2.png'
+
+    # The usual keys act on the group members
+    viewer.delete_thumbnail_images(['img_3.jpg'])
+    viewer.rename_thumbnail_images(['img_5.png'], viewer.tags[0])
+    viewer.file_ops.wait()
+    assert not (tmp_path / 'img_3.jpg').exists()
+    renamed = model.names()[2]
+    assert renamed.startswith(viewer.tags[0]) and (tmp_path / renamed).exists()
+    assert viewer.duplicate_groups[1] == ['img_2.png', renamed]
+
+    viewer.duplicates_action.setChecked(False)
+    viewer._toggle_duplicates(False)
+    assert model.names() == viewer.images == ['img_1.png', 'img_2.png', 'img_4.png', renamed]
+    model.ensure_fetched(0)
+    assert model.index(0).data(Qt.DisplayRole) == 'img_1.png'
@@ -0,0 +1,97 @@
+import os
+import threading
+from conftest import create_dummy_image
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QMessageBox
+
+from imageman import file_ops
+from imageman.file_ops import FileOperationQueue
+
+
+def test_operations_run_in_order(tmp_path, qtbot):
+    create_dummy_image(tmp_path / 'a.jpg')
+    queue = FileOperationQueue()
+    with qtbot.waitSignal(queue.finished, timeout=5000) as blocker:
+        queue.rename(str(tmp_path / 'a.jpg'), str(tmp_path / 'b.jpg'))
+        queue.move(str(tmp_path / 'b.jpg'), str(tmp_path / 'cat' / 'cat_0001.jpg'))
+        queue.rename(str(tmp_path / 'cat' / 'cat_0001.jpg'), str(tmp_path / 'cat' / 'cat_0002.jpg'))
+    assert blocker.args == [[]]
+    assert os.listdir(tmp_path / 'cat') == ['cat_0002.jpg']
+    assert not os.path.exists(tmp_path / 'a.jpg')
+    assert queue.pending() == 0
+    queue.wait()
+
+
+def test_failures_are_collected(tmp_path, qtbot):
+    create_dummy_image(tmp_path / 'a.jpg')
+    create_dummy_image(tmp_path / 'b.jpg')
+    queue = FileOperationQueue()
+    busy = []
+    queue.busy_changed.connect(busy.append)
+    with qtbot.waitSignal(queue.finished, timeout=5000) as blocker:
+        queue.remove(str(tmp_path / 'missing.jpg'))
+        # Never overwrite an existing file
+        queue.rename(str(tmp_path / 'a.jpg'), str(tmp_path / 'b.jpg'))
+        queue.remove(str(tmp_path / 'a.jpg'))
+    failures = blocker.args[0]
+    assert len(failures) == 2
+    assert failures[0].startswith('Error deleting image missing.jpg')
+    assert failures[1].startswith('Error renaming image a.jpg')
+    assert sorted(os.listdir(tmp_path)) == ['b.jpg']
+    assert busy == [True, False]
+    queue.wait()
+
+
+def test_failed_operation_is_undone_in_the_window(tmp_path, qtbot, monkeypatch):
+    from imageman.main import ImageMan
+    warnings = []
+    monkeypatch.setattr(QMessageBox, 'warning', lambda parent, title, text: warnings.append((title, text)))
+    for name in ('a.jpg', 'b.jpg'):
+        create_dummy_image(tmp_path / name)
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    viewer._toggle_thumbnail_view(False)
+    viewer.current_index = 0
+    # The file disappears behind our back, then a rename of it fails
+    os.rename(tmp_path / 'a.jpg', tmp_path / 'x.jpg')
+    viewer.rename_current_image('cat')
+    assert viewer.images == ['cat_0001.jpg', 'b.jpg']
+    with qtbot.waitSignal(viewer.dir_index.changed, timeout=5000):
+        viewer.file_ops.wait()
+    assert viewer.images == ['b.jpg', 'x.jpg']
+    assert len(warnings) == 1
+    assert 'Error renaming image a.jpg' in warnings[0][1]
+
+
+def test_files_are_read_where_they_are_until_the_queue_moves_them(tmp_path, qtbot, monkeypatch):
+    from imageman.main import ImageMan
+    release = threading.Event()
+    rename, description = file_ops._OPERATIONS['rename']
+    monkeypatch.setitem(file_ops._OPERATIONS, 'rename',
+                        (lambda old, new: release.wait(5) and rename(old, new), description))
+    warnings = []
+    monkeypatch.setattr(QMessageBox, 'warning', lambda parent, title, text: warnings.append(title))
+    for name in ('a.png', 'b.png'):
+        create_dummy_image(tmp_path / name, 20, 20)
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    viewer.rename_thumbnail_images(['a.png'], 'cat')
+    assert viewer.file_ops.source_path(str(tmp_path / 'cat_0001.png')) == str(tmp_path / 'a.png')
+    # The thumbnail is decoded from the old name, not given up on
+    model = viewer.thumbnail_model
+    viewer.thumbnail_cache.clear()
+    model.invalidate_names(['cat_0001.png'])
+    model.ensure_fetched(model.row_of('cat_0001.png'))
+    model.index(model.row_of('cat_0001.png')).data(Qt.DecorationRole)
+    qtbot.waitUntil(lambda: 'cat_0001.png' in model._icons, timeout=5000)
+    assert not model._failed
+    viewer._toggle_thumbnail_view(False)
+    viewer.current_index = viewer.images.index('cat_0001.png')
+    viewer._show_image()
+    assert warnings == []
+    assert viewer._source_image.width() == 20
+    release.set()
+    viewer.file_ops.wait()
+    assert (tmp_path / 'cat_0001.png').exists()
+    assert viewer.file_ops.source_path(str(tmp_path / 'cat_0001.png')) == str(tmp_path / 'cat_0001.png')
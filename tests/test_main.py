@@ -31,7 +31,8 @@ def test_delete_image(tmp_path, qtbot):
     viewer.delete_current_image()
     # Only one image should remain
     assert len(viewer.images) == 1
-    # The file should be deleted from disk
+    # The file should be deleted from disk once the background queue ran
+    viewer.file_ops.wait()
     remaining = viewer.images[0]
     assert os.path.exists(tmp_path / remaining)
     deleted = set(img_names) - set(viewer.images)
@@ -48,7 +49,6 @@ def test_rename_image(tmp_path, qtbot):
     # Explicitly set tags to default to make test independent of registry
     default_tags = ['tag1', 'tag2', 'tag3', 'tag4', 'tag5']
     viewer.tags = default_tags
-    viewer.tag_counters = {tag: 1 for tag in default_tags}
     assert viewer.images[0] == 'a.jpg'
     # Simulate pressing key '1' to rename to tag1_1.jpg
     viewer.rename_current_image('tag1')
@@ -76,7 +76,6 @@ def test_tag_configuration(tmp_path, qtbot):
     # Simulate changing tags
     new_tags = ['cat', 'dog', 'bird', 'fish', 'horse']
     viewer.tags = new_tags
-    viewer.tag_counters = {tag: 1 for tag in new_tags}
     # Simulate pressing key '2' to rename to dog_1
     img_name = 'a.jpg'
     create_dummy_image(tmp_path / img_name)
@@ -84,3 +83,36 @@ def test_tag_configuration(tmp_path, qtbot):
     viewer.current_index = 0
     viewer.rename_current_image('dog')
     assert viewer.images[0].startswith('dog_')
+
+
+def test_zoom_and_resize_do_not_reload_from_disk(tmp_path, qtbot):
+    create_dummy_image(tmp_path / 'a.png', 64, 48)
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    viewer._toggle_thumbnail_view(False)
+    assert viewer.label.pixmap() is not None and not viewer.label.pixmap().isNull()
+    # With the file gone, zooming and resizing must still work from memory
+    os.remove(tmp_path / 'a.png')
+    viewer.zoom_in()
+    viewer.resize(viewer.width() + 10, viewer.height() + 10)
+    viewer.zoom_out()
+    assert not viewer.label.pixmap().isNull()
+
+
+def test_large_image_is_decoded_at_screen_size(tmp_path, qtbot, monkeypatch):
+    from PyQt5.QtCore import QSize
+    create_dummy_image(tmp_path / 'a.jpg', 4000, 3000)
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    monkeypatch.setattr(viewer, '_decode_limit', lambda: QSize(400, 300))
+    viewer.show()
+    viewer.resize(300, 300)
+    qtbot.waitUntil(lambda: viewer.centralWidget().width() <= 300)
+    viewer._toggle_thumbnail_view(False)
+    assert viewer._source_image.size() == QSize(400, 300)
+    # Shown larger than the reduced decode: more detail is decoded
+    viewer.resize(900, 800)
+    qtbot.waitUntil(lambda: viewer.centralWidget().width() > 800)
+    viewer._show_image()
+    assert viewer._source_image.width() > 400
+    assert viewer._source_image.width() >= viewer.label.pixmap().width()
@@ -0,0 +1,78 @@
+import os
+from conftest import create_dummy_image
+
+import imageman.directory_index as directory_index
+from imageman.directory_index import DirectoryIndex, scan_directory
+from imageman.metadata_index import MetadataIndex, examine_file
+from imageman.main import ImageMan
+
+
+def test_rows_follow_listing_and_operations(tmp_path):
+    images = tmp_path / 'images'
+    images.mkdir()
+    for name in ('a.png', 'b.png', 'c.png'):
+        create_dummy_image(images / name, 40, 30)
+    metadata = MetadataIndex(str(tmp_path / 'metadata.sqlite3'))
+    records, stale = metadata.sync(str(images), scan_directory(str(images)))
+    assert records == {} and sorted(stale) == ['a.png', 'b.png', 'c.png']
+    metadata.update(str(images), {name: examine_file(str(images / name)) for name in stale})
+    records, stale = metadata.sync(str(images), scan_directory(str(images)))
+    assert sorted(records) == ['a.png', 'b.png', 'c.png'] and stale == []
+
+    metadata.rename_many(str(images), {'a.png': 'b.png', 'b.png': 'd.png'}, tag='red')
+    metadata.move_many(str(images), {'c.png': str(images / 'red' / 'red_0001.png')}, tag='red')
+    metadata.remove_many(str(images), ['b.png'])
+    assert list(metadata.load(str(images))) == ['d.png']
+    assert metadata.load(str(images))['d.png'].tag == 'red'
+    assert metadata.load(str(images / 'red'))['red_0001.png'].tag == 'red'
+    metadata.close()
+
+
+def test_reopened_directory_only_examines_changed_files(tmp_path, qtbot, monkeypatch):
+    images = tmp_path / 'images'
+    images.mkdir()
+    create_dummy_image(images / 'a.png', 40, 30)
+    create_dummy_image(images / 'b.png', 20, 10)
+    metadata = MetadataIndex(str(tmp_path / 'metadata.sqlite3'))
+    index = DirectoryIndex(metadata=metadata)
+    index.open(str(images))
+    qtbot.waitUntil(lambda: all(r.width for r in metadata.load(str(images)).values()), timeout=5000)
+    record = metadata.load(str(images))['a.png']
+    assert (record.width, record.height, record.format) == (40, 30, 'png')
+    assert record.content_hash
+    index.close()
+
+    os.remove(images / 'b.png')
+    create_dummy_image(images / 'b.png', 60, 50)
+    examined = []
+    examine_file = directory_index.examine_file
+    monkeypatch.setattr(directory_index, 'examine_file', lambda path: examined.append(path) or examine_file(path))
+    monkeypatch.setattr(directory_index, 'read_image_size', lambda path: None)
+    index = DirectoryIndex(metadata=metadata)
+    index.open(str(images))
+    # Known files come from the database without touching their headers
+    assert (index.image_size('a.png').width(), index.image_size('a.png').height()) == (40, 30)
+    qtbot.waitUntil(lambda: index.image_size('b.png') is not None, timeout=5000)
+    assert examined == [str(images / 'b.png')]
+    assert index.image_size('b.png').width() == 60
+    index.close()
+    metadata.close()
+
+
+def test_window_records_tags(tmp_path, qtbot):
+    for name in ('a.png', 'b.png'):
+        create_dummy_image(tmp_path / name)
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    tag = viewer.tags[0]
+    viewer.rename_thumbnail_images(['a.png'], tag)
+    viewer.move_thumbnail_images_to_tag(['b.png'], 1)
+    viewer.file_ops.wait()
+    renamed = metadata_tags(viewer.metadata, str(tmp_path))
+    moved = metadata_tags(viewer.metadata, os.path.join(str(tmp_path), viewer.tags[1]))
+    assert renamed == {f'{tag}_0001.png': tag}
+    assert moved == {f'{viewer.tags[1]}_0001.png': viewer.tags[1]}
+
+
+def metadata_tags(metadata, directory):
+    return {name: record.tag for name, record in metadata.load(directory).items()}
@@ -3,7 +3,7 @@ import shutil
 import tempfile
 import pytest
 from imageman.main import ImageMan
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QApplication, QMessageBox
 
 from conftest import create_dummy_image
 
@@ -28,6 +28,7 @@ def test_move_to_tag_creates_dir_and_moves_file(qtbot, temp_image_dir):
     img_name = man.images[0]
     # Move first image to tag 0 ("cat")
     man.move_current_image_to_tag(0)
+    man.file_ops.wait()
     tag_dir = os.path.join(temp_image_dir, "cat")
     assert os.path.isdir(tag_dir), "Tag directory was not created"
     files = os.listdir(tag_dir)
@@ -37,7 +38,9 @@ def test_move_to_tag_creates_dir_and_moves_file(qtbot, temp_image_dir):
     assert img_name not in os.listdir(temp_image_dir)
 
 
-def test_move_to_tag_sequence_increment(qtbot, temp_image_dir):
+def test_move_to_tag_sequence_increment(qtbot, temp_image_dir, monkeypatch):
+    shown = []
+    monkeypatch.setattr(QMessageBox, 'information', lambda parent, title, text: shown.append(title))
     man = ImageMan(temp_image_dir)
     qtbot.addWidget(man)
     man.tags = ["cat", "dog", "bird", "fish", "horse"]
@@ -46,6 +49,7 @@ def test_move_to_tag_sequence_increment(qtbot, temp_image_dir):
     for _ in range(len(man.images)):
         man.current_index = 0
         man.move_current_image_to_tag(1)
+    man.file_ops.wait()
     tag_dir = os.path.join(temp_image_dir, "dog")
     files = sorted(os.listdir(tag_dir))
     assert len(files) == 3
@@ -53,3 +57,5 @@ def test_move_to_tag_sequence_increment(qtbot, temp_image_dir):
     assert all(f.startswith("dog_") for f in files)
     nums = sorted(int(f[4:f.rfind('.')]) for f in files)
     assert nums == [1, 2, 3]
+    # The emptied folder says so instead of showing a stale image
+    assert shown == ['No Images']
@@ -0,0 +1,88 @@
+import json
+
+from PyQt5.QtWidgets import QApplication
+
+from imageman import perf
+from imageman.perf import PerfStats, StartupTimer
+from imageman.main import ImageMan
+
+from conftest import create_dummy_image
+
+
+def test_disabled_stats_record_nothing():
+    stats = PerfStats()
+    with stats.timed('decode'):
+        pass
+    stats.count('decode_buffer', True)
+    assert stats.snapshot() == {'timings_ms': {}, 'caches': {}}
+
+
+def test_timings_and_hit_rates():
+    stats = PerfStats(enabled=True)
+    for ms in (0.5, 0.7, 3, 3, 4, 8, 15, 150, 160, 5000):
+        stats.record('decode', ms / 1000)
+    for hit in (True, True, True, False):
+        stats.count('decode_buffer', hit)
+    snapshot = stats.snapshot()
+    decode = snapshot['timings_ms']['decode']
+    assert decode['count'] == 10
+    assert decode['max'] == 5000
+    assert decode['p50'] == 5
+    assert decode['p95'] == 5000
+    assert decode['histogram']['<=1'] == 2
+    assert decode['histogram']['<=200'] == 2
+    assert decode['histogram']['>2000'] == 1
+    assert snapshot['caches']['decode_buffer'] == {'hits': 3, 'misses': 1, 'hit_rate': 0.75}
+    assert 'decode' in stats.summary()
+
+
+def test_startup_timer_reports_each_phase(tmp_path):
+    timer = StartupTimer()
+    timer.mark('imports')
+    timer.mark('window')
+    path = tmp_path / 'startup.json'
+    timer.write(str(path))
+    report = json.loads(path.read_text())
+    assert list(report['phases_ms']) == ['imports', 'window']
+    assert report['total_ms'] == sum(report['phases_ms'].values())
+
+
+def test_overlay_collects_and_dumps_on_close(tmp_path, qtbot, monkeypatch):
+    monkeypatch.setattr(perf, 'stats', PerfStats())
+    dump = tmp_path / 'perf.json'
+    monkeypatch.setenv('IMAGEMAN_PERF_FILE', str(dump))
+    images = tmp_path / 'images'
+    images.mkdir()
+    for name in ('a.png', 'b.png'):
+        create_dummy_image(images / name)
+    viewer = ImageMan(str(images))
+    qtbot.addWidget(viewer)
+    viewer.perf_overlay_action.setChecked(True)
+    viewer._toggle_perf_overlay(True)
+    viewer._toggle_thumbnail_view(False)
+    viewer.next_image()
+    viewer.perf_overlay.refresh()
+    assert viewer.perf_overlay.isVisible()
+    assert 'show_image' in viewer.perf_overlay.text()
+    viewer.close()
+    data = json.loads(dump.read_text())
+    assert data['timings_ms']['show_image']['count'] == 2
+    assert 'decode_buffer' in data['caches']
+
+
+def test_stats_are_dumped_when_the_application_quits(tmp_path, qtbot, monkeypatch):
+    monkeypatch.setattr(perf, 'stats', PerfStats(enabled=True))
+    dump = tmp_path / 'perf.json'
+    monkeypatch.setenv('IMAGEMAN_PERF_FILE', str(dump))
+    images = tmp_path / 'images'
+    images.mkdir()
+    create_dummy_image(images / 'a.png')
+    viewer = ImageMan(str(images))
+    qtbot.addWidget(viewer)
+    viewer._toggle_thumbnail_view(False)
+    # File > Exit quits the application without closing the window
+    QApplication.instance().aboutToQuit.emit()
+    assert 'show_image' in json.loads(dump.read_text())['timings_ms']
+    dump.unlink()
+    viewer.close()
+    assert not dump.exists()
@@ -0,0 +1,59 @@
+import os
+from conftest import create_dummy_image
+
+from imageman.prefetch import DecodeAheadBuffer
+
+
+def create_images(directory, count):
+    names = []
+    for i in range(count):
+        name = f'img{i:02d}.png'
+        create_dummy_image(os.path.join(directory, name), 40, 30)
+        names.append(name)
+    return names
+
+
+def test_buffer_decodes_neighbours(tmp_path, qtbot):
+    names = create_images(str(tmp_path), 10)
+    buffer = DecodeAheadBuffer(radius=2)
+    buffer.update(str(tmp_path), names, 5, direction=1)
+    expected = [os.path.join(str(tmp_path), names[i]) for i in (3, 4, 5, 6, 7)]
+    qtbot.waitUntil(lambda: all(buffer.get(p) is not None for p in expected), timeout=5000)
+    assert buffer.get(os.path.join(str(tmp_path), names[8])) is None
+
+
+def test_buffer_stays_bounded_and_wraps(tmp_path, qtbot):
+    names = create_images(str(tmp_path), 10)
+    buffer = DecodeAheadBuffer(radius=1)
+    for index in range(10):
+        buffer.update(str(tmp_path), names, index, direction=1)
+        qtbot.waitUntil(lambda: not buffer._loading, timeout=5000)
+        assert len(buffer._images) <= 3
+    # Moving forward past the end wraps to the start of the list
+    assert buffer.get(os.path.join(str(tmp_path), names[0])) is not None
+
+
+def test_buffer_follows_renames_and_deletes(tmp_path, qtbot):
+    names = create_images(str(tmp_path), 3)
+    buffer = DecodeAheadBuffer(radius=1)
+    paths = [os.path.join(str(tmp_path), name) for name in names]
+    buffer.update(str(tmp_path), names, 1)
+    qtbot.waitUntil(lambda: all(buffer.get(p) is not None for p in paths), timeout=5000)
+    new_path = os.path.join(str(tmp_path), 'renamed.png')
+    buffer.rename(paths[1], new_path)
+    assert buffer.get(paths[1]) is None
+    assert buffer.get(new_path) is not None
+    buffer.discard(paths[0])
+    assert buffer.get(paths[0]) is None
+    buffer.invalidate()
+    assert buffer.get(new_path) is None
+
+
+def test_read_image_decodes_large_images_reduced(tmp_path):
+    from PyQt5.QtCore import QSize
+    from imageman.prefetch import read_image
+    path = str(tmp_path / 'big.jpg')
+    create_dummy_image(path, 1600, 800)
+    assert read_image(path, QSize(400, 400)).size() == QSize(400, 200)
+    assert read_image(path, QSize(4000, 4000)).size() == QSize(1600, 800)
+    assert read_image(path).size() == QSize(1600, 800)
@@ -0,0 +1,61 @@
+from PyQt5.QtGui import QPixmap, QImage, QColor
+
+from imageman.pyramid import ImagePyramid, SmoothScaler
+
+
+def test_levels_are_made_lazily_down_to_the_requested_size(qtbot):
+    source = QPixmap(1000, 800)
+    source.fill(QColor('blue'))
+    pyramid = ImagePyramid(source)
+    assert pyramid.level_for(900, 700) is source
+    assert pyramid.level_for(2000, 1600) is source
+    assert len(pyramid.levels) == 1
+
+    level = pyramid.level_for(120, 96)
+    assert (level.width(), level.height()) == (125, 100)
+    assert [p.width() for p in pyramid.levels] == [1000, 500, 250, 125]
+    # Larger sizes reuse the levels already made
+    assert pyramid.level_for(300, 200) is pyramid.levels[1]
+    assert len(pyramid.levels) == 4
+
+    scaled = pyramid.scaled(120, 96)
+    assert (scaled.width(), scaled.height()) == (120, 96)
+    assert pyramid.scaled(250, 200) is pyramid.levels[2]
+
+
+def test_scaler_makes_the_missing_levels_on_its_worker(qtbot):
+    source = QImage(1000, 800, QImage.Format_RGB32)
+    source.fill(QColor('blue'))
+    pyramid = ImagePyramid(source)
+    scaler = SmoothScaler()
+    with qtbot.waitSignal(scaler.scaled, timeout=5000) as blocker:
+        scaler.request(pyramid, 120, 96)
+    assert (blocker.args[0].width(), blocker.args[0].height()) == (120, 96)
+    assert [level.width() for level in pyramid.levels] == [1000, 500, 250, 125]
+    # The GUI thread reuses the levels the worker made
+    assert pyramid.level_for(300, 200) is pyramid.levels[1]
+    scaler.close()
+
+
+def test_held_key_shows_previews_then_the_smooth_scale(tmp_path, qtbot):
+    from PyQt5.QtGui import QImage
+    from imageman.main import ImageMan
+    for i in range(3):
+        image = QImage(800, 600, QImage.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 100, 200, 200))
+        image.save(str(tmp_path / f'img{i}.png'))
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    viewer.resize(500, 400)
+    viewer._toggle_thumbnail_view(False)
+    viewer.next_image()
+    viewer.next_image()
+    # The second show came right after the first: only a preview so far
+    assert viewer._smooth_timer.isActive()
+    preview = viewer.label.pixmap()
+    assert not preview.isNull()
+    assert viewer._scaled_pixmaps == {}
+    qtbot.waitUntil(lambda: len(viewer._scaled_pixmaps) == 1, timeout=5000)
+    smooth = next(iter(viewer._scaled_pixmaps.values()))
+    assert viewer.label.pixmap().cacheKey() == smooth.cacheKey()
+    assert smooth.size() == preview.size()
@@ -0,0 +1,123 @@
+import os
+import pytest
+from conftest import create_dummy_image
+
+from imageman.rename_plan import (
+    RenameConflict, RenameJournal, plan_renames, apply_plan, resume_plan, rollback_plan
+)
+
+
+def simulate(names, steps):
+    names = set(names)
+    for src, dst in steps:
+        assert src in names and dst not in names
+        names.remove(src)
+        names.add(dst)
+    return names
+
+
+def test_files_in_place_are_skipped():
+    assert plan_renames({'d_0001.jpg': 'd_0001.jpg', 'a.jpg': 'd_0002.jpg'}, ['d_0001.jpg', 'a.jpg']) == [
+        ('a.jpg', 'd_0002.jpg')]
+
+
+def test_chain_is_ordered_without_temporary_names():
+    mapping = {'a': 'b', 'b': 'c', 'c': 'd'}
+    steps = plan_renames(mapping, mapping)
+    assert steps == [('c', 'd'), ('b', 'c'), ('a', 'b')]
+
+
+def test_cycle_costs_one_extra_move():
+    mapping = {'a': 'b', 'b': 'c', 'c': 'a', 'x': 'y', 'y': 'x'}
+    steps = plan_renames(mapping, mapping)
+    assert len(steps) == len(mapping) + 2
+    assert simulate(mapping, steps) == set(mapping)
+    # Every file ends up at its target
+    positions = {name: name for name in mapping}
+    for src, dst in steps:
+        for origin, where in positions.items():
+            if where == src:
+                positions[origin] = dst
+    assert positions == mapping
+
+
+def test_conflict_with_unrelated_file():
+    with pytest.raises(RenameConflict):
+        plan_renames({'a.jpg': 'b.jpg'}, ['a.jpg', 'b.jpg'])
+
+
+def make_files(directory, names):
+    for name in names:
+        create_dummy_image(directory / name)
+        with open(directory / name, 'ab') as f:
+            f.write(name.encode())
+
+
+def contents(directory):
+    result = {}
+    for name in os.listdir(directory):
+        with open(directory / name, 'rb') as f:
+            result[name] = f.read()[-5:]
+    return result
+
+
+def test_interrupted_plan_can_be_resumed_or_rolled_back(tmp_path, monkeypatch):
+    image_dir = tmp_path / 'images'
+    image_dir.mkdir()
+    names = ['a.jpg', 'b.jpg', 'c.jpg']
+    make_files(image_dir, names)
+    before = contents(image_dir)
+    mapping = {'a.jpg': 'b.jpg', 'b.jpg': 'c.jpg', 'c.jpg': 'a.jpg'}
+    steps = plan_renames(mapping, names)
+    journal = RenameJournal(str(tmp_path / 'journal' / 'rename.journal'))
+
+    real_rename = os.rename
+    calls = []
+
+    def flaky_rename(src, dst):
+        calls.append(src)
+        if len(calls) == 3:
+            raise OSError('share went away')
+        real_rename(src, dst)
+    monkeypatch.setattr(os, 'rename', flaky_rename)
+    with pytest.raises(OSError):
+        apply_plan(str(image_dir), steps, journal)
+    monkeypatch.setattr(os, 'rename', real_rename)
+    assert journal.exists()
+
+    rollback_plan(journal)
+    assert not journal.exists()
+    assert contents(image_dir) == before
+
+    monkeypatch.setattr(os, 'rename', flaky_rename)
+    calls.clear()
+    with pytest.raises(OSError):
+        apply_plan(str(image_dir), steps, journal)
+    monkeypatch.setattr(os, 'rename', real_rename)
+    resume_plan(journal)
+    assert not journal.exists()
+    after = contents(image_dir)
+    assert {new: after[new] for new in mapping.values()} == {new: before[old] for old, new in mapping.items()}
+
+
+def test_resume_detects_step_done_but_not_recorded(tmp_path, monkeypatch):
+    image_dir = tmp_path / 'images'
+    image_dir.mkdir()
+    make_files(image_dir, ['a.jpg', 'b.jpg'])
+    before = contents(image_dir)
+    mapping = {'a.jpg': 'd_0001.jpg', 'b.jpg': 'd_0002.jpg'}
+    steps = plan_renames(mapping, mapping)
+    journal = RenameJournal(str(tmp_path / 'journal' / 'rename.journal'))
+    real_mark = RenameJournal.mark
+
+    def crash_after_rename(self, step):
+        if step == 1:
+            raise KeyboardInterrupt
+        real_mark(self, step)
+    monkeypatch.setattr(RenameJournal, 'mark', crash_after_rename)
+    with pytest.raises(KeyboardInterrupt):
+        apply_plan(str(image_dir), steps, journal)
+    monkeypatch.undo()
+    assert journal.load()[2] == 1
+    rollback_plan(journal)
+    assert contents(image_dir) == before
@@ -0,0 +1,36 @@
+import os
+from conftest import create_dummy_image
+
+from imageman.sequence import SequenceAllocator, parse_sequence_name
+
+
+def test_parse_sequence_name():
+    assert parse_sequence_name('cat_0012.jpg') == ('cat', 12, '.jpg')
+    assert parse_sequence_name('my_tag_3.PNG') == ('my_tag', 3, '.PNG')
+    assert parse_sequence_name('cat.jpg') is None
+    assert parse_sequence_name('cat_x1.jpg') is None
+
+
+def test_allocator_continues_after_existing_names(tmp_path):
+    for name in ('cat_0001.jpg', 'cat_0007.JPG', 'cat_0009.png', 'dog_0002.jpg'):
+        create_dummy_image(tmp_path / name)
+    allocator = SequenceAllocator()
+    assert allocator.next_name(str(tmp_path), 'cat', '.jpg') == 'cat_0008.jpg'
+    assert allocator.next_name(str(tmp_path), 'cat', '.jpg') == 'cat_0009.jpg'
+    assert allocator.next_name(str(tmp_path), 'cat', '.png') == 'cat_0010.png'
+    assert allocator.next_name(str(tmp_path), 'bird', '.jpg') == 'bird_0001.jpg'
+    assert allocator.next_name(str(tmp_path / 'missing'), 'cat', '.jpg') == 'cat_0001.jpg'
+
+
+def test_allocator_lists_each_directory_once(tmp_path, monkeypatch):
+    create_dummy_image(tmp_path / 'cat_0001.jpg')
+    allocator = SequenceAllocator()
+    calls = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: calls.append(path) or scandir(path))
+    for _ in range(50):
+        allocator.next_name(str(tmp_path), 'cat', '.jpg')
+    assert len(calls) == 1
+    allocator.forget(str(tmp_path))
+    assert allocator.next_name(str(tmp_path), 'cat', '.jpg') == 'cat_0002.jpg'
+    assert len(calls) == 2
@@ -0,0 +1,57 @@
+import json
+
+from imageman.settings import Settings, MemoryBackend, JsonBackend
+from imageman.main import ImageMan
+
+from conftest import create_dummy_image
+
+
+class CountingBackend(MemoryBackend):
+    def __init__(self, values=None):
+        super().__init__(values)
+        self.saves = []
+
+    def save(self, values):
+        self.saves.append(dict(values))
+        super().save(values)
+
+
+def test_writes_are_coalesced(qtbot):
+    backend = CountingBackend({'tags': 'a;b;c;d;e'})
+    settings = Settings(backend, delay_ms=50)
+    assert settings.get('tags') == 'a;b;c;d;e'
+    settings.set('recent_dirs', '/one')
+    settings.set('recent_dirs', '/two;/one')
+    settings.set('show_filenames', False)
+    settings.set('tags', 'a;b;c;d;e')
+    assert backend.saves == []
+    qtbot.waitUntil(lambda: len(backend.saves) == 1, timeout=2000)
+    assert backend.saves == [{'recent_dirs': '/two;/one', 'show_filenames': 'False'}]
+    settings.flush()
+    assert len(backend.saves) == 1
+
+
+def test_json_backend_keeps_other_values(tmp_path):
+    path = tmp_path / 'config' / 'settings.json'
+    backend = JsonBackend(str(path))
+    assert backend.load() == {}
+    backend.save({'tags': 'a;b;c;d;e'})
+    backend.save({'slideshow_duration': '2.5'})
+    assert json.loads(path.read_text()) == {'tags': 'a;b;c;d;e', 'slideshow_duration': '2.5'}
+    path.write_text('not json')
+    assert backend.load() == {}
+
+
+def test_window_reads_once_and_saves_on_close(tmp_path, qtbot):
+    create_dummy_image(tmp_path / 'a.png')
+    backend = CountingBackend({'tags': 'red;green;blue;cyan;pink', 'show_filenames': 'False',
+                               'slideshow_duration': '1.5'})
+    viewer = ImageMan(str(tmp_path), Settings(backend))
+    qtbot.addWidget(viewer)
+    assert viewer.tags == ['red', 'green', 'blue', 'cyan', 'pink']
+    assert viewer.show_filenames is False
+    assert viewer.slideshow_duration == 1.5
+    viewer._toggle_filename_display(True)
+    assert backend.saves == []
+    viewer.close()
+    assert backend.saves == [{'recent_dirs': str(tmp_path), 'show_filenames': 'True'}]
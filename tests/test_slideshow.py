@@ -0,0 +1,108 @@
+import os
+import sys
+import subprocess
+from PIL import Image
+
+from moviepy import VideoFileClip
+
+from imageman.slideshow import FrameCache, fit_to_frame, still_frame_rate, write_slideshow
+
+
+def test_fit_to_frame_letterboxes():
+    frame = fit_to_frame(Image.new('RGB', (100, 100), (255, 255, 255)), (160, 90))
+    assert frame.size == (160, 90)
+    # Square image in a wide frame: black bars left and right
+    assert frame.getpixel((0, 45)) == (0, 0, 0)
+    assert frame.getpixel((80, 45)) == (255, 255, 255)
+
+
+def test_still_frame_rate_is_exact():
+    assert still_frame_rate(2.0) == (0.5, 1)
+    assert still_frame_rate(3.0) == (1.0, 3)
+    assert still_frame_rate(2.5) == (0.4, 1)
+
+
+def test_write_slideshow_streams_and_loops(tmp_path):
+    paths = []
+    for i, color in enumerate(['red', 'green']):
+        path = str(tmp_path / f'{i}.png')
+        Image.new('RGB', (40, 30), color).save(path)
+        paths.append(path)
+    broken = str(tmp_path / 'broken.jpg')
+    with open(broken, 'wb') as f:
+        f.write(b'not an image')
+    paths.insert(1, broken)
+    output = str(tmp_path / 'slideshow.mp4')
+    count, failures = write_slideshow(paths, output, duration=1.0, min_length_seconds=3,
+                                      frame_size=(64, 36), workers=2)
+    assert count == 2
+    assert len(failures) == 1 and failures[0].startswith('broken.jpg')
+    # Two stills of one second, looped until at least three seconds are filled
+    clip = VideoFileClip(output)
+    try:
+        assert tuple(clip.size) == (64, 36)
+        assert abs(clip.duration - 4.0) < 0.2
+    finally:
+        clip.close()
+    assert sorted(os.listdir(tmp_path)) == ['0.png', '1.png', 'broken.jpg', 'slideshow.mp4']
+
+
+def test_write_slideshow_without_valid_images(tmp_path):
+    broken = str(tmp_path / 'broken.jpg')
+    with open(broken, 'wb') as f:
+        f.write(b'not an image')
+    output = str(tmp_path / 'slideshow.mp4')
+    count, failures = write_slideshow([broken], output, 1.0, 60, frame_size=(64, 36), workers=1)
+    assert count == 0 and len(failures) == 1
+    assert not os.path.exists(output)
+
+
+def test_frame_cache_reuses_unchanged_frames(tmp_path, monkeypatch):
+    import imageman.slideshow as slideshow
+    path = str(tmp_path / 'a.png')
+    Image.new('RGB', (40, 30), 'red').save(path)
+    cache = FrameCache(str(tmp_path / 'frames'))
+    data, error = slideshow._render_frame(path, (64, 36), cache)
+    assert error is None and cache.stats()['frames'] == 1
+
+    def fail(*args):
+        raise AssertionError('frame was rendered again')
+    monkeypatch.setattr(slideshow, 'fit_to_frame', fail)
+    assert slideshow._render_frame(path, (64, 36), cache) == (data, None)
+    monkeypatch.undo()
+
+    # An edited image or another frame size misses the cache
+    Image.new('RGB', (40, 30), 'blue').save(path)
+    os.utime(path, ns=(1, 1))
+    other, _ = slideshow._render_frame(path, (64, 36), cache)
+    assert other != data
+    slideshow._render_frame(path, (32, 18), cache)
+    assert cache.stats()['frames'] == 3
+
+
+def test_frame_cache_evicts_least_recently_used(tmp_path):
+    cache = FrameCache(str(tmp_path / 'frames'), max_bytes=0)
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f'{i}.png')
+        Image.new('RGB', (40, 30), 'red').save(path)
+        paths.append(path)
+        cache.store(path, (64, 36), Image.new('RGB', (64, 36)))
+    frame_size = os.path.getsize(cache._frame_path(paths[0], (64, 36)))
+    for i, path in enumerate(paths):
+        os.utime(cache._frame_path(path, (64, 36)), (i, i))
+    cache.max_bytes = frame_size
+    cache.load(paths[0], (64, 36))  # used most recently now
+    cache.evict()
+    assert cache.load(paths[0], (64, 36)) is not None
+    assert cache.load(paths[1], (64, 36)) is None
+    assert cache.load(paths[2], (64, 36)) is None
+
+
+def test_window_does_not_load_the_video_stack():
+    # A fresh interpreter, the test session itself has imported both already
+    code = ("import sys, imageman.image_man_window; "
+            "print(','.join(m for m in ('PIL', 'moviepy') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.join(os.path.dirname(__file__), '..'), check=True)
+    assert result.stdout.strip() == ''
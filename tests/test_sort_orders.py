@@ -0,0 +1,57 @@
+import os
+
+from PIL import Image
+
+from imageman.directory_index import DirectoryIndex
+from imageman.metadata_index import MetadataIndex
+from imageman.main import ImageMan
+
+
+def create_photo(path, width, height, taken=None, mtime=None):
+    exif = Image.Exif()
+    if taken is not None:
+        exif[0x0132] = taken
+    Image.new('RGB', (width, height), 'gray').save(str(path), exif=exif)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_index_sorts_by_header_facts(tmp_path, qtbot):
+    images = tmp_path / 'images'
+    images.mkdir()
+    create_photo(images / 'a.jpg', 30, 20, '2021:05:01 10:00:00', mtime=3000)
+    create_photo(images / 'b.jpg', 60, 40, '2021:05:01 09:00:00', mtime=1000)
+    create_photo(images / 'c.jpg', 10, 10, mtime=2000)
+    metadata = MetadataIndex(str(tmp_path / 'metadata.sqlite3'))
+    index = DirectoryIndex(metadata=metadata)
+    with qtbot.waitSignal(index.examined, timeout=5000):
+        index.open(str(images))
+    assert index.names() == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert index.names('capture_time') == ['c.jpg', 'b.jpg', 'a.jpg']
+    assert index.names('mtime') == ['b.jpg', 'c.jpg', 'a.jpg']
+    assert index.names('dimensions') == ['c.jpg', 'a.jpg', 'b.jpg']
+    assert index.names('size')[0] == 'c.jpg'
+    index.close()
+
+    # The next session sorts straight from the database
+    index = DirectoryIndex(metadata=metadata)
+    index.open(str(images))
+    assert not index.is_examining()
+    assert index.names('capture_time') == ['c.jpg', 'b.jpg', 'a.jpg']
+    index.close()
+    metadata.close()
+
+
+def test_window_keeps_sort_order(tmp_path, qtbot):
+    create_photo(tmp_path / 'a.jpg', 10, 10, mtime=2000)
+    create_photo(tmp_path / 'b.jpg', 10, 10, mtime=1000)
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    assert viewer.images == ['a.jpg', 'b.jpg']
+    viewer._set_sort_order('mtime')
+    assert viewer.images == viewer.thumbnail_model.names() == ['b.jpg', 'a.jpg']
+    assert viewer.settings.get('sort_order') == 'mtime'
+    viewer._toggle_thumbnail_view(False)
+    assert viewer.images[viewer.current_index] == 'b.jpg'
+    viewer._set_sort_order('name')
+    assert viewer.images == ['a.jpg', 'b.jpg'] and viewer.current_index == 1
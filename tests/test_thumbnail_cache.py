@@ -0,0 +1,98 @@
+import os
+import pytest
+from PyQt5.QtGui import QImage, QColor
+
+from imageman.thumbnail_cache import ThumbnailCache
+
+
+def make_thumbnail(color, width=32, height=16):
+    image = QImage(width, height, QImage.Format_ARGB32)
+    image.fill(QColor(color))
+    return image
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'cache')
+
+
+def test_thumbnails_survive_reopen(tmp_path, cache_dir):
+    cache = ThumbnailCache(cache_dir, size=32)
+    cache.open(str(tmp_path))
+    cache.put('a.jpg', 100, 2000, make_thumbnail('red'))
+    cache.close()
+
+    cache = ThumbnailCache(cache_dir, size=32)
+    cache.open(str(tmp_path))
+    image = cache.get('a.jpg', 100, 2000)
+    assert image is not None
+    assert (image.width(), image.height()) == (32, 16)
+    assert image.pixelColor(0, 0) == QColor('red')
+    cache.close()
+
+
+def test_changed_file_misses(tmp_path, cache_dir):
+    cache = ThumbnailCache(cache_dir, size=32)
+    cache.open(str(tmp_path))
+    cache.put('a.jpg', 100, 2000, make_thumbnail('red'))
+    cache.flush()
+    assert cache.get('a.jpg', 101, 2000) is None
+    assert cache.get('a.jpg', 100, 2001) is None
+    assert cache.get('b.jpg', 100, 2000) is None
+    cache.close()
+
+
+def test_appends_keep_existing_entries(tmp_path, cache_dir):
+    cache = ThumbnailCache(cache_dir, size=32)
+    cache.open(str(tmp_path))
+    cache.put('a.jpg', 1, 1, make_thumbnail('red'))
+    cache.flush()
+    cache.put('b.jpg', 1, 1, make_thumbnail('blue'))
+    cache.flush()
+    assert cache.get('a.jpg', 1, 1).pixelColor(0, 0) == QColor('red')
+    assert cache.get('b.jpg', 1, 1).pixelColor(0, 0) == QColor('blue')
+    cache.close()
+
+
+def test_retain_drops_missing_files(tmp_path, cache_dir):
+    cache = ThumbnailCache(cache_dir, size=32)
+    cache.open(str(tmp_path))
+    cache.put('a.jpg', 1, 1, make_thumbnail('red'))
+    cache.put('b.jpg', 1, 1, make_thumbnail('blue'))
+    cache.flush()
+    cache.retain(['b.jpg'])
+    cache.close()
+    cache.open(str(tmp_path))
+    assert cache.get('a.jpg', 1, 1) is None
+    assert cache.get('b.jpg', 1, 1) is not None
+    cache.close()
+
+
+def test_eviction_removes_least_recently_used_directory(tmp_path, cache_dir):
+    dirs = [tmp_path / name for name in ('one', 'two', 'three')]
+    cache = ThumbnailCache(cache_dir, size=32)
+    for i, d in enumerate(dirs):
+        d.mkdir()
+        cache.open(str(d))
+        cache.put('a.jpg', 1, 1, make_thumbnail('red'))
+        cache.flush()
+        path = cache._cache_path(str(d))
+        os.utime(path, (1000 + i, 1000 + i))
+    file_size = cache.stats()['bytes'] // 3
+    cache.max_bytes = file_size * 2
+    cache.put('b.jpg', 1, 1, make_thumbnail('blue'))
+    cache.flush()
+    assert not os.path.exists(cache._cache_path(str(dirs[0])))
+    assert os.path.exists(cache._cache_path(str(dirs[2])))
+    cache.close()
+
+
+def test_clear_removes_everything(tmp_path, cache_dir):
+    cache = ThumbnailCache(cache_dir, size=32)
+    cache.open(str(tmp_path))
+    cache.put('a.jpg', 1, 1, make_thumbnail('red'))
+    cache.flush()
+    assert cache.stats()['directories'] == 1
+    cache.clear()
+    assert cache.stats()['directories'] == 0
+    assert cache.get('a.jpg', 1, 1) is None
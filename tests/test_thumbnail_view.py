@@ -0,0 +1,107 @@
+import os
+import pytest
+from PyQt5.QtCore import Qt
+from conftest import create_dummy_image
+
+from imageman.main import ImageMan
+
+
+@pytest.fixture
+def viewer(tmp_path, qtbot):
+    for name in ('a.png', 'b.png', 'c.png'):
+        create_dummy_image(tmp_path / name, 20, 20)
+    viewer = ImageMan(str(tmp_path))
+    qtbot.addWidget(viewer)
+    viewer.tags = ['cat', 'dog', 'bird', 'fish', 'horse']
+    return viewer
+
+
+def item_names(viewer):
+    model = viewer.thumbnail_model
+    return [model.index(row).data(Qt.UserRole) for row in range(model.rowCount())]
+
+
+def test_delete_removes_only_that_row(viewer, tmp_path, qtbot):
+    with qtbot.assertNotEmitted(viewer.thumbnail_model.modelReset):
+        viewer.delete_thumbnail_image('b.png')
+    assert item_names(viewer) == ['a.png', 'c.png']
+    assert viewer.thumbnail_view.currentIndex().row() == 1
+    viewer.file_ops.wait()
+    assert not os.path.exists(tmp_path / 'b.png')
+
+
+def test_rename_updates_row_in_place(viewer, qtbot):
+    with qtbot.assertNotEmitted(viewer.thumbnail_model.modelReset):
+        viewer.rename_thumbnail_image('b.png', 'cat')
+    assert viewer.thumbnail_model.index(1).data(Qt.UserRole) == 'cat_0001.png'
+    assert viewer.images == ['a.png', 'cat_0001.png', 'c.png']
+
+
+def test_move_to_tag_removes_row(viewer, tmp_path):
+    viewer.move_thumbnail_image_to_tag('a.png', 1)
+    assert item_names(viewer) == ['b.png', 'c.png']
+    viewer.file_ops.wait()
+    assert os.listdir(tmp_path / 'dog') == ['dog_0001.png']
+
+
+def test_refresh_keeps_rows_when_nothing_changed(viewer, tmp_path, qtbot):
+    with qtbot.assertNotEmitted(viewer.thumbnail_model.modelReset):
+        viewer._update_thumbnail_view()
+        # A file that appears on disk is picked up by the watcher and
+        # inserted without touching the others
+        with qtbot.waitSignal(viewer.dir_index.changed, timeout=5000):
+            create_dummy_image(tmp_path / 'bb.png', 20, 20)
+    assert item_names(viewer) == ['a.png', 'b.png', 'bb.png', 'c.png']
+
+
+def test_drop_renames_in_dropped_order(viewer, tmp_path):
+    viewer.thumbnail_model.move_rows([2], 0)
+    assert item_names(viewer) == ['c.png', 'a.png', 'b.png']
+    viewer.on_item_dropped()
+    dir_name = os.path.basename(str(tmp_path))
+    assert viewer.images == [f'{dir_name}_0001.png', f'{dir_name}_0002.png', f'{dir_name}_0003.png']
+    assert item_names(viewer) == viewer.images
+
+
+def test_model_exposes_rows_in_batches(tmp_path, qtbot):
+    from imageman.thumbnail_model import ThumbnailModel
+    from imageman.thumbnail_cache import ThumbnailCache
+    from imageman.thumbnails import ThumbnailLoader
+    model = ThumbnailModel(ThumbnailLoader(), ThumbnailCache(str(tmp_path / 'cache')))
+    names = [f'img{i:05d}.png' for i in range(1000)]
+    model.set_images(str(tmp_path), names)
+    assert model.rowCount() == 0
+    model.fetchMore(model.index(-1))
+    assert 0 < model.rowCount() < len(names)
+    model.ensure_fetched(999)
+    assert model.rowCount() == 1000
+    model.remove_names(['img00010.png', 'img00011.png', 'img00500.png'])
+    assert model.rowCount() == 997
+    assert model.index(10).data(Qt.UserRole) == 'img00012.png'
+
+
+def select_rows(viewer, rows):
+    from PyQt5.QtCore import QItemSelectionModel
+    view = viewer.thumbnail_view
+    view.clearSelection()
+    for row in rows:
+        view.selectionModel().select(viewer.thumbnail_model.index(row), QItemSelectionModel.Select)
+
+
+def test_keys_act_on_whole_selection(viewer, tmp_path, qtbot):
+    select_rows(viewer, [0, 2])
+    with qtbot.assertNotEmitted(viewer.thumbnail_model.modelReset):
+        qtbot.keyClick(viewer.thumbnail_view, Qt.Key_1)
+    assert item_names(viewer) == ['cat_0001.png', 'b.png', 'cat_0002.png']
+
+    select_rows(viewer, [0, 1])
+    qtbot.keyClick(viewer.thumbnail_view, Qt.Key_2, Qt.ControlModifier)
+    assert item_names(viewer) == ['cat_0002.png']
+    assert viewer.images == ['cat_0002.png']
+
+    select_rows(viewer, [0])
+    qtbot.keyClick(viewer.thumbnail_view, Qt.Key_D)
+    assert item_names(viewer) == []
+    viewer.file_ops.wait()
+    assert sorted(os.listdir(tmp_path / 'dog')) == ['dog_0001.png', 'dog_0002.png']
+    assert sorted(os.listdir(tmp_path)) == ['dog']
@@ -0,0 +1,52 @@
+import pytest
+from PyQt5.QtGui import QImage, QColor
+
+from imageman.thumbnails import read_thumbnail, ThumbnailLoader
+
+
+def create_image(filepath, width, height):
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor('red'))
+    assert image.save(str(filepath))
+
+
+def test_read_thumbnail_fits_bounding_box(tmp_path):
+    path = tmp_path / 'wide.png'
+    create_image(path, 400, 200)
+    thumb = read_thumbnail(str(path), 128)
+    assert (thumb.width(), thumb.height()) == (128, 64)
+
+
+def test_read_thumbnail_keeps_small_images(tmp_path):
+    path = tmp_path / 'small.png'
+    create_image(path, 20, 10)
+    thumb = read_thumbnail(str(path), 128)
+    assert (thumb.width(), thumb.height()) == (20, 10)
+
+
+def test_loader_delivers_every_requested_thumbnail(tmp_path, qtbot):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f'img{i}.png'
+        create_image(path, 300, 300)
+        paths.append(str(path))
+    loader = ThumbnailLoader(64)
+    loaded = {}
+    loader.thumbnail_ready.connect(lambda path, image: loaded.setdefault(path, image))
+    loader.request(paths)
+    qtbot.waitUntil(lambda: len(loaded) == len(paths), timeout=5000)
+    assert all(image.width() == 64 for image in loaded.values())
+    loader.close()
+
+
+def test_loader_drops_results_after_cancel(tmp_path, qtbot):
+    path = tmp_path / 'img.png'
+    create_image(path, 300, 300)
+    loader = ThumbnailLoader(64)
+    loaded = []
+    loader.thumbnail_ready.connect(lambda path, image: loaded.append(path))
+    loader.request([str(path)])
+    loader.cancel()
+    loader.pool.waitForDone()
+    qtbot.wait(50)
+    assert loaded == []